@@ -1,4 +1,5 @@
 import json
+from datetime import date
 
 from django.core.exceptions import ValidationError
 from django.http import JsonResponse
@@ -10,9 +11,13 @@ from app.services.booking_service import (
     get_available_days,
     confirm_booking,
     create_manual_booking,
+    find_next_available_times,
+    get_available_range,
     get_available_times,
     get_available_times_for_manual_booking,
     get_booking_context,
+    get_next_available_times,
+    hold_slot,
 )
 from app.services.chat_service import (
     get_chat_messages,
@@ -22,7 +27,10 @@ from app.services.chat_service import (
     send_agent_text_message,
 )
 from app.services.dashboard_service import (
+    DASHBOARD_PAGE_SIZE,
+    get_dashboard_aggregates,
     list_booking_events,
+    list_dashboard_booking_changes,
     list_dashboard_bookings,
     update_booking_status,
 )
@@ -39,7 +47,61 @@ def dashboard_bookings_api(request):
     unauthorized = _require_authenticated(request)
     if unauthorized:
         return unauthorized
-    return JsonResponse({"bookings": list_dashboard_bookings()})
+    try:
+        date_from = date.fromisoformat(request.GET["date_from"]) if request.GET.get("date_from") else None
+        date_to = date.fromisoformat(request.GET["date_to"]) if request.GET.get("date_to") else None
+        service_id = int(request.GET["service_id"]) if request.GET.get("service_id") else None
+        limit = int(request.GET.get("limit") or DASHBOARD_PAGE_SIZE)
+        data = list_dashboard_bookings(
+            statuses=[value for value in request.GET.getlist("status") if value],
+            service_id=service_id,
+            date_from=date_from,
+            date_to=date_to,
+            search=request.GET.get("q") or "",
+            cursor=request.GET.get("cursor") or None,
+            limit=limit,
+        )
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(data)
+
+
+@require_GET
+def dashboard_bookings_changes_api(request):
+    unauthorized = _require_authenticated(request)
+    if unauthorized:
+        return unauthorized
+    since = request.GET.get("since")
+    if not since:
+        return JsonResponse({"error": "Parametro 'since' es obligatorio."}, status=400)
+    try:
+        date_from = date.fromisoformat(request.GET["date_from"]) if request.GET.get("date_from") else None
+        date_to = date.fromisoformat(request.GET["date_to"]) if request.GET.get("date_to") else None
+        service_id = int(request.GET["service_id"]) if request.GET.get("service_id") else None
+        data = list_dashboard_booking_changes(
+            since=since,
+            statuses=[value for value in request.GET.getlist("status") if value],
+            service_id=service_id,
+            date_from=date_from,
+            date_to=date_to,
+            search=request.GET.get("q") or "",
+        )
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(data)
+
+
+@require_GET
+def dashboard_bookings_aggregates_api(request):
+    unauthorized = _require_authenticated(request)
+    if unauthorized:
+        return unauthorized
+    try:
+        date_from = date.fromisoformat(request.GET["date_from"]) if request.GET.get("date_from") else None
+        date_to = date.fromisoformat(request.GET["date_to"]) if request.GET.get("date_to") else None
+    except ValueError:
+        return JsonResponse({"error": "Fechas invalidas (YYYY-MM-DD)."}, status=400)
+    return JsonResponse(get_dashboard_aggregates(date_from=date_from, date_to=date_to))
 
 
 @require_GET
@@ -47,7 +109,16 @@ def dashboard_bookings_events_api(request):
     unauthorized = _require_authenticated(request)
     if unauthorized:
         return unauthorized
-    return JsonResponse({"events": list_booking_events()})
+    # FullCalendar envía start/end como fechas ISO con hora y zona; basta la parte de la fecha.
+    start_raw = (request.GET.get("start") or "")[:10]
+    end_raw = (request.GET.get("end") or "")[:10]
+    if not start_raw or not end_raw:
+        return JsonResponse({"error": "Parametros 'start' y 'end' son obligatorios (YYYY-MM-DD)."}, status=400)
+    try:
+        events = list_booking_events(date.fromisoformat(start_raw), date.fromisoformat(end_raw))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"events": events})
 
 
 @require_GET
@@ -108,6 +179,78 @@ def dashboard_calendar_days_api(request, token):
     return JsonResponse(data)
 
 
+@require_GET
+def available_range_api(request, token):
+    start_date = request.GET.get("from")
+    end_date = request.GET.get("to")
+    if not start_date or not end_date:
+        return JsonResponse({"error": "Debes enviar from y to (YYYY-MM-DD)."}, status=400)
+
+    package_ids_raw = request.GET.get("package_ids", "")
+    try:
+        package_ids = [int(value) for value in package_ids_raw.split(",") if value.strip()]
+    except ValueError:
+        return JsonResponse({"error": "package_ids debe ser una lista de enteros separados por coma."}, status=400)
+
+    try:
+        data = get_available_range(token, start_date=start_date, end_date=end_date, package_ids=package_ids)
+    except (ValidationError, ValueError, ServicePackage.DoesNotExist) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(data)
+
+
+def _parse_next_available_params(request) -> tuple[int, int]:
+    return int(request.GET.get("days") or 30), int(request.GET.get("limit") or 5)
+
+
+@require_GET
+def next_available_times_api(request, token):
+    package_id_raw = request.GET.get("package_id")
+    try:
+        days, limit = _parse_next_available_params(request)
+        package_id = int(package_id_raw) if package_id_raw else None
+    except ValueError:
+        return JsonResponse({"error": "days, limit y package_id deben ser enteros válidos."}, status=400)
+
+    try:
+        data = get_next_available_times(token, package_id=package_id, days=days, limit=limit)
+    except (ValidationError, ServicePackage.DoesNotExist) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(data)
+
+
+@csrf_exempt
+def hold_slot_api(request, token):
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido, usa POST."}, status=405)
+
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "JSON inválido."}, status=400)
+
+    target_date = payload.get("date")
+    target_time = payload.get("time")
+    if not target_date or not target_time:
+        return JsonResponse({"error": "Los campos 'date' y 'time' son obligatorios."}, status=400)
+
+    try:
+        hold = hold_slot(token, target_date=target_date, target_time=target_time, package_id=payload.get("package_id"))
+    except (ValidationError, ValueError, ServicePackage.DoesNotExist) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    return JsonResponse(
+        {
+            "ok": True,
+            "hold": {
+                "date": hold.date.isoformat(),
+                "time": hold.time.strftime("%H:%M"),
+                "expires_at": hold.expires_at.isoformat(),
+            },
+        }
+    )
+
+
 @csrf_exempt
 def confirm_booking_api(request, token):
     if request.method != "POST":
@@ -267,7 +410,7 @@ def dashboard_booking_status_api(request, booking_id: int):
 
     try:
         booking = update_booking_status(booking_id=booking_id, status_code=status_code)
-    except ValueError as exc:
+    except (ValidationError, ValueError) as exc:
         return JsonResponse({"error": str(exc)}, status=400)
     except Booking.DoesNotExist:
         return JsonResponse({"error": "Reservación no encontrada."}, status=404)
@@ -352,6 +495,27 @@ def dashboard_manual_available_times_api(request):
     return JsonResponse(data)
 
 
+@require_GET
+def dashboard_next_available_times_api(request):
+    unauthorized = _require_authenticated(request)
+    if unauthorized:
+        return unauthorized
+
+    service_id_raw = request.GET.get("service_id")
+    category = request.GET.get("category", "").strip()
+    try:
+        days, limit = _parse_next_available_params(request)
+        service_id = int(service_id_raw) if service_id_raw else None
+    except ValueError:
+        return JsonResponse({"error": "days, limit y service_id deben ser enteros válidos."}, status=400)
+
+    try:
+        data = find_next_available_times(service_id=service_id, category=category, days=days, limit=limit)
+    except ValidationError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(data)
+
+
 @csrf_exempt
 def dashboard_manual_booking_create_api(request):
     unauthorized = _require_authenticated(request)
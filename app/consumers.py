@@ -1,19 +1,23 @@
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from app.services.booking_events import BOOKINGS_GROUP
+
 
 class DashboardChatConsumer(AsyncJsonWebsocketConsumer):
-    group_name = "dashboard_chats"
+    group_names = ("dashboard_chats",)
 
     async def connect(self):
         user = self.scope.get("user")
         if user is None or not user.is_authenticated:
             await self.close(code=4401)
             return
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(group_name, self.channel_name)
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for group_name in self.group_names:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
 
     async def receive_json(self, content, **kwargs):
         # El dashboard no requiere mensajes entrantes por websocket.
@@ -26,3 +30,18 @@ class DashboardChatConsumer(AsyncJsonWebsocketConsumer):
                 "user_id": event.get("user_id"),
             }
         )
+
+
+class DashboardBookingConsumer(DashboardChatConsumer):
+    """Cambios de citas para el panel; también reenvía los eventos de chat porque cambian el estado "Dudas"."""
+
+    group_names = (BOOKINGS_GROUP, *DashboardChatConsumer.group_names)
+
+    async def booking_event(self, event):
+        await self.send_json(
+            {
+                "event": event.get("event", "booking.updated"),
+                "booking_id": event.get("booking_id"),
+                "booking": event.get("booking"),
+            }
+        )
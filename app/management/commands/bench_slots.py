@@ -0,0 +1,75 @@
+import random
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+
+from app.services.scheduling import compute_slots
+
+
+def legacy_slots(
+    *,
+    target_date: date,
+    ranges: list[tuple[time, time]],
+    taken_intervals: list[tuple[int, int]],
+    duration_minutes: int,
+    interval_minutes: int,
+) -> list[time]:
+    # Implementacion original: compara cada candidato contra todas las reservas con any().
+    duration = timedelta(minutes=max(duration_minutes, 1))
+    interval = timedelta(minutes=max(interval_minutes, 5))
+    midnight = datetime.combine(target_date, time(0, 0))
+    booked = [
+        (midnight + timedelta(minutes=start), midnight + timedelta(minutes=end))
+        for start, end in taken_intervals
+    ]
+    available: list[time] = []
+    for start_time, end_time in ranges:
+        current = datetime.combine(target_date, start_time)
+        block_end = datetime.combine(target_date, end_time)
+        while current + duration <= block_end:
+            candidate_end = current + duration
+            collision = any(current < booked_end and booked_start < candidate_end for booked_start, booked_end in booked)
+            if not collision:
+                available.append(current.time())
+            current += interval
+    return available
+
+
+def build_synthetic_day(*, bookings: int, interval: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    ranges = [(time(7, 0), time(13, 0)), (time(14, 0), time(22, 0))]
+    taken: list[tuple[int, int]] = []
+    for _ in range(bookings):
+        start = rng.randrange(7 * 60, 22 * 60, interval)
+        taken.append((start, start + rng.choice([15, 30, 45, 60])))
+    return {"ranges": ranges, "taken_intervals": taken, "duration_minutes": 45, "interval_minutes": interval}
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark del generador de horarios (barrido) contra la version con any()."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, nargs="+", default=[10, 50, 200])
+        parser.add_argument("--interval", type=int, default=15)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        target_date = date(2026, 1, 5)
+        for bookings in options["bookings"]:
+            day = build_synthetic_day(bookings=bookings, interval=options["interval"], seed=options["seed"])
+            legacy = legacy_slots(target_date=target_date, **day)
+            sweep = compute_slots(**day)
+            if legacy != sweep:
+                self.stderr.write(self.style.ERROR(f"Resultados distintos con {bookings} reservas."))
+                return
+
+            repeat = options["repeat"]
+            legacy_ms = timeit.timeit(lambda: legacy_slots(target_date=target_date, **day), number=repeat) * 1000
+            sweep_ms = timeit.timeit(lambda: compute_slots(**day), number=repeat) * 1000
+            self.stdout.write(
+                f"reservas={bookings} intervalo={options['interval']}min slots={len(sweep)} | "
+                f"any()={legacy_ms / repeat:.3f}ms barrido={sweep_ms / repeat:.3f}ms "
+                f"x{legacy_ms / max(sweep_ms, 1e-9):.1f}"
+            )
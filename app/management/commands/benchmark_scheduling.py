@@ -0,0 +1,379 @@
+import json
+import random
+import statistics
+import time as perf
+import tracemalloc
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app.models import Booking, Service, ServiceException, ServicePackage, ServiceWeeklyRange, User
+from app.services.availability_cache import get_availability_cache
+from app.services.booking_service import confirm_booking, create_booking_intent, get_available_days
+from app.services.scheduling import (
+    from_minutes,
+    get_available_slots,
+    get_day_availability_status,
+    is_slot_available,
+)
+
+# Bloques diarios en minutos; las reservas sintéticas caen en la rejilla y nunca se enciman.
+DAY_BLOCKS = [(7 * 60, 11 * 60), (11 * 60 + 30, 15 * 60), (16 * 60, 19 * 60), (19 * 60 + 30, 22 * 60)]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _summarize(samples_ms: list[float], queries: list[int], peaks_kb: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 4) if ordered else 0.0,
+        "p50_ms": round(_percentile(ordered, 0.50), 4),
+        "p90_ms": round(_percentile(ordered, 0.90), 4),
+        "p99_ms": round(_percentile(ordered, 0.99), 4),
+        "max_ms": round(ordered[-1], 4) if ordered else 0.0,
+        "queries_mean": round(statistics.fmean(queries), 2) if queries else 0.0,
+        "queries_max": max(queries, default=0),
+        "peak_memory_kb_mean": round(statistics.fmean(peaks_kb), 1) if peaks_kb else 0.0,
+        "peak_memory_kb_max": round(max(peaks_kb, default=0.0), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de la agenda con calendarios sintéticos grandes: latencias (p50/p90/p99), "
+        "consultas y memoria por llamada. Los datos se crean en una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=4)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--bookings", type=int, default=30000, help="Reservas totales entre todos los servicios.")
+        parser.add_argument("--exceptions", type=int, default=60, help="Excepciones por servicio.")
+        parser.add_argument("--interval", type=int, default=15)
+        parser.add_argument("--duration", type=int, default=45, help="Duración del paquete consultado.")
+        parser.add_argument("--repeat", type=int, default=200, help="Llamadas cronometradas por operación.")
+        parser.add_argument("--profile-repeat", type=int, default=25, help="Llamadas con conteo de consultas y tracemalloc.")
+        parser.add_argument("--cache", choices=["cold", "warm"], default="cold")
+        parser.add_argument("--seed", type=int, default=11)
+        parser.add_argument("--label", default="", help="Etiqueta libre, por ejemplo el commit evaluado.")
+        parser.add_argument("--output", help="Ruta del JSON de resultados (por defecto stdout).")
+
+    def handle(self, *args, **options):
+        if options["services"] < 1 or options["days"] < 1:
+            raise CommandError("--services y --days deben ser mayores a cero.")
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.cache = get_availability_cache()
+        report: dict = {}
+        service_ids: list[int] = []
+        try:
+            with transaction.atomic():
+                started = perf.perf_counter()
+                dataset = self._build_dataset()
+                service_ids = [service.id for service in dataset["services"]]
+                report["dataset"] = {
+                    "services": len(dataset["services"]),
+                    "days": options["days"],
+                    "weekly_ranges": dataset["weekly_ranges"],
+                    "exceptions": dataset["exceptions"],
+                    "bookings": dataset["bookings"],
+                    "build_seconds": round(perf.perf_counter() - started, 2),
+                }
+                report["results"] = self._run(dataset)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            # Los ids pueden reutilizarse tras el rollback; no deben quedar entradas de cache huérfanas.
+            for service_id in service_ids:
+                self.cache.invalidate_service(service_id)
+
+        report["meta"] = {
+            "label": options["label"],
+            "vendor": connection.vendor,
+            "cache": options["cache"],
+            "cache_backend": type(self.cache.backend).__name__,
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "profile_repeat": options["profile_repeat"],
+            "generated_at": timezone.now().isoformat(),
+        }
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(payload)
+            for name, stats in report["results"].items():
+                self.stdout.write(
+                    f"{name:28} p50={stats['p50_ms']:.3f}ms p90={stats['p90_ms']:.3f}ms "
+                    f"p99={stats['p99_ms']:.3f}ms consultas={stats['queries_mean']} mem={stats['peak_memory_kb_max']}KB"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}."))
+        else:
+            self.stdout.write(payload)
+
+    def _build_dataset(self) -> dict:
+        options = self.options
+        rng = self.rng
+        start_date = timezone.localdate() + timedelta(days=1)
+        end_date = start_date + timedelta(days=options["days"] - 1)
+        interval = max(options["interval"], 5)
+
+        services: list[Service] = []
+        packages: dict[int, ServicePackage] = {}
+        for index in range(options["services"]):
+            service = Service.objects.create(
+                name=f"Benchmark {index + 1}",
+                slug="",
+                category="Benchmark",
+                default_duration_minutes=options["duration"],
+                booking_interval_minutes=interval,
+            )
+            services.append(service)
+            packages[service.id] = ServicePackage.objects.create(
+                service=service,
+                name="Base",
+                price=1000,
+                deposit_required=200,
+                duration_minutes=options["duration"],
+                is_default=True,
+            )
+
+        ranges = [
+            ServiceWeeklyRange(
+                service=service,
+                weekday=weekday,
+                start_time=from_minutes(block_start),
+                end_time=from_minutes(block_end),
+                order_index=order,
+            )
+            for service in services
+            for weekday in range(7)
+            for order, (block_start, block_end) in enumerate(DAY_BLOCKS)
+        ]
+        ServiceWeeklyRange.objects.bulk_create(ranges)
+
+        exceptions: list[ServiceException] = []
+        for service in services:
+            for offset in rng.sample(range(options["days"]), min(options["exceptions"], options["days"])):
+                exception_date = start_date + timedelta(days=offset)
+                kind = rng.choice(["closed", "add", "replace", "max"])
+                if kind == "closed":
+                    exceptions.append(
+                        ServiceException(
+                            service=service,
+                            date=exception_date,
+                            exception_type=ServiceException.ExceptionType.CLOSED,
+                        )
+                    )
+                elif kind == "max":
+                    exceptions.append(
+                        ServiceException(
+                            service=service,
+                            date=exception_date,
+                            exception_type=ServiceException.ExceptionType.MAX_BOOKINGS,
+                            max_bookings=rng.randint(5, 30),
+                        )
+                    )
+                else:
+                    exceptions.append(
+                        ServiceException(
+                            service=service,
+                            date=exception_date,
+                            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+                            range_mode=(
+                                ServiceException.RangeMode.ADD if kind == "add" else ServiceException.RangeMode.REPLACE
+                            ),
+                            start_time=time(22, 0) if kind == "add" else time(9, 0),
+                            end_time=time(23, 30) if kind == "add" else time(17, 0),
+                        )
+                    )
+        ServiceException.objects.bulk_create(exceptions)
+
+        grid = [
+            (service, start_date + timedelta(days=offset), minute)
+            for service in services
+            for offset in range(options["days"])
+            for block_start, block_end in DAY_BLOCKS
+            for minute in range(block_start, block_end - interval + 1, interval)
+        ]
+        if options["bookings"] > len(grid):
+            self.stderr.write(f"Solo caben {len(grid)} reservas sin traslape; se usará ese número.")
+        users = User.objects.bulk_create(
+            [User(phone_number=f"bench{index:07d}", name=f"Benchmark {index}") for index in range(200)]
+        )
+        bookings = [
+            Booking(
+                user=rng.choice(users),
+                service=service,
+                package=packages[service.id],
+                customer_name="Benchmark",
+                date=booking_date,
+                time=from_minutes(minute),
+                duration_minutes=interval,
+                status=rng.choice([Booking.Status.CONFIRMED, Booking.Status.PENDING, Booking.Status.CANCELLED]),
+            )
+            for service, booking_date, minute in rng.sample(grid, min(options["bookings"], len(grid)))
+        ]
+        Booking.objects.bulk_create(bookings, batch_size=2000)
+
+        intents_user = User.objects.create(phone_number="bench-cliente", name="Benchmark cliente")
+        return {
+            "services": services,
+            "packages": packages,
+            "start_date": start_date,
+            "end_date": end_date,
+            "client": intents_user,
+            "weekly_ranges": len(ranges),
+            "exceptions": len(exceptions),
+            "bookings": len(bookings),
+        }
+
+    def _random_day(self, dataset) -> tuple[Service, ServicePackage, date]:
+        service = self.rng.choice(dataset["services"])
+        target_date = dataset["start_date"] + timedelta(days=self.rng.randrange(self.options["days"]))
+        return service, dataset["packages"][service.id], target_date
+
+    def _drop_cache(self, dataset) -> None:
+        for service in dataset["services"]:
+            self.cache.invalidate_service(service.id)
+
+    def _measure(self, dataset, name: str, prepare, call) -> dict:
+        # Primero se cronometra sin instrumentación; después se cuentan consultas y memoria en otra pasada.
+        samples: list[float] = []
+        for _ in range(self.options["repeat"]):
+            arguments = prepare()
+            if self.options["cache"] == "cold":
+                self._drop_cache(dataset)
+            started = perf.perf_counter()
+            call(*arguments)
+            samples.append((perf.perf_counter() - started) * 1000)
+
+        queries: list[int] = []
+        peaks: list[float] = []
+        for _ in range(self.options["profile_repeat"]):
+            arguments = prepare()
+            if self.options["cache"] == "cold":
+                self._drop_cache(dataset)
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as captured:
+                call(*arguments)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            queries.append(len(captured))
+            peaks.append(peak / 1024)
+
+        self.stderr.write(f"{name}: {len(samples)} llamadas")
+        return _summarize(samples, queries, peaks)
+
+    def _run(self, dataset) -> dict:
+        options = self.options
+        interval = max(options["interval"], 5)
+        duration = options["duration"]
+        client = dataset["client"]
+
+        def day_args():
+            return self._random_day(dataset)
+
+        def slot_args():
+            service, package, target_date = self._random_day(dataset)
+            block_start, block_end = self.rng.choice(DAY_BLOCKS)
+            minute = self.rng.randrange(block_start, block_end, interval)
+            return service, package, target_date, from_minutes(minute)
+
+        def month_args():
+            service, package, target_date = self._random_day(dataset)
+            create_booking_intent(user=client, service=service, package=package)
+            return target_date, package
+
+        def confirm_args():
+            for _ in range(50):
+                service, package, target_date = self._random_day(dataset)
+                slots = get_available_slots(
+                    service=service,
+                    target_date=target_date,
+                    duration_minutes=duration,
+                    booking_interval_minutes=interval,
+                    package=package,
+                )
+                if slots:
+                    create_booking_intent(user=client, service=service, package=package)
+                    return target_date, self.rng.choice(slots), package
+            raise CommandError("No se encontraron horarios libres para medir confirm_booking.")
+
+        return {
+            "get_available_slots": self._measure(
+                dataset,
+                "get_available_slots",
+                day_args,
+                lambda service, package, target_date: get_available_slots(
+                    service=service,
+                    target_date=target_date,
+                    duration_minutes=duration,
+                    booking_interval_minutes=interval,
+                    package=package,
+                ),
+            ),
+            "get_day_availability_status": self._measure(
+                dataset,
+                "get_day_availability_status",
+                day_args,
+                lambda service, package, target_date: get_day_availability_status(
+                    service=service,
+                    target_date=target_date,
+                    duration_minutes=duration,
+                    booking_interval_minutes=interval,
+                    package=package,
+                ),
+            ),
+            "get_available_days": self._measure(
+                dataset,
+                "get_available_days",
+                month_args,
+                lambda target_date, package: get_available_days(
+                    client.booking_token,
+                    year=target_date.year,
+                    month=target_date.month,
+                    package_id=package.id,
+                ),
+            ),
+            "is_slot_available": self._measure(
+                dataset,
+                "is_slot_available",
+                slot_args,
+                lambda service, package, target_date, target_time: is_slot_available(
+                    service=service,
+                    target_date=target_date,
+                    target_time=target_time,
+                    duration_minutes=duration,
+                    booking_interval_minutes=interval,
+                    package=package,
+                ),
+            ),
+            "confirm_booking": self._measure(
+                dataset,
+                "confirm_booking",
+                confirm_args,
+                lambda target_date, target_time, package: confirm_booking(
+                    token=client.booking_token,
+                    target_date=target_date.isoformat(),
+                    target_time=target_time.strftime("%H:%M"),
+                    package_id=package.id,
+                    customer_name="Benchmark",
+                    customer_phone=client.phone_number,
+                ),
+            ),
+        }
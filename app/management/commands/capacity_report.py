@@ -0,0 +1,46 @@
+import json
+import time as perf
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.models import Service
+from app.services.interval_engine import ENGINES, build_capacity_report, resolve_engine
+
+
+class Command(BaseCommand):
+    help = "Reporte mensual de capacidad (horarios libres, días llenos, minutos reservados) por servicio."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Fecha inicial YYYY-MM-DD (por defecto hoy).")
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--service", type=int, nargs="*", default=None, help="IDs de servicio (por defecto todos los activos).")
+        parser.add_argument("--engine", choices=ENGINES, default="auto")
+        parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options["start"]) if options["start"] else timezone.localdate()
+        except ValueError as exc:
+            raise CommandError(f"Fecha inválida: {exc}") from exc
+        end_date = start_date + timedelta(days=max(options["days"], 1) - 1)
+
+        services = Service.objects.filter(is_active=True)
+        if options["service"]:
+            services = Service.objects.filter(id__in=options["service"])
+
+        engine = resolve_engine(options["engine"])
+        started = perf.perf_counter()
+        report = build_capacity_report(list(services.order_by("name", "id")), start_date, end_date, engine=engine)
+        elapsed_ms = (perf.perf_counter() - started) * 1000
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"engine": engine, "elapsed_ms": round(elapsed_ms, 2), "rows": report}, indent=2))
+            return
+        for row in report:
+            self.stdout.write(
+                f"{row['service_name']:30} {row['month']} días={row['open_days']:3} llenos={row['full_days']:3} "
+                f"libres={row['available_slots']:5} reservado={row['booked_minutes']}min"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Motor {engine}: {elapsed_ms:.1f} ms ({start_date} a {end_date})."))
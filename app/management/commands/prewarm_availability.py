@@ -0,0 +1,56 @@
+import time as perf
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from app.services.availability_cache import LocalLRUBackend, get_availability_cache
+from app.services.availability_prewarm import prewarm_invalidated_days
+
+
+class Command(BaseCommand):
+    help = "Pre-calcula la disponibilidad de los próximos días y la guarda en la cache (solo lo invalidado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=60, help="Días a cubrir desde hoy.")
+        parser.add_argument("--service", type=int, nargs="*", default=None, help="IDs de servicio (por defecto todos los activos).")
+        parser.add_argument("--loop", action="store_true", help="Repite la pasada indefinidamente (modo worker).")
+        parser.add_argument("--interval", type=float, default=15, help="Segundos entre pasadas con --loop.")
+
+    def handle(self, *args, **options):
+        if isinstance(get_availability_cache().backend, LocalLRUBackend):
+            self.stderr.write(
+                self.style.WARNING(
+                    "La cache de disponibilidad es local al proceso; para que el servidor web aproveche "
+                    "el pre-calentado usa AVAILABILITY_CACHE_BACKEND=django con una cache compartida."
+                )
+            )
+
+        # La primera pasada revisa toda la ventana; las siguientes solo leen la cola de invalidaciones.
+        cursor = None
+        window_start = None
+        try:
+            while True:
+                start_date = timezone.localdate()
+                if start_date != window_start:
+                    cursor, window_start = None, start_date
+                cursor = self._run_once(options, cursor, start_date)
+                if not options["loop"]:
+                    break
+                perf.sleep(max(options["interval"], 1))
+                close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write("Pre-calentado detenido.")
+
+    def _run_once(self, options, cursor: int | None, start_date) -> int:
+        end_date = start_date + timedelta(days=max(options["days"], 1) - 1)
+        started = perf.perf_counter()
+        result = prewarm_invalidated_days(cursor, start_date, end_date, options["service"])
+        elapsed_ms = (perf.perf_counter() - started) * 1000
+        if result["full"] or result["computed"]:
+            self.stdout.write(
+                f"{timezone.localtime():%H:%M:%S} revisadas={result['checked']} calculadas={result['computed']} "
+                f"servicio-días={result['service_days']} ({elapsed_ms:.1f} ms, {start_date} a {end_date})."
+            )
+        return result["cursor"]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.services.dashboard_service import prune_booking_deletions
+
+
+class Command(BaseCommand):
+    help = "Elimina las marcas de citas borradas más antiguas que la retención del panel (pensado para cron)."
+
+    def handle(self, *args, **options):
+        deleted = prune_booking_deletions()
+        self.stdout.write(self.style.SUCCESS(f"Marcas de borrado eliminadas: {deleted}."))
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.models import Service
+from app.services.slot_inventory import rebuild_inventory
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el inventario materializado de horarios para una ventana de fechas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Fecha inicial YYYY-MM-DD (por defecto hoy).")
+        parser.add_argument("--end", help="Fecha final YYYY-MM-DD.")
+        parser.add_argument("--days", type=int, default=60, help="Días a cubrir cuando no se indica --end.")
+        parser.add_argument("--service", type=int, nargs="*", default=None, help="IDs de servicio (por defecto todos los activos).")
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options["start"]) if options["start"] else timezone.localdate()
+            end_date = (
+                date.fromisoformat(options["end"])
+                if options["end"]
+                else start_date + timedelta(days=max(options["days"], 1) - 1)
+            )
+        except ValueError as exc:
+            raise CommandError(f"Fecha inválida: {exc}") from exc
+        if start_date > end_date:
+            raise CommandError("La fecha inicial no puede ser mayor a la final.")
+
+        services = Service.objects.filter(is_active=True)
+        if options["service"]:
+            services = Service.objects.filter(id__in=options["service"])
+
+        for service in services.order_by("id"):
+            rows = rebuild_inventory(service, start_date, end_date)
+            self.stdout.write(f"{service.name}: {rows} horarios ({start_date} a {end_date}).")
+        self.stdout.write(self.style.SUCCESS("Inventario reconstruido."))
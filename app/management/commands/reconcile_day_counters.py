@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.services.booking_counters import reconcile_day_counters
+
+
+class Command(BaseCommand):
+    help = "Compara los contadores diarios de reservas con las reservas reales y corrige las diferencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Fecha inicial YYYY-MM-DD (por defecto sin límite).")
+        parser.add_argument("--end", help="Fecha final YYYY-MM-DD (por defecto sin límite).")
+        parser.add_argument("--service", type=int, nargs="*", default=None, help="IDs de servicio (por defecto todos).")
+        parser.add_argument("--dry-run", action="store_true", help="Solo reporta las diferencias, sin corregirlas.")
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options["start"]) if options["start"] else None
+            end_date = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as exc:
+            raise CommandError(f"Fecha inválida: {exc}") from exc
+
+        with transaction.atomic():
+            drift = reconcile_day_counters(
+                start_date=start_date,
+                end_date=end_date,
+                service_ids=options["service"],
+                fix=not options["dry_run"],
+            )
+        for row in drift:
+            scope = f"paquete {row['package_id']}" if row["package_id"] else "total"
+            self.stdout.write(
+                f"Servicio {row['service_id']} {row['date']} ({scope}): contador={row['recorded']} real={row['actual']}"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Los contadores coinciden con las reservas."))
+        elif options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} contador(es) con diferencias (sin corregir)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} contador(es) corregidos."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.services.booking_service import sweep_expired_slot_holds
+
+
+class Command(BaseCommand):
+    help = "Elimina en bloque los apartados de horario vencidos (pensado para cron)."
+
+    def handle(self, *args, **options):
+        deleted = sweep_expired_slot_holds()
+        self.stdout.write(self.style.SUCCESS(f"Apartados vencidos eliminados: {deleted}."))
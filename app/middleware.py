@@ -0,0 +1,58 @@
+import random
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from app.services.request_metrics import RequestMetrics, current_request_metrics
+from app.wa_logs import log_metrics
+
+
+def _is_staff(request) -> bool:
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+class RequestMetricsMiddleware:
+    """Asigna request_id a cada petición; mide SQL y HTTP externo para el personal (Server-Timing) y para una muestra (log)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.request_id = uuid.uuid4().hex[:10]
+        staff = _is_staff(request)
+        # El muestreo aplica a todas las peticiones, incluidas las del personal; solo el encabezado es para ellos.
+        sample_rate = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", 0)
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not staff and not sampled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics(request.request_id)
+        token = current_request_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(token)
+
+        if staff:
+            response["Server-Timing"] = metrics.server_timing()
+        if sampled:
+            log_metrics(
+                request.request_id,
+                method=request.method,
+                path=request.path,
+                status=response.status_code,
+                ms=round(metrics.total_ms(), 1),
+                db_queries=metrics.query_count,
+                db_ms=round(metrics.db_ms, 1),
+                slowest_ms=round(metrics.slowest_ms, 1),
+                slowest_sql=" ".join(metrics.slowest_sql.split())[:300],
+                http_calls=metrics.http_calls,
+                http_ms=round(metrics.http_ms, 1),
+            )
+        return response
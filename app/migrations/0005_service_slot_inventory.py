@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_alter_service_booking_interval_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='slot_inventory_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='slot_inventory_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ServiceSlotInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_minute', models.PositiveSmallIntegerField()),
+                ('remaining_capacity', models.PositiveSmallIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slot_inventory', to='app.servicepackage')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_inventory', to='app.service')),
+            ],
+            options={
+                'ordering': ['date', 'start_minute'],
+                'indexes': [models.Index(fields=['service', 'package', 'date', 'start_minute'], name='slot_inv_lookup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+CONSTRAINT_NAME = "booking_no_overlap"
+
+
+def _booking_range(alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    start = f"({prefix}date + {prefix}time)"
+    return f"tsrange({start}, {start} + {prefix}duration_minutes * interval '1 minute', '[)')"
+
+
+FIND_OVERLAPS_SQL = f"""
+    SELECT a.id, b.id
+    FROM app_booking a
+    JOIN app_booking b
+      ON a.service_id = b.service_id
+     AND a.date = b.date
+     AND a.id < b.id
+    WHERE a.status <> 'cancelled'
+      AND b.status <> 'cancelled'
+      AND {_booking_range("a")} && {_booking_range("b")}
+    LIMIT 20
+"""
+
+
+def add_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(FIND_OVERLAPS_SQL)
+        overlaps = cursor.fetchall()
+    if overlaps:
+        pairs = ", ".join(f"{first}/{second}" for first, second in overlaps)
+        raise RuntimeError(
+            f"Hay reservaciones activas que se enciman ({pairs}); cancela o mueve una de cada par antes de migrar."
+        )
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"ALTER TABLE app_booking ADD CONSTRAINT {CONSTRAINT_NAME} "
+        f"EXCLUDE USING gist (service_id WITH =, {_booking_range()} WITH &&) "
+        "WHERE (status <> 'cancelled')"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE app_booking DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_service_slot_inventory'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
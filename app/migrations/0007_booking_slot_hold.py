@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_booking_no_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('duration_minutes', models.PositiveIntegerField(default=60)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slot_holds', to='app.servicepackage')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='app.service')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='app.user')),
+            ],
+            options={
+                'ordering': ['expires_at'],
+                'indexes': [models.Index(fields=['service', 'date', 'expires_at'], name='slot_hold_day_idx'), models.Index(fields=['expires_at'], name='slot_hold_expiry_idx')],
+            },
+        ),
+    ]
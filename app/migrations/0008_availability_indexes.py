@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_booking_slot_hold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'cancelled'), _negated=True), fields=['service', 'date', 'time'], name='booking_active_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service', 'package', 'date'], name='booking_package_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingintent',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='intent_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['user', 'created_at'], name='message_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceexception',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['service', 'date', 'exception_type'], name='exception_active_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceweeklyrange',
+            index=models.Index(fields=['service', 'weekday', 'order_index', 'start_time'], name='weekly_range_day_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:34
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+SPAN_FIELDS = ("service_id", "exception_type", "range_mode", "start_time", "end_time", "max_bookings", "notes", "is_active")
+
+
+def collapse_consecutive_exceptions(apps, schema_editor):
+    ServiceException = apps.get_model("app", "ServiceException")
+    rows = list(ServiceException.objects.filter(end_date__isnull=True, weekday_mask=0).order_by(*SPAN_FIELDS, "date", "id"))
+
+    # Con dos límites el mismo día gana el de id mayor; esos días se dejan tal cual para no alterar la precedencia.
+    limits_per_day: dict[tuple, int] = {}
+    for row in rows:
+        if row.exception_type == "max_bookings":
+            limits_per_day[(row.service_id, row.date)] = limits_per_day.get((row.service_id, row.date), 0) + 1
+
+    def collapsible(row) -> bool:
+        return row.exception_type != "max_bookings" or limits_per_day[(row.service_id, row.date)] == 1
+
+    runs: list[list] = []
+    for row in rows:
+        previous = runs[-1][-1] if runs else None
+        if (
+            previous is not None
+            and collapsible(row)
+            and collapsible(previous)
+            and all(getattr(row, field) == getattr(previous, field) for field in SPAN_FIELDS)
+            and row.date - previous.date <= timedelta(days=1)
+        ):
+            runs[-1].append(row)
+        else:
+            runs.append([row])
+
+    for run in runs:
+        if len(run) < 2:
+            continue
+        first, rest = run[0], run[1:]
+        if run[-1].date != first.date:
+            ServiceException.objects.filter(id=first.id).update(end_date=run[-1].date)
+        ServiceException.objects.filter(id__in=[row.id for row in rest]).delete()
+
+
+def expand_exception_spans(apps, schema_editor):
+    ServiceException = apps.get_model("app", "ServiceException")
+    for span in ServiceException.objects.exclude(end_date__isnull=True, weekday_mask=0):
+        last_date = max(span.end_date or span.date, span.date)
+        dates = []
+        current = span.date
+        while current <= last_date:
+            if not span.weekday_mask or span.weekday_mask & (1 << current.weekday()):
+                dates.append(current)
+            current += timedelta(days=1)
+        if not dates:
+            span.delete()
+            continue
+        ServiceException.objects.bulk_create(
+            ServiceException(
+                service_id=span.service_id,
+                date=current_date,
+                exception_type=span.exception_type,
+                range_mode=span.range_mode,
+                start_time=span.start_time,
+                end_time=span.end_time,
+                max_bookings=span.max_bookings,
+                notes=span.notes,
+                is_active=span.is_active,
+            )
+            for current_date in dates[1:]
+        )
+        ServiceException.objects.filter(id=span.id).update(date=dates[0], end_date=None, weekday_mask=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_availability_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serviceexception',
+            name='end_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='serviceexception',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(collapse_consecutive_exceptions, expand_exception_spans),
+    ]
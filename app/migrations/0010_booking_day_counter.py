@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_day_counters(apps, schema_editor):
+    Booking = apps.get_model("app", "Booking")
+    BookingDayCounter = apps.get_model("app", "BookingDayCounter")
+    active = Booking.objects.exclude(status="cancelled")
+    totals = active.values("service_id", "date").annotate(total=models.Count("id")).order_by()
+    per_package = (
+        active.filter(package__isnull=False)
+        .values("service_id", "package_id", "date")
+        .annotate(total=models.Count("id"))
+        .order_by()
+    )
+    # Misma llave que BookingDayCounter.make_key (los modelos históricos no traen sus métodos).
+    BookingDayCounter.objects.bulk_create(
+        [
+            BookingDayCounter(
+                key=f"{row['service_id']}:{row['date'].isoformat()}:{row.get('package_id') or 0}",
+                service_id=row["service_id"],
+                package_id=row.get("package_id"),
+                date=row["date"],
+                count=row["total"],
+            )
+            for row in [*totals, *per_package]
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_service_exception_span'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDayCounter',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='day_counters', to='app.servicepackage')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_counters', to='app.service')),
+            ],
+            options={
+                'ordering': ['date', 'service', 'package'],
+                'indexes': [models.Index(fields=['service', 'date'], name='day_counter_service_day_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_day_counters, migrations.RunPython.noop),
+    ]
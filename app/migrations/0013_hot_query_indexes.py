@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_booking_delta_sync'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_package_day_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='serviceexception',
+            name='exception_active_day_idx',
+        ),
+        migrations.AddIndex(
+            model_name='serviceexception',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['service', 'id'], name='exception_active_service_idx'),
+        ),
+    ]
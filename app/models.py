@@ -1,6 +1,8 @@
 import uuid
+from datetime import timedelta
 
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -63,6 +65,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="message_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.phone_number} [{self.direction}]"
@@ -88,6 +93,8 @@ class Service(models.Model):
     available_until = models.DateField(null=True, blank=True)
     default_duration_minutes = models.PositiveIntegerField(default=60)
     booking_interval_minutes = models.PositiveIntegerField(default=60)
+    slot_inventory_from = models.DateField(null=True, blank=True)
+    slot_inventory_until = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -134,6 +141,9 @@ class ServiceWeeklyRange(models.Model):
 
     class Meta:
         ordering = ["weekday", "order_index", "start_time"]
+        indexes = [
+            models.Index(fields=["service", "weekday", "order_index", "start_time"], name="weekly_range_day_idx"),
+        ]
 
     def __str__(self):
         return f"{self.service.name} [{self.get_weekday_display()}] {self.start_time}-{self.end_time}"
@@ -151,6 +161,10 @@ class ServiceException(models.Model):
 
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="exceptions")
     date = models.DateField()
+    # Vacío = solo `date`; con valor, la excepción cubre de `date` a `end_date` inclusive.
+    end_date = models.DateField(null=True, blank=True)
+    # Bits por día de la semana (lunes = 1, domingo = 64); 0 aplica todos los días del periodo.
+    weekday_mask = models.PositiveSmallIntegerField(default=0)
     exception_type = models.CharField(max_length=20, choices=ExceptionType.choices)
     range_mode = models.CharField(max_length=20, choices=RangeMode.choices, default=RangeMode.REPLACE)
     start_time = models.TimeField(null=True, blank=True)
@@ -162,10 +176,44 @@ class ServiceException(models.Model):
 
     class Meta:
         ordering = ["date", "id"]
+        indexes = [
+            # ServiceSchedule.compile_many carga todas las excepciones activas de los servicios, por id.
+            models.Index(
+                fields=["service", "id"],
+                name="exception_active_service_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
+        if self.end_date and self.end_date != self.date:
+            return f"{self.service.name} - {self.date} a {self.end_date} ({self.exception_type})"
         return f"{self.service.name} - {self.date} ({self.exception_type})"
 
+    @property
+    def last_date(self):
+        return max(self.end_date or self.date, self.date)
+
+    def applies_on(self, target_date) -> bool:
+        if not self.date <= target_date <= self.last_date:
+            return False
+        return not self.weekday_mask or bool(self.weekday_mask & (1 << target_date.weekday()))
+
+    @property
+    def weekday_mask_label(self) -> str:
+        if not self.weekday_mask:
+            return ""
+        return ", ".join(
+            label[:3] for weekday, label in ServiceWeeklyRange.Weekday.choices if self.weekday_mask & (1 << weekday)
+        )
+
+    def covered_dates(self):
+        current = self.date
+        while current <= self.last_date:
+            if self.applies_on(current):
+                yield current
+            current += timedelta(days=1)
+
 
 class ServicePackage(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="packages")
@@ -189,6 +237,30 @@ class ServicePackage(models.Model):
         return f"{self.service.name} - {self.name}"
 
 
+class ServiceSlotInventory(models.Model):
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="slot_inventory")
+    package = models.ForeignKey(
+        ServicePackage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="slot_inventory",
+    )
+    date = models.DateField()
+    start_minute = models.PositiveSmallIntegerField()
+    remaining_capacity = models.PositiveSmallIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date", "start_minute"]
+        indexes = [
+            models.Index(fields=["service", "package", "date", "start_minute"], name="slot_inv_lookup_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.service.name} - {self.date} +{self.start_minute}min ({self.remaining_capacity})"
+
+
 class Booking(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "Pendiente"
@@ -224,11 +296,92 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ["-date", "-time", "-created_at"]
+        indexes = [
+            # Las consultas de disponibilidad ignoran las canceladas; el índice parcial tampoco las guarda.
+            models.Index(
+                fields=["service", "date", "time"],
+                name="booking_active_day_idx",
+                condition=~models.Q(status="cancelled"),
+            ),
+            # Paginación por llave del panel de citas (dashboard_service.list_dashboard_bookings).
+            models.Index(fields=["date", "time", "id"], name="booking_keyset_idx"),
+            # Delta de cambios del panel (dashboard_service.list_dashboard_booking_changes).
+            models.Index(fields=["updated_at"], name="booking_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.service.name} - {self.date} {self.time}"
 
 
+class BookingDeletion(models.Model):
+    # Registro de citas borradas para que el panel las quite en su sincronización incremental.
+    RETENTION = timedelta(days=7)
+
+    booking_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-deleted_at"]
+
+    def __str__(self):
+        return f"Cita #{self.booking_id} borrada el {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class BookingDayCounter(models.Model):
+    # Reservas no canceladas por servicio y fecha; la fila sin paquete lleva el total del día.
+    # La llave primaria se arma con servicio, fecha y paquete para leer el contador sin buscarlo.
+    key = models.CharField(max_length=40, primary_key=True)
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="day_counters")
+    package = models.ForeignKey(
+        ServicePackage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="day_counters",
+    )
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["date", "service", "package"]
+        indexes = [models.Index(fields=["service", "date"], name="day_counter_service_day_idx")]
+
+    @staticmethod
+    def make_key(service_id: int, target_date, package_id: int | None = None) -> str:
+        return f"{service_id}:{target_date.isoformat()}:{package_id or 0}"
+
+    def __str__(self):
+        scope = self.package.name if self.package_id else "total"
+        return f"{self.service.name} - {self.date} ({scope}): {self.count}"
+
+
+class BookingSlotHold(models.Model):
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="slot_holds")
+    package = models.ForeignKey(
+        ServicePackage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="slot_holds",
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="slot_holds")
+    date = models.DateField()
+    time = models.TimeField()
+    duration_minutes = models.PositiveIntegerField(default=60)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["expires_at"]
+        indexes = [
+            models.Index(fields=["service", "date", "expires_at"], name="slot_hold_day_idx"),
+            models.Index(fields=["expires_at"], name="slot_hold_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.service.name} - {self.date} {self.time} (hasta {self.expires_at})"
+
+
 class BookingIntent(models.Model):
     class Status(models.TextChoices):
         OPEN = "open", "Abierto"
@@ -259,6 +412,9 @@ class BookingIntent(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "status", "-created_at"], name="intent_user_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.phone_number} - {self.service.name} ({self.status})"
@@ -1,8 +1,9 @@
 from django.urls import re_path
 
-from app.consumers import DashboardChatConsumer
+from app.consumers import DashboardBookingConsumer, DashboardChatConsumer
 
 
 websocket_urlpatterns = [
     re_path(r"^ws/chats/$", DashboardChatConsumer.as_asgi()),
+    re_path(r"^ws/bookings/$", DashboardBookingConsumer.as_asgi()),
 ]
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, time
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -7,6 +7,8 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
 
 from app.models import Service, ServiceException, ServicePackage, ServiceWeeklyRange
+from app.services.schedule_impact import find_schedule_conflicts, proposed_exceptions, proposed_weekly_ranges
+from app.services.schedule_validation import default_duration_minutes, validate_schedule
 
 
 def _next_order(queryset) -> int:
@@ -32,22 +34,6 @@ def _parse_float(value: str | None, default: float = 0.0) -> float:
         return default
 
 
-def _find_weekly_overlap_warnings(service: Service) -> list[str]:
-    warnings: list[str] = []
-    for weekday, weekday_label in ServiceWeeklyRange.Weekday.choices:
-        ranges = list(
-            service.weekly_ranges.filter(weekday=weekday).order_by("start_time").values("start_time", "end_time")
-        )
-        for index, current in enumerate(ranges):
-            for candidate in ranges[index + 1 :]:
-                if current["start_time"] < candidate["end_time"] and candidate["start_time"] < current["end_time"]:
-                    warnings.append(
-                        f"Solapamiento en {weekday_label}: {current['start_time']} - {current['end_time']} "
-                        f"con {candidate['start_time']} - {candidate['end_time']}."
-                    )
-    return warnings
-
-
 def _parse_date(value: str | None) -> date | None:
     if not value:
         return None
@@ -57,6 +43,34 @@ def _parse_date(value: str | None) -> date | None:
         return None
 
 
+def _parse_time(value: str | None) -> time | None:
+    if not value:
+        return None
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_weekday_mask(values: list[str]) -> int:
+    mask = 0
+    for value in values:
+        weekday = _parse_int(value, -1)
+        if 0 <= weekday <= 6:
+            mask |= 1 << weekday
+    return mask
+
+
+def _parse_exception_span(request, fallback_date: date | None = None) -> tuple[date | None, date | None, str | None]:
+    start_date = _parse_date(request.POST.get("date")) or fallback_date
+    end_date = _parse_date(request.POST.get("end_date"))
+    if not start_date:
+        return None, None, "La excepción requiere una fecha válida."
+    if end_date and end_date < start_date:
+        return None, None, "La fecha final de la excepción no puede ser menor a la inicial."
+    return start_date, end_date if end_date != start_date else None, None
+
+
 def _validate_service_date_range(
     *,
     availability_type: str,
@@ -81,7 +95,16 @@ def _service_context(service_id: int | None = None) -> dict:
     if selected is None and services:
         selected = services[0]
 
-    overlap_warnings = _find_weekly_overlap_warnings(selected) if selected else []
+    # Con los bloques, excepciones y paquetes ya precargados la validación no hace consultas extra.
+    schedule_warnings = (
+        validate_schedule(
+            selected.weekly_ranges.all(),
+            selected.exceptions.all(),
+            min_duration=default_duration_minutes(selected),
+        )
+        if selected
+        else []
+    )
     return {
         "services": services,
         "selected_service": selected,
@@ -89,10 +112,29 @@ def _service_context(service_id: int | None = None) -> dict:
         "availability_choices": Service.AvailabilityType.choices,
         "exception_type_choices": ServiceException.ExceptionType.choices,
         "exception_range_mode_choices": ServiceException.RangeMode.choices,
-        "overlap_warnings": overlap_warnings,
+        "schedule_warnings": schedule_warnings,
     }
 
 
+def _impact_review(request, service: Service, conflicts: list[dict]):
+    # Si el cambio deja citas futuras fuera del horario, no se guarda: se muestra la lista y el operador
+    # puede reenviar el mismo formulario con confirm_impact para aplicarlo de todos modos.
+    if not conflicts or _is_checked(request.POST.get("confirm_impact")):
+        return None
+    context = _service_context(service.id)
+    context["impact"] = {
+        "action": request.path,
+        "fields": [
+            (name, value)
+            for name in request.POST
+            if name != "csrfmiddlewaretoken"
+            for value in request.POST.getlist(name)
+        ],
+        "conflicts": conflicts,
+    }
+    return render(request, "service_manager.html", context, status=409)
+
+
 @login_required
 def service_manager(request):
     service_id = request.GET.get("service")
@@ -202,8 +244,15 @@ def create_weekly_range(request, service_id: int):
 @login_required
 @require_POST
 def delete_weekly_range(request, range_id: int):
-    weekly_range = get_object_or_404(ServiceWeeklyRange, id=range_id)
+    weekly_range = get_object_or_404(ServiceWeeklyRange.objects.select_related("service"), id=range_id)
     service_id = weekly_range.service_id
+    conflicts = find_schedule_conflicts(
+        weekly_range.service,
+        weekly_ranges=proposed_weekly_ranges(weekly_range.service, remove_id=weekly_range.id),
+    )
+    review = _impact_review(request, weekly_range.service, conflicts)
+    if review:
+        return review
     weekly_range.delete()
     messages.success(request, "Bloque horario eliminado.")
     return redirect(f"/servicios-manager/?service={service_id}")
@@ -212,17 +261,30 @@ def delete_weekly_range(request, range_id: int):
 @login_required
 @require_POST
 def update_weekly_range(request, range_id: int):
-    weekly_range = get_object_or_404(ServiceWeeklyRange, id=range_id)
-    start_time = request.POST.get("start_time") or weekly_range.start_time.strftime("%H:%M")
-    end_time = request.POST.get("end_time") or weekly_range.end_time.strftime("%H:%M")
+    weekly_range = get_object_or_404(ServiceWeeklyRange.objects.select_related("service"), id=range_id)
+    start_time = _parse_time(request.POST.get("start_time") or weekly_range.start_time.strftime("%H:%M"))
+    end_time = _parse_time(request.POST.get("end_time") or weekly_range.end_time.strftime("%H:%M"))
+    if not start_time or not end_time:
+        messages.error(request, "El horario semanal requiere horas válidas (HH:MM).")
+        return redirect(f"/servicios-manager/?service={weekly_range.service_id}")
     if start_time >= end_time:
         messages.error(request, "El horario semanal debe tener inicio menor al fin.")
         return redirect(f"/servicios-manager/?service={weekly_range.service_id}")
 
     weekly_range.weekday = _parse_int(request.POST.get("weekday"), weekly_range.weekday)
     weekly_range.label = (request.POST.get("label") or "").strip()
-    weekly_range.start_time = request.POST.get("start_time") or weekly_range.start_time
-    weekly_range.end_time = request.POST.get("end_time") or weekly_range.end_time
+    weekly_range.start_time = start_time
+    weekly_range.end_time = end_time
+    conflicts = find_schedule_conflicts(
+        weekly_range.service,
+        weekly_ranges=proposed_weekly_ranges(
+            weekly_range.service,
+            upsert=(weekly_range.id, weekly_range.weekday, weekly_range.start_time, weekly_range.end_time),
+        ),
+    )
+    review = _impact_review(request, weekly_range.service, conflicts)
+    if review:
+        return review
     weekly_range.save()
     messages.success(request, "Bloque horario actualizado.")
     return redirect(f"/servicios-manager/?service={weekly_range.service_id}")
@@ -233,16 +295,25 @@ def update_weekly_range(request, range_id: int):
 def create_exception(request, service_id: int):
     service = get_object_or_404(Service, id=service_id)
     exception_type = request.POST.get("exception_type") or ServiceException.ExceptionType.CLOSED
-    start_time = request.POST.get("start_time") or None
-    end_time = request.POST.get("end_time") or None
+    start_time = _parse_time(request.POST.get("start_time"))
+    end_time = _parse_time(request.POST.get("end_time"))
+    if (request.POST.get("start_time") and not start_time) or (request.POST.get("end_time") and not end_time):
+        messages.error(request, "Las horas de la excepción deben tener formato HH:MM.")
+        return redirect(f"/servicios-manager/?service={service.id}")
     if exception_type == ServiceException.ExceptionType.SPECIAL_RANGE:
         if not start_time or not end_time or start_time >= end_time:
             messages.error(request, "La excepción de horario especial requiere inicio y fin válidos.")
             return redirect(f"/servicios-manager/?service={service.id}")
+    exception_date, end_date, error_message = _parse_exception_span(request)
+    if error_message:
+        messages.error(request, error_message)
+        return redirect(f"/servicios-manager/?service={service.id}")
 
-    ServiceException.objects.create(
+    exception = ServiceException(
         service=service,
-        date=request.POST.get("date"),
+        date=exception_date,
+        end_date=end_date,
+        weekday_mask=_parse_weekday_mask(request.POST.getlist("weekdays")),
         exception_type=exception_type,
         range_mode=request.POST.get("range_mode") or ServiceException.RangeMode.REPLACE,
         start_time=start_time,
@@ -251,15 +322,57 @@ def create_exception(request, service_id: int):
         notes=(request.POST.get("notes") or "").strip(),
         is_active=True,
     )
+    conflicts = find_schedule_conflicts(service, exceptions=proposed_exceptions(service, upsert=exception))
+    review = _impact_review(request, service, conflicts)
+    if review:
+        return review
+    exception.save()
     messages.success(request, "Excepción creada.")
     return redirect(f"/servicios-manager/?service={service.id}")
 
 
+@login_required
+@require_POST
+def block_dates(request, service_id: int):
+    service = get_object_or_404(Service, id=service_id)
+    start_date = _parse_date(request.POST.get("start_date"))
+    end_date = _parse_date(request.POST.get("end_date")) or start_date
+    if not start_date or end_date < start_date:
+        messages.error(request, "Indica un periodo válido para bloquear.")
+        return redirect(f"/servicios-manager/?service={service.id}")
+
+    # Un solo registro para todo el periodo, en lugar de una excepción por día.
+    exception = ServiceException(
+        service=service,
+        date=start_date,
+        end_date=end_date if end_date != start_date else None,
+        weekday_mask=_parse_weekday_mask(request.POST.getlist("weekdays")),
+        exception_type=ServiceException.ExceptionType.CLOSED,
+        notes=(request.POST.get("notes") or "").strip(),
+        is_active=True,
+    )
+    conflicts = find_schedule_conflicts(service, exceptions=proposed_exceptions(service, upsert=exception))
+    review = _impact_review(request, service, conflicts)
+    if review:
+        return review
+    exception.save()
+    blocked_days = sum(1 for _ in exception.covered_dates())
+    messages.success(request, f"Fechas bloqueadas: {blocked_days} día(s) del {start_date} al {end_date}.")
+    return redirect(f"/servicios-manager/?service={service.id}")
+
+
 @login_required
 @require_POST
 def delete_exception(request, exception_id: int):
-    exception = get_object_or_404(ServiceException, id=exception_id)
+    exception = get_object_or_404(ServiceException.objects.select_related("service"), id=exception_id)
     service_id = exception.service_id
+    conflicts = find_schedule_conflicts(
+        exception.service,
+        exceptions=proposed_exceptions(exception.service, remove_id=exception.id),
+    )
+    review = _impact_review(request, exception.service, conflicts)
+    if review:
+        return review
     exception.delete()
     messages.success(request, "Excepción eliminada.")
     return redirect(f"/servicios-manager/?service={service_id}")
@@ -268,22 +381,37 @@ def delete_exception(request, exception_id: int):
 @login_required
 @require_POST
 def update_exception(request, exception_id: int):
-    exception = get_object_or_404(ServiceException, id=exception_id)
+    exception = get_object_or_404(ServiceException.objects.select_related("service"), id=exception_id)
     new_exception_type = request.POST.get("exception_type") or exception.exception_type
-    start_time = request.POST.get("start_time") or None
-    end_time = request.POST.get("end_time") or None
+    start_time = _parse_time(request.POST.get("start_time"))
+    end_time = _parse_time(request.POST.get("end_time"))
+    if (request.POST.get("start_time") and not start_time) or (request.POST.get("end_time") and not end_time):
+        messages.error(request, "Las horas de la excepción deben tener formato HH:MM.")
+        return redirect(f"/servicios-manager/?service={exception.service_id}")
     if new_exception_type == ServiceException.ExceptionType.SPECIAL_RANGE:
         if not start_time or not end_time or start_time >= end_time:
             messages.error(request, "La excepción de horario especial requiere inicio y fin válidos.")
             return redirect(f"/servicios-manager/?service={exception.service_id}")
+    exception_date, end_date, error_message = _parse_exception_span(request, fallback_date=exception.date)
+    if error_message:
+        messages.error(request, error_message)
+        return redirect(f"/servicios-manager/?service={exception.service_id}")
 
-    exception.date = request.POST.get("date") or exception.date
+    exception.date = exception_date
+    exception.end_date = end_date
     exception.exception_type = new_exception_type
     exception.range_mode = request.POST.get("range_mode") or exception.range_mode
     exception.start_time = start_time
     exception.end_time = end_time
     exception.max_bookings = _parse_int(request.POST.get("max_bookings")) or None
     exception.notes = (request.POST.get("notes") or "").strip()
+    conflicts = find_schedule_conflicts(
+        exception.service,
+        exceptions=proposed_exceptions(exception.service, upsert=exception),
+    )
+    review = _impact_review(request, exception.service, conflicts)
+    if review:
+        return review
     exception.save()
     messages.success(request, "Excepción actualizada.")
     return redirect(f"/servicios-manager/?service={exception.service_id}")
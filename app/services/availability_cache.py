@@ -0,0 +1,301 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+# Servicio-días invalidados que conserva la cola para el pre-calentado; None en la fecha es el servicio completo.
+JOURNAL_LIMIT = 10000
+
+Invalidation = tuple[int, date | None]
+
+
+class AvailabilityKey(NamedTuple):
+    kind: str
+    service_id: int
+    date: date
+    duration_minutes: int
+    interval_minutes: int
+    package_id: int | None
+
+
+class LocalLRUBackend:
+    """Cache en memoria del proceso con desalojo LRU, caducidad por TIMEOUT e indice por servicio/día."""
+
+    def __init__(self, max_entries: int = 4096, timeout: int | None = 300, **kwargs):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        # Cada entrada guarda (vence_en, valor) con reloj monotónico; None no caduca.
+        self._entries: OrderedDict[AvailabilityKey, tuple[float | None, Any]] = OrderedDict()
+        self._keys_by_day: dict[tuple[int, date], set[AvailabilityKey]] = {}
+        self._days_by_service: dict[int, set[date]] = {}
+        self._journal: deque[Invalidation] = deque(maxlen=JOURNAL_LIMIT)
+        self._journal_seq = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: AvailabilityKey) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._unindex(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: AvailabilityKey, value: Any) -> None:
+        expires_at = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self._keys_by_day.setdefault((key.service_id, key.date), set()).add(key)
+            self._days_by_service.setdefault(key.service_id, set()).add(key.date)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._unindex(evicted)
+
+    def invalidate_day(self, service_id: int, target_date: date) -> None:
+        with self._lock:
+            self._drop_day(service_id, target_date)
+
+    def invalidate_service(self, service_id: int) -> None:
+        with self._lock:
+            for target_date in list(self._days_by_service.get(service_id, ())):
+                self._drop_day(service_id, target_date)
+
+    def record_invalidation(self, service_id: int, target_date: date | None) -> None:
+        with self._lock:
+            self._journal_seq += 1
+            self._journal.append((service_id, target_date))
+
+    def invalidations_since(self, cursor: int | None) -> tuple[int, list[Invalidation] | None]:
+        # None en lugar de la lista: la cola ya no cubre el cursor y hay que revisar todo.
+        with self._lock:
+            current = self._journal_seq
+            if cursor is None or current < cursor or current - cursor > len(self._journal):
+                return current, None
+            return current, list(self._journal)[len(self._journal) - (current - cursor):]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_day.clear()
+            self._days_by_service.clear()
+            # Sin cola que cubra el cursor, el siguiente pre-calentado revisa todo.
+            self._journal.clear()
+            self._journal_seq += 1
+
+    def _drop_day(self, service_id: int, target_date: date) -> None:
+        for key in self._keys_by_day.pop((service_id, target_date), ()):
+            self._entries.pop(key, None)
+        dates = self._days_by_service.get(service_id)
+        if dates is not None:
+            dates.discard(target_date)
+            if not dates:
+                del self._days_by_service[service_id]
+
+    def _unindex(self, key: AvailabilityKey) -> None:
+        day_keys = self._keys_by_day.get((key.service_id, key.date))
+        if day_keys is None:
+            return
+        day_keys.discard(key)
+        if not day_keys:
+            self._drop_day(key.service_id, key.date)
+
+
+class DjangoCacheBackend:
+    """Usa el framework de cache de Django; invalida rotando tokens de generación por servicio y día."""
+
+    def __init__(self, alias: str = "default", timeout: int = 300, key_prefix: str = "availability", **kwargs):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def _service_token_key(self, service_id: int) -> str:
+        return f"{self.key_prefix}:gen:{service_id}"
+
+    def _day_token_key(self, service_id: int, target_date: date) -> str:
+        return f"{self.key_prefix}:gen:{service_id}:{target_date.isoformat()}"
+
+    def _tokens(self, service_id: int, target_date: date) -> tuple[str, str]:
+        token_keys = [self._service_token_key(service_id), self._day_token_key(service_id, target_date)]
+        found = self.cache.get_many(token_keys)
+        tokens = []
+        for token_key in token_keys:
+            token = found.get(token_key)
+            if token is None:
+                # Un token desalojado se regenera, así las entradas anteriores quedan huérfanas.
+                self.cache.add(token_key, uuid.uuid4().hex, None)
+                token = self.cache.get(token_key)
+            tokens.append(token)
+        return tokens[0], tokens[1]
+
+    def _entry_key(self, key: AvailabilityKey) -> str:
+        service_token, day_token = self._tokens(key.service_id, key.date)
+        return (
+            f"{self.key_prefix}:{key.kind}:{key.service_id}:{service_token}:{key.date.isoformat()}:{day_token}:"
+            f"{key.duration_minutes}:{key.interval_minutes}:{key.package_id or 0}"
+        )
+
+    def get(self, key: AvailabilityKey) -> Any:
+        return self.cache.get(self._entry_key(key))
+
+    def set(self, key: AvailabilityKey, value: Any) -> None:
+        self.cache.set(self._entry_key(key), value, self.timeout)
+
+    def invalidate_day(self, service_id: int, target_date: date) -> None:
+        self.cache.set(self._day_token_key(service_id, target_date), uuid.uuid4().hex, None)
+
+    def invalidate_service(self, service_id: int) -> None:
+        self.cache.set(self._service_token_key(service_id), uuid.uuid4().hex, None)
+
+    def _journal_key(self, seq: int | None = None) -> str:
+        return f"{self.key_prefix}:journal" if seq is None else f"{self.key_prefix}:journal:{seq}"
+
+    def record_invalidation(self, service_id: int, target_date: date | None) -> None:
+        # Cola en la cache compartida: un contador atómico y una entrada por invalidación.
+        try:
+            seq = self.cache.incr(self._journal_key())
+        except ValueError:
+            self.cache.add(self._journal_key(), 0, None)
+            seq = self.cache.incr(self._journal_key())
+        self.cache.set(self._journal_key(seq), (service_id, target_date), self.timeout)
+
+    def invalidations_since(self, cursor: int | None) -> tuple[int, list[Invalidation] | None]:
+        current = self.cache.get(self._journal_key()) or 0
+        if cursor is None or current < cursor or current - cursor > JOURNAL_LIMIT:
+            return current, None
+        if current == cursor:
+            return current, []
+        entry_keys = [self._journal_key(seq) for seq in range(cursor + 1, current + 1)]
+        found = self.cache.get_many(entry_keys)
+        if len(found) != len(entry_keys):
+            # Entradas vencidas o aún sin escribir: no se puede saber qué cambió.
+            return current, None
+        return current, [found[entry_key] for entry_key in entry_keys]
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+BACKENDS = {
+    "local": LocalLRUBackend,
+    "django": DjangoCacheBackend,
+}
+
+
+class AvailabilityCache:
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, key: AvailabilityKey) -> Any:
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        # Las entradas calculadas con apartados vigentes caducan cuando vence el primero de ellos.
+        if entry is not None and entry[1] is not None and entry[1] <= timezone.now():
+            entry = None
+        self._count("hits" if entry is not None else "misses")
+        return entry[0] if entry is not None else None
+
+    def contains(self, key: AvailabilityKey) -> bool:
+        # Igual que get pero sin mover los contadores; lo usa el pre-calentado para saber qué falta.
+        if not self.enabled:
+            return False
+        entry = self.backend.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > timezone.now())
+
+    def set(self, key: AvailabilityKey, value: Any, expires_at: datetime | None = None) -> None:
+        if self.enabled:
+            self.backend.set(key, (value, expires_at))
+
+    def invalidate_day(self, service_id: int, target_date: date) -> None:
+        self._count("invalidations")
+        self.backend.invalidate_day(service_id, target_date)
+        if self.enabled:
+            self.backend.record_invalidation(service_id, target_date)
+
+    def invalidate_service(self, service_id: int) -> None:
+        self._count("invalidations")
+        self.backend.invalidate_service(service_id)
+        if self.enabled:
+            self.backend.record_invalidation(service_id, None)
+
+    def invalidations_since(self, cursor: int | None) -> tuple[int, list[Invalidation] | None]:
+        return self.backend.invalidations_since(cursor)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+
+_cache: AvailabilityCache | None = None
+
+
+def _build_cache() -> AvailabilityCache:
+    config = dict(getattr(settings, "AVAILABILITY_CACHE", {}))
+    backend_name = config.pop("BACKEND", "local")
+    enabled = config.pop("ENABLED", True)
+    backend_class = BACKENDS.get(backend_name) or import_string(backend_name)
+    options = {key.lower(): value for key, value in config.items()}
+    return AvailabilityCache(backend_class(**options), enabled=enabled)
+
+
+def get_availability_cache() -> AvailabilityCache:
+    global _cache
+    if _cache is None:
+        _cache = _build_cache()
+    return _cache
+
+
+def reset_availability_cache() -> None:
+    global _cache
+    _cache = None
+
+
+def availability_key(
+    kind: str,
+    *,
+    service_id: int,
+    target_date: date,
+    duration_minutes: int,
+    interval_minutes: int,
+    package_id: int | None,
+) -> AvailabilityKey:
+    return AvailabilityKey(kind, service_id, target_date, duration_minutes, interval_minutes, package_id)
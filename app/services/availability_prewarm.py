@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+
+from app.models import Service, ServicePackage
+from app.services.availability_cache import AvailabilityKey, get_availability_cache
+from app.services.scheduling import DayAvailability, day_cache_key
+from app.services.slot_inventory import inventory_covers
+
+PREWARM_KINDS = ("slots", "status")
+
+PendingKeys = dict[int, list[tuple[date, ServicePackage | None, AvailabilityKey]]]
+
+
+def _prewarm_packages(service: Service) -> list[ServicePackage | None]:
+    # Mismas combinaciones que leen el calendario y el panel: sin paquete y cada paquete activo.
+    return [None, *service.packages.filter(is_active=True).order_by("order_index", "id")]
+
+
+def _day_keys(service: Service, packages: list[ServicePackage | None], target_date: date):
+    for package in packages:
+        duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
+        for kind in PREWARM_KINDS:
+            key = day_cache_key(
+                kind,
+                service=service,
+                target_date=target_date,
+                duration_minutes=duration,
+                booking_interval_minutes=None,
+                package=package,
+            )
+            yield package, key
+
+
+def _compute_pending(services: list[Service], pending: PendingKeys) -> dict:
+    # Una sola carga de la ventana para todos los servicios con faltantes.
+    cache = get_availability_cache()
+    stale_services = [service for service in services if service.id in pending]
+    stale_days: set[tuple[int, date]] = set()
+    if stale_services:
+        windows = DayAvailability.load_windows(
+            stale_services,
+            min(target_date for entries in pending.values() for target_date, _, _ in entries),
+            max(target_date for entries in pending.values() for target_date, _, _ in entries),
+        )
+        for service_id, entries in pending.items():
+            for target_date, package, key in entries:
+                day = windows[service_id][target_date]
+                if key.kind == "slots":
+                    value = day.slots(duration_minutes=key.duration_minutes, package=package)
+                else:
+                    value = day.status(duration_minutes=key.duration_minutes, package=package)
+                cache.set(key, value, day.holds_expire_at)
+                stale_days.add((service_id, target_date))
+    return {
+        "computed": sum(len(entries) for entries in pending.values()),
+        "service_days": len(stale_days),
+    }
+
+
+def prewarm_availability(services: list[Service], start_date: date, end_date: date) -> dict:
+    cache = get_availability_cache()
+    pending: PendingKeys = {}
+    checked = 0
+    for service in services:
+        packages = _prewarm_packages(service)
+        current_date = start_date
+        while current_date <= end_date:
+            # Los días cubiertos por el inventario materializado no pasan por esta cache.
+            if not inventory_covers(service, current_date):
+                for package, key in _day_keys(service, packages, current_date):
+                    checked += 1
+                    if not cache.contains(key):
+                        pending.setdefault(service.id, []).append((current_date, package, key))
+            current_date += timedelta(days=1)
+
+    return {"checked": checked, **_compute_pending(services, pending)}
+
+
+def prewarm_invalidated_days(
+    cursor: int | None,
+    start_date: date,
+    end_date: date,
+    service_ids: list[int] | None = None,
+) -> dict:
+    # Recalcula solo los servicio-días que las señales invalidaron desde el cursor. Sin cursor, o si
+    # la cola ya no lo cubre, hace la pasada completa. Devuelve el cursor para la siguiente vuelta.
+    cache = get_availability_cache()
+    cursor, invalidations = cache.invalidations_since(cursor)
+    services = Service.objects.filter(is_active=True)
+    if service_ids:
+        services = Service.objects.filter(id__in=service_ids)
+    if invalidations is None:
+        result = prewarm_availability(list(services.order_by("id")), start_date, end_date)
+        return {**result, "cursor": cursor, "full": True}
+
+    changed: dict[int, set[date] | None] = {}
+    for service_id, target_date in invalidations:
+        if target_date is None:
+            changed[service_id] = None
+        elif service_id not in changed or changed[service_id] is not None:
+            changed.setdefault(service_id, set()).add(target_date)
+    if not changed:
+        return {"checked": 0, "computed": 0, "service_days": 0, "cursor": cursor, "full": False}
+
+    services = list(services.filter(id__in=list(changed)).order_by("id"))
+    packages: dict[int, list[ServicePackage | None]] = {service.id: [None] for service in services}
+    for package in ServicePackage.objects.filter(service_id__in=list(packages), is_active=True).order_by(
+        "order_index", "id"
+    ):
+        packages[package.service_id].append(package)
+
+    pending: PendingKeys = {}
+    checked = 0
+    for service in services:
+        dates = changed[service.id]
+        if dates is None:
+            dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        for target_date in sorted(dates):
+            if target_date < start_date or target_date > end_date or inventory_covers(service, target_date):
+                continue
+            for package, key in _day_keys(service, packages[service.id], target_date):
+                checked += 1
+                pending.setdefault(service.id, []).append((target_date, package, key))
+
+    return {"checked": checked, **_compute_pending(services, pending), "cursor": cursor, "full": False}
@@ -0,0 +1,133 @@
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from app.models import Booking, BookingDayCounter
+
+CounterKey = tuple[int, int | None, date]
+
+
+def adjust_day_counters(service_id: int, package_id: int | None, target_date: date, delta: int) -> None:
+    # El total del día (sin paquete) y, si aplica, el del paquete; siempre con F() para no perder incrementos concurrentes.
+    for counter_package_id in [None, package_id] if package_id else [None]:
+        key = BookingDayCounter.make_key(service_id, target_date, counter_package_id)
+        counters = BookingDayCounter.objects.filter(pk=key)
+        if counters.update(count=F("count") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                BookingDayCounter.objects.create(
+                    key=key, service_id=service_id, package_id=counter_package_id, date=target_date, count=delta
+                )
+        except IntegrityError:
+            # Otra transacción creó la fila entre el UPDATE y el INSERT.
+            counters.update(count=F("count") + delta)
+
+
+class DayCounts:
+    """Contadores de un servicio-día leídos por llave primaria; cada paquete se consulta una sola vez."""
+
+    def __init__(self, service_id: int, target_date: date):
+        self.service_id = service_id
+        self.date = target_date
+        self._counts: dict[int | None, int] = {}
+
+    def get(self, package_id: int | None = None) -> tuple[int, int]:
+        # (total del día, reservas del paquete) en una consulta, solo por las filas que aún no se leyeron.
+        missing = [counter_package_id for counter_package_id in {None, package_id} if counter_package_id not in self._counts]
+        if missing:
+            found = dict(
+                BookingDayCounter.objects.filter(
+                    pk__in=[BookingDayCounter.make_key(self.service_id, self.date, item) for item in missing]
+                ).values_list("package_id", "count")
+            )
+            for counter_package_id in missing:
+                self._counts[counter_package_id] = found.get(counter_package_id, 0)
+        return self._counts[None], self._counts[package_id] if package_id else 0
+
+
+def get_day_counts(service_id: int, target_date: date, package_id: int | None = None) -> tuple[int, int]:
+    return DayCounts(service_id, target_date).get(package_id)
+
+
+def count_day_bookings(
+    *,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    service_ids: list[int] | None = None,
+) -> dict[CounterKey, int]:
+    bookings = Booking.objects.exclude(status=Booking.Status.CANCELLED)
+    if start_date:
+        bookings = bookings.filter(date__gte=start_date)
+    if end_date:
+        bookings = bookings.filter(date__lte=end_date)
+    if service_ids:
+        bookings = bookings.filter(service_id__in=service_ids)
+
+    counts: dict[CounterKey, int] = {}
+    for row in bookings.values("service_id", "date").annotate(total=Count("id")).order_by():
+        counts[(row["service_id"], None, row["date"])] = row["total"]
+    for row in (
+        bookings.filter(package__isnull=False)
+        .values("service_id", "package_id", "date")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        counts[(row["service_id"], row["package_id"], row["date"])] = row["total"]
+    return counts
+
+
+def reconcile_day_counters(
+    *,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    service_ids: list[int] | None = None,
+    fix: bool = True,
+) -> list[dict]:
+    # Compara los contadores con las reservas reales y, con fix=True, corrige las diferencias.
+    expected = count_day_bookings(start_date=start_date, end_date=end_date, service_ids=service_ids)
+    counters = BookingDayCounter.objects.all()
+    if start_date:
+        counters = counters.filter(date__gte=start_date)
+    if end_date:
+        counters = counters.filter(date__lte=end_date)
+    if service_ids:
+        counters = counters.filter(service_id__in=service_ids)
+    stored = {(counter.service_id, counter.package_id, counter.date): counter for counter in counters}
+
+    drift: list[dict] = []
+    for key in sorted(set(expected) | set(stored), key=lambda item: (item[2], item[0], item[1] or 0)):
+        actual = expected.get(key, 0)
+        counter = stored.get(key)
+        recorded = counter.count if counter else 0
+        if actual == recorded:
+            continue
+        service_id, package_id, target_date = key
+        drift.append(
+            {
+                "service_id": service_id,
+                "package_id": package_id,
+                "date": target_date,
+                "recorded": recorded,
+                "actual": actual,
+            }
+        )
+        if not fix:
+            continue
+        if counter is None:
+            BookingDayCounter.objects.create(
+                key=BookingDayCounter.make_key(service_id, target_date, package_id),
+                service_id=service_id,
+                package_id=package_id,
+                date=target_date,
+                count=actual,
+            )
+        else:
+            BookingDayCounter.objects.filter(pk=counter.pk).update(count=actual)
+    return drift
+
+
+def recount_day(service_id: int, target_date: date) -> None:
+    with transaction.atomic():
+        reconcile_day_counters(start_date=target_date, end_date=target_date, service_ids=[service_id])
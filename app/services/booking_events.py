@@ -0,0 +1,35 @@
+from asgiref.sync import async_to_sync
+from django.db import transaction
+
+BOOKINGS_GROUP = "dashboard_bookings"
+
+
+def _send_booking_event(booking_id: int, deleted: bool) -> None:
+    try:
+        from channels.layers import get_channel_layer
+    except Exception:
+        return
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    # Import diferido: dashboard_service depende de booking_service, que importa app.signals.
+    from app.services.dashboard_service import get_dashboard_booking_row
+
+    # Se serializa al confirmar, así la fila enviada es la que quedó guardada.
+    row = None if deleted else get_dashboard_booking_row(booking_id)
+    async_to_sync(channel_layer.group_send)(
+        BOOKINGS_GROUP,
+        {
+            "type": "booking.event",
+            "event": "booking.deleted" if deleted or row is None else "booking.updated",
+            "booking_id": booking_id,
+            "booking": row,
+        },
+    )
+
+
+def broadcast_booking_change(booking_id: int, *, deleted: bool = False) -> None:
+    # Solo después del commit: si la transacción se revierte, el panel nunca ve el cambio.
+    transaction.on_commit(lambda: _send_booking_event(booking_id, deleted))
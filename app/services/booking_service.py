@@ -1,13 +1,43 @@
 from calendar import monthrange
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from uuid import UUID
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
 
-from app.models import Booking, BookingIntent, Service, ServicePackage, User
-from app.services.scheduling import get_available_slots, get_day_availability_status, is_slot_available
+from app.models import Booking, BookingIntent, BookingSlotHold, Service, ServicePackage, User
+from app.services.scheduling import (
+    active_holds,
+    find_next_available_slots,
+    get_available_slots,
+    get_days_availability_status,
+    get_packages_availability_status,
+    is_slot_available,
+)
+from app.services.slot_inventory import (
+    get_inventory_day_statuses,
+    get_inventory_slots,
+    inventory_covers,
+)
+from app.signals import invalidate_availability_days
+
+
+BOOKING_OVERLAP_CONSTRAINT = "booking_no_overlap"
+
+
+def lock_service_day(service_id: int, target_date: date) -> None:
+    # Serializa solo las reservas del mismo servicio y día; se libera al terminar la transacción.
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [service_id, target_date.toordinal()])
+    else:
+        list(Service.objects.select_for_update().filter(id=service_id).values_list("id", flat=True))
+
+
+def _is_overlap_violation(exc: IntegrityError) -> bool:
+    return BOOKING_OVERLAP_CONSTRAINT in str(exc)
 
 
 def _default_package(service: Service) -> ServicePackage | None:
@@ -137,13 +167,23 @@ def get_available_times(token: UUID | str, target_date: str, package_id: int | N
     _validate_date_in_package_range(package, date_obj)
 
     duration = package.duration_minutes if package and package.duration_minutes else intent.service.default_duration_minutes
-    times = get_available_slots(
-        service=intent.service,
-        target_date=date_obj,
-        duration_minutes=duration,
-        booking_interval_minutes=intent.service.booking_interval_minutes,
-        package=package,
+    times = get_inventory_slots(service=intent.service, target_date=date_obj, package=package)
+    if times is None:
+        times = get_available_slots(
+            service=intent.service,
+            target_date=date_obj,
+            duration_minutes=duration,
+            booking_interval_minutes=intent.service.booking_interval_minutes,
+            package=package,
+        )
+    # El apartado propio cuenta como ocupado en la cache compartida; para su dueño sigue disponible.
+    own_hold = (
+        active_holds(service=intent.service, user=user, date=date_obj, duration_minutes=duration)
+        .values_list("time", flat=True)
+        .first()
     )
+    if own_hold and own_hold not in times:
+        times = sorted([*times, own_hold])
     return {
         "times": [slot.strftime("%H:%M") for slot in times],
         "date": date_obj.isoformat(),
@@ -151,6 +191,104 @@ def get_available_times(token: UUID | str, target_date: str, package_id: int | N
     }
 
 
+MAX_NEXT_AVAILABLE_DAYS = 180
+MAX_NEXT_AVAILABLE_LIMIT = 50
+MAX_RANGE_DAYS = 93
+
+
+def _default_packages(services: list[Service]) -> dict[int, ServicePackage]:
+    # Mismo criterio que _default_package, resuelto con una sola consulta para varios servicios.
+    defaults: dict[int, ServicePackage] = {}
+    packages = ServicePackage.objects.filter(service__in=services, is_active=True).order_by(
+        "service_id", "-is_default", "order_index", "id"
+    )
+    for package in packages:
+        defaults.setdefault(package.service_id, package)
+    return defaults
+
+
+def _next_available_payload(
+    targets: list[tuple[Service, ServicePackage | None]],
+    *,
+    days: int,
+    limit: int,
+) -> dict:
+    if days < 1 or days > MAX_NEXT_AVAILABLE_DAYS:
+        raise ValidationError(f"El horizonte debe estar entre 1 y {MAX_NEXT_AVAILABLE_DAYS} días.")
+    if limit < 1 or limit > MAX_NEXT_AVAILABLE_LIMIT:
+        raise ValidationError(f"El límite debe estar entre 1 y {MAX_NEXT_AVAILABLE_LIMIT} horarios.")
+
+    now = timezone.localtime()
+    start_date = now.date()
+    end_date = start_date + timedelta(days=days - 1)
+    slots = find_next_available_slots(
+        targets=targets,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        not_before=now.time().replace(second=0, microsecond=0),
+    )
+    return {
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "slots": [
+            {
+                "service_id": service.id,
+                "service_name": service.name,
+                "package_id": package.id if package else None,
+                "package_name": package.name if package else None,
+                "date": slot_date.isoformat(),
+                "time": slot_time.strftime("%H:%M"),
+            }
+            for slot_date, slot_time, service, package in slots
+        ],
+    }
+
+
+def find_next_available_times(
+    *,
+    service_id: int | None = None,
+    category: str = "",
+    days: int = 30,
+    limit: int = 5,
+) -> dict:
+    services = Service.objects.filter(is_active=True)
+    if service_id is not None:
+        services = services.filter(id=service_id)
+    elif category:
+        services = services.filter(category__iexact=category)
+    else:
+        raise ValidationError("Debes indicar un servicio o una categoría.")
+
+    services = list(services.order_by("name", "id"))
+    if not services:
+        raise ValidationError("No hay servicios activos que coincidan con la búsqueda.")
+    defaults = _default_packages(services)
+    return _next_available_payload(
+        [(service, defaults.get(service.id)) for service in services],
+        days=days,
+        limit=limit,
+    )
+
+
+def get_next_available_times(
+    token: UUID | str,
+    *,
+    package_id: int | None = None,
+    days: int = 30,
+    limit: int = 5,
+) -> dict:
+    user = get_user_by_booking_token(token)
+    intent = get_open_intent_for_user(user)
+    if not intent:
+        raise ValidationError("No existe una solicitud de reserva activa.")
+
+    package = intent.selected_package
+    if package_id is not None:
+        package = ServicePackage.objects.get(id=package_id, service=intent.service, is_active=True)
+    return _next_available_payload([(intent.service, package)], days=days, limit=limit)
+
+
 def get_available_days(
     token: UUID | str,
     *,
@@ -173,25 +311,33 @@ def get_available_days(
         package = ServicePackage.objects.get(id=package_id, service=intent.service, is_active=True)
 
     days_in_month = monthrange(year, month)[1]
+    duration = package.duration_minutes if package and package.duration_minutes else intent.service.default_duration_minutes
+    inventory_statuses = get_inventory_day_statuses(
+        service=intent.service,
+        start_date=date(year, month, 1),
+        end_date=date(year, month, days_in_month),
+        packages=[package],
+    )
+    if inventory_statuses is not None:
+        month_statuses = inventory_statuses[package.id if package else None]
+    else:
+        month_statuses = get_days_availability_status(
+            service=intent.service,
+            start_date=date(year, month, 1),
+            end_date=date(year, month, days_in_month),
+            duration_minutes=duration,
+            booking_interval_minutes=intent.service.booking_interval_minutes,
+            package=package,
+        )
     day_statuses: dict[str, dict] = {}
-    for day in range(1, days_in_month + 1):
-        current_date = date(year, month, day)
+    for current_date, status_data in month_statuses.items():
         try:
             _validate_date_in_service_range(intent.service, current_date)
             _validate_date_in_package_range(package, current_date)
         except ValidationError:
-            day_statuses[str(day)] = {"status": "out_of_range", "available_slots": 0}
+            day_statuses[str(current_date.day)] = {"status": "out_of_range", "available_slots": 0}
             continue
-
-        duration = package.duration_minutes if package and package.duration_minutes else intent.service.default_duration_minutes
-        status_data = get_day_availability_status(
-            service=intent.service,
-            target_date=current_date,
-            duration_minutes=duration,
-            booking_interval_minutes=intent.service.booking_interval_minutes,
-            package=package,
-        )
-        day_statuses[str(day)] = status_data
+        day_statuses[str(current_date.day)] = status_data
 
     return {
         "year": year,
@@ -200,6 +346,132 @@ def get_available_days(
     }
 
 
+def get_available_range(
+    token: UUID | str,
+    *,
+    start_date: str,
+    end_date: str,
+    package_ids: list[int] | None = None,
+) -> dict:
+    start_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if end_obj < start_obj:
+        raise ValidationError("La fecha final debe ser posterior a la inicial.")
+    if (end_obj - start_obj).days + 1 > MAX_RANGE_DAYS:
+        raise ValidationError(f"El rango no puede exceder {MAX_RANGE_DAYS} días.")
+
+    user = get_user_by_booking_token(token)
+    intent = get_open_intent_for_user(user)
+    if not intent:
+        raise ValidationError("No existe una solicitud de reserva activa.")
+
+    service = intent.service
+    active_packages = service.packages.filter(is_active=True).order_by("order_index", "id")
+    if package_ids:
+        packages = list(active_packages.filter(id__in=package_ids))
+        if len(packages) != len(set(package_ids)):
+            raise ValidationError("Alguno de los paquetes solicitados no existe para este servicio.")
+    else:
+        packages = list(active_packages) or [None]
+
+    # Como get_available_days: si el inventario materializado cubre la ventana se lee de ahí;
+    # solo fuera de él se evalúa el horario compilado.
+    if inventory_covers(service, start_obj, end_obj):
+        statuses = get_inventory_day_statuses(
+            service=service,
+            start_date=start_obj,
+            end_date=end_obj,
+            packages=packages,
+        )
+    else:
+        statuses = get_packages_availability_status(
+            service=service,
+            start_date=start_obj,
+            end_date=end_obj,
+            packages=packages,
+        )
+    payload: dict[str, dict] = {}
+    for package in packages:
+        package_days: dict[str, dict] = {}
+        for current_date, status_data in statuses[package.id if package else None].items():
+            try:
+                _validate_date_in_service_range(service, current_date)
+                _validate_date_in_package_range(package, current_date)
+            except ValidationError:
+                status_data = {"status": "out_of_range", "available_slots": 0}
+            package_days[current_date.isoformat()] = status_data
+        payload[str(package.id) if package else "default"] = package_days
+
+    return {
+        "from": start_obj.isoformat(),
+        "to": end_obj.isoformat(),
+        "packages": payload,
+    }
+
+
+def release_slot_holds(user: User) -> None:
+    holds = BookingSlotHold.objects.filter(user=user)
+    days = set(holds.values_list("service_id", "date"))
+    if days:
+        holds.delete()
+        invalidate_availability_days(days)
+
+
+def sweep_expired_slot_holds() -> int:
+    # Sin receptores de borrado, Django lo resuelve con un solo DELETE.
+    deleted, _ = BookingSlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def hold_slot(
+    token: UUID | str,
+    *,
+    target_date: str,
+    target_time: str,
+    package_id: int | None = None,
+) -> BookingSlotHold:
+    user = get_user_by_booking_token(token)
+    intent = get_open_intent_for_user(user)
+    if not intent:
+        raise ValidationError("No existe una solicitud de reserva activa.")
+
+    date_obj = datetime.strptime(target_date, "%Y-%m-%d").date()
+    time_obj = datetime.strptime(target_time, "%H:%M").time()
+    package = intent.selected_package
+    if package_id is not None:
+        package = ServicePackage.objects.get(id=package_id, service=intent.service, is_active=True)
+
+    _validate_date_in_service_range(intent.service, date_obj)
+    _validate_date_in_package_range(package, date_obj)
+
+    duration = package.duration_minutes if package and package.duration_minutes else intent.service.default_duration_minutes
+    # Los apartados vencidos no se barren aquí: la disponibilidad ya los ignora y el comando
+    # sweep_slot_holds los borra en bloque desde cron.
+    with transaction.atomic():
+        lock_service_day(intent.service.id, date_obj)
+        release_slot_holds(user)
+        available = is_slot_available(
+            service=intent.service,
+            target_date=date_obj,
+            target_time=time_obj,
+            duration_minutes=duration,
+            booking_interval_minutes=intent.service.booking_interval_minutes,
+            package=package,
+            exclude_hold_user_id=user.id,
+        )
+        if not available:
+            raise ValidationError("El horario seleccionado ya no está disponible.")
+        return BookingSlotHold.objects.create(
+            service=intent.service,
+            package=package,
+            user=user,
+            date=date_obj,
+            time=time_obj,
+            duration_minutes=duration,
+            expires_at=timezone.now() + timedelta(minutes=settings.SLOT_HOLD_MINUTES),
+        )
+
+
 def confirm_booking(
     *,
     token: UUID | str,
@@ -231,41 +503,49 @@ def confirm_booking(
     _validate_date_in_package_range(package, date_obj)
 
     duration = package.duration_minutes if package and package.duration_minutes else intent.service.default_duration_minutes
-    available = is_slot_available(
-        service=intent.service,
-        target_date=date_obj,
-        target_time=time_obj,
-        duration_minutes=duration,
-        booking_interval_minutes=intent.service.booking_interval_minutes,
-        package=package,
-    )
-    if not available:
-        raise ValidationError("El horario seleccionado ya no está disponible.")
-
     total_price = package.price if package else 0
     deposit_amount = package.deposit_required if package else 0
 
-    with transaction.atomic():
-        booking = Booking.objects.create(
-            user=user,
-            service=intent.service,
-            package=package,
-            customer_name=customer_name or user.name,
-            customer_phone=customer_phone or user.phone_number,
-            customer_notes=customer_notes,
-            date=date_obj,
-            time=time_obj,
-            duration_minutes=duration,
-            total_price=total_price,
-            deposit_amount=deposit_amount,
-            status=Booking.Status.PENDING,
-            source=source,
-        )
-
-        intent.selected_package = package
-        intent.status = BookingIntent.Status.COMPLETED
-        intent.booking = booking
-        intent.save(update_fields=["selected_package", "status", "booking", "updated_at"])
+    try:
+        with transaction.atomic():
+            lock_service_day(intent.service.id, date_obj)
+            available = is_slot_available(
+                service=intent.service,
+                target_date=date_obj,
+                target_time=time_obj,
+                duration_minutes=duration,
+                booking_interval_minutes=intent.service.booking_interval_minutes,
+                package=package,
+                exclude_hold_user_id=user.id,
+            )
+            if not available:
+                raise ValidationError("El horario seleccionado ya no está disponible.")
+
+            booking = Booking.objects.create(
+                user=user,
+                service=intent.service,
+                package=package,
+                customer_name=customer_name or user.name,
+                customer_phone=customer_phone or user.phone_number,
+                customer_notes=customer_notes,
+                date=date_obj,
+                time=time_obj,
+                duration_minutes=duration,
+                total_price=total_price,
+                deposit_amount=deposit_amount,
+                status=Booking.Status.PENDING,
+                source=source,
+            )
+
+            intent.selected_package = package
+            intent.status = BookingIntent.Status.COMPLETED
+            intent.booking = booking
+            intent.save(update_fields=["selected_package", "status", "booking", "updated_at"])
+            release_slot_holds(user)
+    except IntegrityError as exc:
+        if not _is_overlap_violation(exc):
+            raise
+        raise ValidationError("El horario seleccionado ya no está disponible.") from exc
 
     return booking
 
@@ -281,13 +561,15 @@ def get_available_times_for_manual_booking(
     _validate_date_in_package_range(package, date_obj)
 
     duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
-    slots = get_available_slots(
-        service=service,
-        target_date=date_obj,
-        duration_minutes=duration,
-        booking_interval_minutes=service.booking_interval_minutes,
-        package=package,
-    )
+    slots = get_inventory_slots(service=service, target_date=date_obj, package=package)
+    if slots is None:
+        slots = get_available_slots(
+            service=service,
+            target_date=date_obj,
+            duration_minutes=duration,
+            booking_interval_minutes=service.booking_interval_minutes,
+            package=package,
+        )
     return {"times": [slot.strftime("%H:%M") for slot in slots], "date": date_obj.isoformat()}
 
 
@@ -310,17 +592,6 @@ def create_manual_booking(
     _validate_date_in_package_range(package, date_obj)
 
     duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
-    available = is_slot_available(
-        service=service,
-        target_date=date_obj,
-        target_time=time_obj,
-        duration_minutes=duration,
-        booking_interval_minutes=service.booking_interval_minutes,
-        package=package,
-    )
-    if not available:
-        raise ValidationError("El horario seleccionado no está disponible para este servicio.")
-
     valid_statuses = {choice[0] for choice in Booking.Status.choices}
     if status not in valid_statuses:
         raise ValidationError("Estado de reservación inválido.")
@@ -331,19 +602,37 @@ def create_manual_booking(
     if total_price and deposit_amount > total_price:
         raise ValidationError("El anticipo no puede ser mayor al precio del paquete.")
 
-    booking = Booking.objects.create(
-        user=user,
-        service=service,
-        package=package,
-        customer_name=customer_name.strip(),
-        customer_phone=customer_phone.strip(),
-        customer_notes=customer_notes.strip(),
-        date=date_obj,
-        time=time_obj,
-        duration_minutes=duration,
-        total_price=total_price,
-        deposit_amount=deposit_amount,
-        status=status,
-        source=Booking.Source.DASHBOARD,
-    )
+    try:
+        with transaction.atomic():
+            lock_service_day(service.id, date_obj)
+            available = is_slot_available(
+                service=service,
+                target_date=date_obj,
+                target_time=time_obj,
+                duration_minutes=duration,
+                booking_interval_minutes=service.booking_interval_minutes,
+                package=package,
+            )
+            if not available:
+                raise ValidationError("El horario seleccionado no está disponible para este servicio.")
+
+            booking = Booking.objects.create(
+                user=user,
+                service=service,
+                package=package,
+                customer_name=customer_name.strip(),
+                customer_phone=customer_phone.strip(),
+                customer_notes=customer_notes.strip(),
+                date=date_obj,
+                time=time_obj,
+                duration_minutes=duration,
+                total_price=total_price,
+                deposit_amount=deposit_amount,
+                status=status,
+                source=Booking.Source.DASHBOARD,
+            )
+    except IntegrityError as exc:
+        if not _is_overlap_violation(exc):
+            raise
+        raise ValidationError("El horario seleccionado no está disponible para este servicio.") from exc
     return booking
@@ -1,54 +1,352 @@
-from datetime import datetime, timedelta
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-from app.models import Booking
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, QuerySet, Sum
+from django.utils import timezone
+
+from app.models import Booking, BookingDeletion, ChatConversation
+from app.services.booking_service import BOOKING_OVERLAP_CONSTRAINT, lock_service_day
 from app.services.chat_service import mark_chat_needs_attention, mark_chat_resolved
+from app.services.scheduling import DayAvailability
 
 
-def list_dashboard_bookings() -> list[dict]:
-    bookings = (
-        Booking.objects.select_related("user", "user__chat_conversation", "service", "package")
-        .all()
-        .order_by("date", "time")
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_MAX_PAGE_SIZE = 200
+
+_STATUS_LABELS = dict(Booking.Status.choices)
+_SOURCE_LABELS = dict(Booking.Source.choices)
+_PENDING_CHAT = Q(user__chat_conversation__status="pending")
+
+# Margen de relectura para el delta y máximo de filas antes de pedir al cliente una recarga completa.
+SYNC_OVERLAP = timedelta(seconds=5)
+SYNC_MAX_CHANGES = 500
+
+
+def encode_booking_cursor(booking_date: date, booking_time: time, booking_id: int) -> str:
+    raw = f"{booking_date.isoformat()}|{booking_time.strftime('%H:%M:%S')}|{booking_id}"
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_booking_cursor(cursor: str) -> tuple[date, time, int]:
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_raw, time_raw, id_raw = raw.split("|")
+        return date.fromisoformat(date_raw), time.fromisoformat(time_raw), int(id_raw)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Cursor de paginación inválido.") from exc
+
+
+def _dashboard_status_filter(status_code: str) -> Q:
+    # "Dudas" también incluye las citas no canceladas cuyo chat quedó pendiente; se excluyen de su estado real.
+    if status_code == Booking.Status.DOUBTS:
+        return Q(status=Booking.Status.DOUBTS) | (_PENDING_CHAT & ~Q(status=Booking.Status.CANCELLED))
+    if status_code == Booking.Status.CANCELLED:
+        return Q(status=Booking.Status.CANCELLED)
+    return Q(status=status_code) & ~_PENDING_CHAT
+
+
+_DASHBOARD_FIELDS = (
+    "id",
+    "user_id",
+    "customer_name",
+    "customer_phone",
+    "user__name",
+    "user__phone_number",
+    "user__chat_conversation__status",
+    "service__name",
+    "package__name",
+    "duration_minutes",
+    "date",
+    "time",
+    "status",
+    "source",
+    "total_price",
+    "deposit_amount",
+    "customer_notes",
+)
+
+
+def _filter_dashboard_bookings(
+    bookings: QuerySet,
+    *,
+    statuses: list[str] | None = None,
+    service_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    search: str = "",
+) -> QuerySet:
+    if statuses:
+        status_filter = Q()
+        for status_code in statuses:
+            if status_code not in _STATUS_LABELS:
+                raise ValueError("Estado de reservación inválido.")
+            status_filter |= _dashboard_status_filter(status_code)
+        bookings = bookings.filter(status_filter)
+    if service_id:
+        bookings = bookings.filter(service_id=service_id)
+    if date_from:
+        bookings = bookings.filter(date__gte=date_from)
+    if date_to:
+        bookings = bookings.filter(date__lte=date_to)
+    search = search.strip()
+    if search:
+        bookings = bookings.filter(
+            Q(customer_name__icontains=search)
+            | Q(customer_phone__icontains=search)
+            | Q(user__name__icontains=search)
+            | Q(user__phone_number__icontains=search)
+        )
+    return bookings
+
+
+def _dashboard_row(booking: dict) -> dict:
+    has_pending_chat = booking["user__chat_conversation__status"] == "pending"
+    status_code = booking["status"]
+    status_label = _STATUS_LABELS.get(status_code, status_code)
+    if has_pending_chat and status_code != Booking.Status.CANCELLED:
+        status_code = Booking.Status.DOUBTS
+        status_label = "Dudas"
+    return {
+        "id": booking["id"],
+        "user_name": booking["customer_name"] or booking["user__name"] or "Cliente",
+        "phone_number": booking["customer_phone"] or booking["user__phone_number"],
+        "service": booking["service__name"],
+        "package": booking["package__name"] or "Sin paquete",
+        "duration_minutes": booking["duration_minutes"],
+        "date": booking["date"].isoformat(),
+        "time": booking["time"].strftime("%H:%M"),
+        "status_code": status_code,
+        "status": status_label,
+        "source": _SOURCE_LABELS.get(booking["source"], booking["source"]),
+        "total_price": float(booking["total_price"]),
+        "deposit_amount": float(booking["deposit_amount"]),
+        "customer_notes": booking["customer_notes"] or "",
+        "chat_pending": has_pending_chat,
+        "chat_user_id": booking["user_id"] if has_pending_chat else None,
+    }
+
+
+def get_dashboard_booking_row(booking_id: int) -> dict | None:
+    booking = Booking.objects.filter(id=booking_id).values(*_DASHBOARD_FIELDS).first()
+    return _dashboard_row(booking) if booking else None
+
+
+def encode_sync_cursor(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+def decode_sync_cursor(cursor: str) -> datetime:
+    try:
+        moment = datetime.fromisoformat(cursor)
+    except ValueError as exc:
+        raise ValueError("Cursor de sincronización inválido.") from exc
+    if timezone.is_naive(moment):
+        raise ValueError("Cursor de sincronización inválido.")
+    return moment
+
+
+def list_dashboard_bookings(
+    *,
+    statuses: list[str] | None = None,
+    service_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    search: str = "",
+    cursor: str | None = None,
+    limit: int = DASHBOARD_PAGE_SIZE,
+) -> dict:
+    # Paginación por llave (date, time, id): cada página es un rango del índice, sin OFFSET,
+    # así el costo no crece con el historial. Se proyecta con values() para no construir modelos.
+    limit = max(1, min(limit, DASHBOARD_MAX_PAGE_SIZE))
+    synced_at = timezone.now()
+    bookings = _filter_dashboard_bookings(
+        Booking.objects.all(),
+        statuses=statuses,
+        service_id=service_id,
+        date_from=date_from,
+        date_to=date_to,
+        search=search,
     )
-    rows: list[dict] = []
-    for booking in bookings:
-        chat = getattr(booking.user, "chat_conversation", None)
-        has_pending_chat = chat is not None and chat.status == "pending"
-        status_code = booking.status
-        status_label = booking.get_status_display()
-        if has_pending_chat and booking.status != Booking.Status.CANCELLED:
-            status_code = Booking.Status.DOUBTS
-            status_label = "Dudas"
-        rows.append(
-            {
-                "id": booking.id,
-                "user_name": booking.customer_name or booking.user.name or "Cliente",
-                "phone_number": booking.customer_phone or booking.user.phone_number,
-                "service": booking.service.name,
-                "package": booking.package.name if booking.package else "Sin paquete",
-                "duration_minutes": booking.duration_minutes,
-                "date": booking.date.isoformat(),
-                "time": booking.time.strftime("%H:%M"),
-                "status_code": status_code,
-                "status": status_label,
-                "source": booking.get_source_display(),
-                "total_price": float(booking.total_price),
-                "deposit_amount": float(booking.deposit_amount),
-                "customer_notes": booking.customer_notes or "",
-                "chat_pending": has_pending_chat,
-                "chat_user_id": booking.user_id if has_pending_chat else None,
-            }
+    if cursor:
+        cursor_date, cursor_time, cursor_id = decode_booking_cursor(cursor)
+        bookings = bookings.filter(
+            Q(date__gt=cursor_date)
+            | Q(date=cursor_date, time__gt=cursor_time)
+            | Q(date=cursor_date, time=cursor_time, id__gt=cursor_id)
         )
-    return rows
+
+    page = list(bookings.order_by("date", "time", "id").values(*_DASHBOARD_FIELDS)[: limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    last = page[-1] if page else None
+    return {
+        "bookings": [_dashboard_row(booking) for booking in page],
+        "next_cursor": encode_booking_cursor(last["date"], last["time"], last["id"]) if has_more else None,
+        "sync_cursor": encode_sync_cursor(synced_at),
+    }
+
+
+def prune_booking_deletions() -> int:
+    # Después de RETENTION los clientes atrasados reciben reset, así que esas marcas ya no se consultan.
+    deleted, _ = BookingDeletion.objects.filter(deleted_at__lt=timezone.now() - BookingDeletion.RETENTION).delete()
+    return deleted
+
+
+def list_dashboard_booking_changes(
+    *,
+    since: str,
+    statuses: list[str] | None = None,
+    service_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    search: str = "",
+) -> dict:
+    # Cambios desde el cursor: citas con updated_at (o el estado de su chat) posterior, más las borradas.
+    # Se relee un margen hacia atrás por si una transacción confirmó tarde con una marca anterior;
+    # los parches son idempotentes, así que repetir filas no afecta al cliente.
+    synced_at = timezone.now()
+    since_moment = decode_sync_cursor(since)
+    if since_moment < synced_at - BookingDeletion.RETENTION:
+        return {"reset": True, "changed": [], "removed": [], "sync_cursor": encode_sync_cursor(synced_at)}
+    window_start = since_moment - SYNC_OVERLAP
+
+    # Dos condiciones indexables (updated_at y user_id) en lugar de un JOIN con OR.
+    changed = Booking.objects.filter(
+        Q(updated_at__gt=window_start)
+        | Q(user_id__in=ChatConversation.objects.filter(updated_at__gt=window_start).values("user_id"))
+    )
+    changed_ids = set(changed.values_list("id", flat=True)[: SYNC_MAX_CHANGES + 1])
+    if len(changed_ids) > SYNC_MAX_CHANGES:
+        return {"reset": True, "changed": [], "removed": [], "sync_cursor": encode_sync_cursor(synced_at)}
+
+    rows = list(
+        _filter_dashboard_bookings(
+            Booking.objects.filter(id__in=changed_ids),
+            statuses=statuses,
+            service_id=service_id,
+            date_from=date_from,
+            date_to=date_to,
+            search=search,
+        )
+        .order_by("date", "time", "id")
+        .values(*_DASHBOARD_FIELDS)
+    )
+    matching_ids = {row["id"] for row in rows}
+    deleted_ids = set(
+        BookingDeletion.objects.filter(deleted_at__gt=window_start).values_list("booking_id", flat=True)
+    )
+    return {
+        "reset": False,
+        "changed": [_dashboard_row(row) for row in rows],
+        # Las que ya no pasan los filtros se quitan igual que las borradas.
+        "removed": sorted((changed_ids - matching_ids) | deleted_ids),
+        "sync_cursor": encode_sync_cursor(synced_at),
+    }
+
+
+AGGREGATES_CACHE_PREFIX = "dashboard_aggregates"
+_AGGREGATES_VERSION_KEY = f"{AGGREGATES_CACHE_PREFIX}:version"
+
+
+def invalidate_dashboard_aggregates() -> None:
+    # Cambiar la versión descarta de golpe todas las ventanas guardadas.
+    try:
+        cache.incr(_AGGREGATES_VERSION_KEY)
+    except ValueError:
+        cache.set(_AGGREGATES_VERSION_KEY, 1, None)
+
+
+def _aggregate_columns() -> dict:
+    # Un conteo condicional por estado del panel (con "Dudas" derivado del chat) y los montos sin canceladas.
+    active = ~Q(status=Booking.Status.CANCELLED)
+    columns = {
+        f"count_{status_code}": Count("id", filter=_dashboard_status_filter(status_code))
+        for status_code in _STATUS_LABELS
+    }
+    columns["total"] = Count("id")
+    columns["total_price"] = Sum("total_price", filter=active, default=Decimal("0"))
+    columns["deposit_amount"] = Sum("deposit_amount", filter=active, default=Decimal("0"))
+    return columns
+
+
+def _aggregate_row(row: dict) -> dict:
+    return {
+        "total": row["total"],
+        "by_status": {status_code: row[f"count_{status_code}"] for status_code in _STATUS_LABELS},
+        "total_price": float(row["total_price"]),
+        "deposit_amount": float(row["deposit_amount"]),
+    }
+
+
+def get_dashboard_aggregates(*, date_from: date | None = None, date_to: date | None = None) -> dict:
+    # Dos consultas con GROUP BY (por servicio y por día); el total general se suma de los grupos por servicio.
+    version = cache.get(_AGGREGATES_VERSION_KEY, 0)
+    cache_key = f"{AGGREGATES_CACHE_PREFIX}:{version}:{date_from}:{date_to}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    bookings = Booking.objects.all()
+    if date_from:
+        bookings = bookings.filter(date__gte=date_from)
+    if date_to:
+        bookings = bookings.filter(date__lte=date_to)
+    columns = _aggregate_columns()
+
+    by_service = []
+    totals = {"total": 0, "by_status": dict.fromkeys(_STATUS_LABELS, 0), "total_price": 0.0, "deposit_amount": 0.0}
+    for row in bookings.values("service_id", "service__name").annotate(**columns).order_by("service__name", "service_id"):
+        service_row = {"service_id": row["service_id"], "service": row["service__name"], **_aggregate_row(row)}
+        by_service.append(service_row)
+        totals["total"] += service_row["total"]
+        totals["total_price"] += service_row["total_price"]
+        totals["deposit_amount"] += service_row["deposit_amount"]
+        for status_code, count in service_row["by_status"].items():
+            totals["by_status"][status_code] += count
+    by_day = [
+        {"date": row["date"].isoformat(), **_aggregate_row(row)}
+        for row in bookings.values("date").annotate(**columns).order_by("date")
+    ]
+
+    data = {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "totals": totals,
+        "by_service": by_service,
+        "by_day": by_day,
+    }
+    cache.set(cache_key, data, getattr(settings, "DASHBOARD_AGGREGATES_TTL", 30))
+    return data
 
 
 def update_booking_status(*, booking_id: int, status_code: str) -> Booking:
-    booking = Booking.objects.get(id=booking_id)
+    booking = Booking.objects.select_related("service", "package").get(id=booking_id)
     valid_statuses = {choice[0] for choice in Booking.Status.choices}
     if status_code not in valid_statuses:
         raise ValueError("Estado de reservación inválido.")
-    booking.status = status_code
-    booking.save(update_fields=["status", "updated_at"])
+    was_cancelled = booking.status == Booking.Status.CANCELLED
+    reactivating = was_cancelled and status_code != Booking.Status.CANCELLED
+    try:
+        with transaction.atomic():
+            if reactivating:
+                # Al reactivar una cita cancelada su horario pudo haberse ocupado mientras tanto.
+                lock_service_day(booking.service_id, booking.date)
+                day = DayAvailability.load(booking.service, booking.date)
+                if day.limits_reached(booking.package):
+                    raise ValidationError("Ya no hay cupo para reactivar esta cita en esta fecha.")
+                if not day.is_free(target_time=booking.time, duration_minutes=booking.duration_minutes):
+                    raise ValidationError("El horario de esta cita ya fue ocupado por otra reservación.")
+            booking.status = status_code
+            booking.save(update_fields=["status", "updated_at"])
+    except IntegrityError as exc:
+        if BOOKING_OVERLAP_CONSTRAINT not in str(exc):
+            raise
+        raise ValidationError("El horario de esta cita ya fue ocupado por otra reservación.") from exc
     if status_code == Booking.Status.DOUBTS:
         mark_chat_needs_attention(booking.user)
     elif status_code in {Booking.Status.CONFIRMED, Booking.Status.CANCELLED}:
@@ -58,35 +356,60 @@ def update_booking_status(*, booking_id: int, status_code: str) -> Booking:
     return booking
 
 
-def list_booking_events() -> list[dict]:
-    bookings = Booking.objects.select_related("service", "package").all()
+_EVENT_COLORS = {
+    Booking.Status.PENDING: "#b45309",
+    Booking.Status.CONFIRMED: "#166534",
+    Booking.Status.CANCELLED: "#b91c1c",
+}
+_DEFAULT_EVENT_COLOR = "#0f766e"
+EVENTS_MAX_WINDOW_DAYS = 366
+
+
+def list_booking_events(start_date: date, end_date: date) -> list[dict]:
+    # Solo la ventana visible del calendario [start_date, end_date), usando el índice que empieza por date.
+    if end_date <= start_date:
+        raise ValueError("El fin del rango debe ser posterior al inicio.")
+    if (end_date - start_date).days > EVENTS_MAX_WINDOW_DAYS:
+        raise ValueError(f"El rango no puede exceder {EVENTS_MAX_WINDOW_DAYS} días.")
+
+    bookings = (
+        Booking.objects.filter(date__gte=start_date, date__lt=end_date)
+        .order_by("date", "time", "id")
+        .values(
+            "id",
+            "date",
+            "time",
+            "duration_minutes",
+            "status",
+            "source",
+            "customer_name",
+            "customer_phone",
+            "customer_notes",
+            "service__name",
+            "package__name",
+        )
+    )
     events: list[dict] = []
     for booking in bookings:
-        start_dt = datetime.combine(booking.date, booking.time)
-        end_dt = start_dt + timedelta(minutes=max(booking.duration_minutes, 1))
-        color = "#0f766e"
-        if booking.status == Booking.Status.PENDING:
-            color = "#b45309"
-        elif booking.status == Booking.Status.CONFIRMED:
-            color = "#166534"
-        elif booking.status == Booking.Status.CANCELLED:
-            color = "#b91c1c"
+        start_dt = datetime.combine(booking["date"], booking["time"])
+        end_dt = start_dt + timedelta(minutes=max(booking["duration_minutes"], 1))
+        color = _EVENT_COLORS.get(booking["status"], _DEFAULT_EVENT_COLOR)
         events.append(
             {
-                "id": booking.id,
-                "title": f"{booking.service.name} - {booking.customer_name or 'Cliente'}",
+                "id": booking["id"],
+                "title": f"{booking['service__name']} - {booking['customer_name'] or 'Cliente'}",
                 "start": start_dt.isoformat(),
                 "end": end_dt.isoformat(),
                 "allDay": False,
                 "backgroundColor": color,
                 "borderColor": color,
                 "extendedProps": {
-                    "phone_number": booking.customer_phone,
-                    "status": booking.get_status_display(),
-                    "package": booking.package.name if booking.package else "Sin paquete",
-                    "source": booking.get_source_display(),
-                    "service": booking.service.name,
-                    "notes": booking.customer_notes or "",
+                    "phone_number": booking["customer_phone"],
+                    "status": _STATUS_LABELS.get(booking["status"], booking["status"]),
+                    "package": booking["package__name"] or "Sin paquete",
+                    "source": _SOURCE_LABELS.get(booking["source"], booking["source"]),
+                    "service": booking["service__name"],
+                    "notes": booking["customer_notes"] or "",
                 },
             }
         )
@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+current_request_metrics: ContextVar["RequestMetrics | None"] = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Consultas SQL, tiempo en base de datos y llamadas HTTP externas de una petición."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ""
+        self.http_calls = 0
+        self.http_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Se instala con connection.execute_wrapper: mide cada consulta sin tocar el código que la lanza.
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            self.query_count += 1
+            self.db_ms += elapsed_ms
+            if elapsed_ms > self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_sql = sql
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def server_timing(self) -> str:
+        entries = [
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} consultas"',
+            f"db-slowest;dur={self.slowest_ms:.1f}",
+        ]
+        if self.http_calls:
+            entries.append(f'graph;dur={self.http_ms:.1f};desc="{self.http_calls} llamadas"')
+        entries.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def track_external_call():
+    # Para llamadas HTTP salientes (Graph API); sin métricas activas no hace nada.
+    metrics = current_request_metrics.get()
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.http_calls += 1
+            metrics.http_ms += (time.perf_counter() - started_at) * 1000
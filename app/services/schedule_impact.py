@@ -0,0 +1,114 @@
+import copy
+from bisect import bisect_right
+from datetime import date, time
+
+from django.utils import timezone
+
+from app.models import Booking, Service, ServiceException, ServiceWeeklyRange
+from app.services.scheduling import ServiceSchedule, to_minutes
+
+# Las excepciones nuevas aún no tienen id; se ordenan al final, como si se guardaran ahora.
+_UNSAVED_ID = 2**62
+
+WeeklyRange = tuple[int | None, int, time, time]
+
+
+def proposed_weekly_ranges(
+    service: Service,
+    *,
+    upsert: WeeklyRange | None = None,
+    remove_id: int | None = None,
+) -> list[WeeklyRange]:
+    ranges = [
+        (range_id, weekday, start_time, end_time)
+        for range_id, weekday, start_time, end_time in ServiceWeeklyRange.objects.filter(service=service)
+        .order_by("order_index", "start_time")
+        .values_list("id", "weekday", "start_time", "end_time")
+        if range_id != remove_id and (upsert is None or range_id != upsert[0])
+    ]
+    if upsert is not None:
+        ranges.append(upsert)
+    return ranges
+
+
+def proposed_exceptions(
+    service: Service,
+    *,
+    upsert: ServiceException | None = None,
+    remove_id: int | None = None,
+) -> list[ServiceException]:
+    exceptions = [
+        exception
+        for exception in ServiceException.objects.filter(service=service, is_active=True).order_by("id")
+        if exception.id != remove_id and (upsert is None or exception.id != upsert.id)
+    ]
+    if upsert is not None and upsert.is_active:
+        candidate = copy.copy(upsert)
+        candidate.id = upsert.id or _UNSAVED_ID
+        exceptions.append(candidate)
+    return exceptions
+
+
+def find_schedule_conflicts(
+    service: Service,
+    *,
+    weekly_ranges: list[WeeklyRange] | None = None,
+    exceptions: list[ServiceException] | None = None,
+    from_date: date | None = None,
+) -> list[dict]:
+    # Recorre en una pasada las reservas futuras no canceladas (una consulta, ordenadas por fecha y hora)
+    # contra el horario propuesto; cada fecha se resuelve una vez en bloques ordenados por inicio.
+    weekly_ranges = proposed_weekly_ranges(service) if weekly_ranges is None else weekly_ranges
+    exceptions = proposed_exceptions(service) if exceptions is None else exceptions
+    weekly: dict[int, list[tuple[time, time]]] = {}
+    for _, weekday, start_time, end_time in weekly_ranges:
+        weekly.setdefault(weekday, []).append((start_time, end_time))
+    schedule = ServiceSchedule(service_id=service.id, version=None, weekly_ranges=weekly, exceptions=exceptions)
+
+    bookings = (
+        Booking.objects.filter(service=service, date__gte=from_date or timezone.localdate())
+        .exclude(status=Booking.Status.CANCELLED)
+        .order_by("date", "time", "id")
+        .values_list("id", "date", "time", "duration_minutes", "customer_name", "status")
+    )
+
+    conflicts: list[dict] = []
+    current_date = None
+    blocks: list[tuple[int, int]] = []
+    block_starts: list[int] = []
+    day_limit = None
+    day_count = 0
+    for booking_id, booking_date, booking_time, duration, customer_name, status in bookings:
+        if booking_date != current_date:
+            current_date = booking_date
+            rules = schedule.day(booking_date)
+            # Sin fusionar: igual que iter_free_slots, una cita debe caber completa en un solo bloque.
+            blocks = sorted((to_minutes(start), to_minutes(end)) for start, end in rules.ranges)
+            block_starts = [start for start, _ in blocks]
+            day_limit = rules.max_bookings
+            day_count = 0
+
+        day_count += 1
+        start = to_minutes(booking_time)
+        end = start + max(duration, 1)
+        candidates = blocks[: bisect_right(block_starts, start)]
+        if not blocks:
+            reason = "La fecha queda cerrada o sin horario."
+        elif not any(block_end >= end for _, block_end in candidates):
+            reason = "La cita queda fuera del horario."
+        elif day_limit is not None and day_count > day_limit:
+            reason = f"El día supera el límite de {day_limit} eventos."
+        else:
+            continue
+        conflicts.append(
+            {
+                "booking_id": booking_id,
+                "date": booking_date,
+                "time": booking_time,
+                "duration_minutes": duration,
+                "customer_name": customer_name,
+                "status": status,
+                "reason": reason,
+            }
+        )
+    return conflicts
@@ -0,0 +1,160 @@
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterable, NamedTuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from app.models import Service, ServiceException, ServiceWeeklyRange
+from app.services.scheduling import to_minutes
+
+
+class ScheduleIssue(NamedTuple):
+    kind: str  # overlap | empty | short | add_collision
+    message: str
+
+
+def _weekday_label(weekday: int) -> str:
+    return ServiceWeeklyRange.Weekday(weekday).label
+
+
+def _hours(start, end) -> str:
+    return f"{start:%H:%M} - {end:%H:%M}"
+
+
+def _exception_label(exception: ServiceException) -> str:
+    if exception.last_date != exception.date:
+        return f"La excepción del {exception.date:%d/%m/%Y} al {exception.last_date:%d/%m/%Y}"
+    return f"La excepción del {exception.date:%d/%m/%Y}"
+
+
+def _overlapping_pairs(intervals: list[tuple[int, int, object]]):
+    # Barrido sobre intervalos ordenados por inicio: solo se comparan contra los que siguen abiertos,
+    # así el costo es O(n log n + pares) en lugar de comparar todos contra todos.
+    active: list[tuple[int, int, object]] = []
+    for start, end, item in sorted(intervals, key=lambda interval: (interval[0], interval[1])):
+        if end <= start:
+            continue  # Los bloques vacíos se reportan aparte.
+        active = [interval for interval in active if interval[1] > start]
+        for _, _, previous in active:
+            yield previous, item
+        active.append((start, end, item))
+
+
+def _length_issues(label: str, start, end, min_duration: int | None) -> list[ScheduleIssue]:
+    length = to_minutes(end) - to_minutes(start)
+    if length <= 0:
+        return [ScheduleIssue("empty", f"{label} ({_hours(start, end)}) no tiene duración.")]
+    if min_duration and length < min_duration:
+        return [
+            ScheduleIssue(
+                "short",
+                f"{label} ({_hours(start, end)}) dura {length} min, menos que el paquete predeterminado ({min_duration} min).",
+            )
+        ]
+    return []
+
+
+def _covered_weekdays(exception: ServiceException) -> set[int]:
+    if (exception.last_date - exception.date).days >= 6:
+        weekdays = set(range(7))
+    else:
+        weekdays = {
+            (exception.date + timedelta(days=offset)).weekday()
+            for offset in range((exception.last_date - exception.date).days + 1)
+        }
+    if exception.weekday_mask:
+        weekdays = {weekday for weekday in weekdays if exception.weekday_mask & (1 << weekday)}
+    return weekdays
+
+
+def default_duration_minutes(service: Service) -> int:
+    # Usa los paquetes ya precargados cuando vienen con prefetch_related("packages").
+    packages = sorted(
+        (package for package in service.packages.all() if package.is_active),
+        key=lambda package: (not package.is_default, package.order_index, package.id),
+    )
+    if packages and packages[0].duration_minutes:
+        return packages[0].duration_minutes
+    return service.default_duration_minutes
+
+
+def validate_schedule(
+    weekly_ranges: Iterable[ServiceWeeklyRange],
+    exceptions: Iterable[ServiceException],
+    *,
+    min_duration: int | None = None,
+    from_date: date | None = None,
+) -> list[ScheduleIssue]:
+    from_date = from_date or timezone.localdate()
+    issues: list[ScheduleIssue] = []
+
+    base_by_weekday: dict[int, list[tuple[int, int, ServiceWeeklyRange]]] = {}
+    ordered_ranges = sorted(weekly_ranges, key=lambda item: (item.weekday, item.start_time, item.end_time))
+    for weekday, day_ranges in groupby(ordered_ranges, key=lambda item: item.weekday):
+        label = f"El bloque del {_weekday_label(weekday)}"
+        intervals = []
+        for weekly_range in day_ranges:
+            issues.extend(_length_issues(label, weekly_range.start_time, weekly_range.end_time, min_duration))
+            intervals.append((to_minutes(weekly_range.start_time), to_minutes(weekly_range.end_time), weekly_range))
+        base_by_weekday[weekday] = intervals
+        for current, candidate in _overlapping_pairs(intervals):
+            issues.append(
+                ScheduleIssue(
+                    "overlap",
+                    f"Solapamiento en {_weekday_label(weekday)}: {_hours(current.start_time, current.end_time)} "
+                    f"con {_hours(candidate.start_time, candidate.end_time)}.",
+                )
+            )
+
+    adds_by_weekday: dict[int, list[tuple[int, int, ServiceException]]] = {}
+    for exception in sorted(exceptions, key=lambda item: (item.date, item.id or 0)):
+        if (
+            not exception.is_active
+            or exception.last_date < from_date
+            or exception.exception_type != ServiceException.ExceptionType.SPECIAL_RANGE
+            or not exception.start_time
+            or not exception.end_time
+        ):
+            continue
+        issues.extend(_length_issues(_exception_label(exception), exception.start_time, exception.end_time, min_duration))
+        if exception.range_mode != ServiceException.RangeMode.ADD:
+            continue
+        interval = (to_minutes(exception.start_time), to_minutes(exception.end_time), exception)
+        for weekday in _covered_weekdays(exception):
+            adds_by_weekday.setdefault(weekday, []).append(interval)
+
+    for weekday, add_intervals in sorted(adds_by_weekday.items()):
+        for first, second in _overlapping_pairs(base_by_weekday.get(weekday, []) + add_intervals):
+            # Los cruces entre bloques base ya se reportaron arriba.
+            if isinstance(first, ServiceException) == isinstance(second, ServiceException):
+                continue
+            exception, weekly_range = (first, second) if isinstance(first, ServiceException) else (second, first)
+            issues.append(
+                ScheduleIssue(
+                    "add_collision",
+                    f"{_exception_label(exception)} agrega {_hours(exception.start_time, exception.end_time)}, "
+                    f"que se cruza con el bloque del {_weekday_label(weekday)} "
+                    f"{_hours(weekly_range.start_time, weekly_range.end_time)}.",
+                )
+            )
+    return issues
+
+
+def validate_service_schedule(service: Service, *, from_date: date | None = None) -> list[ScheduleIssue]:
+    from_date = from_date or timezone.localdate()
+    weekly_ranges = list(ServiceWeeklyRange.objects.filter(service=service))
+    exceptions = list(
+        ServiceException.objects.filter(
+            Q(date__gte=from_date) | Q(end_date__gte=from_date),
+            service=service,
+            is_active=True,
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+        )
+    )
+    return validate_schedule(
+        weekly_ranges,
+        exceptions,
+        min_duration=default_duration_minutes(service),
+        from_date=from_date,
+    )
@@ -1,17 +1,26 @@
+from bisect import bisect_right
+from collections.abc import Iterator
 from datetime import date, datetime, time, timedelta
+from functools import cached_property
+from itertools import accumulate
+from typing import NamedTuple
 
-from app.models import Booking, Service, ServiceException, ServicePackage
+from django.utils import timezone
 
+from app.models import Booking, BookingSlotHold, Service, ServiceException, ServicePackage, ServiceWeeklyRange
+from app.services.availability_cache import AvailabilityKey, availability_key, get_availability_cache
+from app.services.booking_counters import DayCounts
 
-def _to_dt(target_date: date, target_time: time) -> datetime:
-    return datetime.combine(target_date, target_time)
 
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
 
-def _overlaps(start_a: datetime, end_a: datetime, start_b: datetime, end_b: datetime) -> bool:
-    return start_a < end_b and start_b < end_a
 
+def from_minutes(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
 
-def _is_service_available_on_date(service: Service, target_date: date) -> bool:
+
+def is_service_available_on_date(service: Service, target_date: date) -> bool:
     if not service.is_active:
         return False
     if service.available_from and target_date < service.available_from:
@@ -21,129 +30,539 @@ def _is_service_available_on_date(service: Service, target_date: date) -> bool:
     return True
 
 
-def _base_ranges(service: Service, target_date: date) -> list[tuple[time, time]]:
-    rows = service.weekly_ranges.filter(weekday=target_date.weekday()).order_by("order_index", "start_time")
-    return [(row.start_time, row.end_time) for row in rows]
-
+def _resolve_ranges(
+    base_ranges: list[tuple[time, time]],
+    exceptions: list[ServiceException],
+) -> list[tuple[time, time]]:
+    if not exceptions:
+        return list(base_ranges)
 
-def _exception_ranges(service: Service, target_date: date) -> list[tuple[time, time]]:
-    exceptions = service.exceptions.filter(date=target_date, is_active=True).order_by("id")
-    if not exceptions.exists():
-        return _base_ranges(service, target_date)
-
-    if exceptions.filter(exception_type=ServiceException.ExceptionType.CLOSED).exists():
+    if any(exception.exception_type == ServiceException.ExceptionType.CLOSED for exception in exceptions):
         return []
 
-    ranges = _base_ranges(service, target_date)
-    replacements = exceptions.filter(
-        exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
-        range_mode=ServiceException.RangeMode.REPLACE,
-    )
-    if replacements.exists():
+    ranges = list(base_ranges)
+    replacements = [
+        exception
+        for exception in exceptions
+        if exception.exception_type == ServiceException.ExceptionType.SPECIAL_RANGE
+        and exception.range_mode == ServiceException.RangeMode.REPLACE
+    ]
+    if replacements:
         ranges = [
             (exception.start_time, exception.end_time)
             for exception in replacements
             if exception.start_time and exception.end_time
         ]
 
-    additions = exceptions.filter(
-        exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
-        range_mode=ServiceException.RangeMode.ADD,
-    )
     ranges.extend(
         (exception.start_time, exception.end_time)
-        for exception in additions
-        if exception.start_time and exception.end_time
+        for exception in exceptions
+        if exception.exception_type == ServiceException.ExceptionType.SPECIAL_RANGE
+        and exception.range_mode == ServiceException.RangeMode.ADD
+        and exception.start_time
+        and exception.end_time
     )
     return ranges
 
 
-def _max_bookings_for_date(service: Service, target_date: date) -> int | None:
-    exception = (
-        service.exceptions.filter(
-            date=target_date,
-            is_active=True,
-            exception_type=ServiceException.ExceptionType.MAX_BOOKINGS,
-        )
-        .order_by("-id")
-        .first()
-    )
-    if not exception:
+def _resolve_max_bookings(exceptions: list[ServiceException]) -> int | None:
+    limits = [
+        exception
+        for exception in exceptions
+        if exception.exception_type == ServiceException.ExceptionType.MAX_BOOKINGS
+    ]
+    if not limits:
         return None
-    return exception.max_bookings
+    return max(limits, key=lambda exception: exception.id).max_bookings
 
 
-def _booked_intervals(service: Service, target_date: date) -> list[tuple[datetime, datetime]]:
-    bookings = (
-        Booking.objects.filter(service=service, date=target_date)
-        .exclude(status=Booking.Status.CANCELLED)
-        .order_by("time")
-    )
-    intervals: list[tuple[datetime, datetime]] = []
-    for booking in bookings:
-        start = _to_dt(target_date, booking.time)
-        end = start + timedelta(minutes=booking.duration_minutes)
-        intervals.append((start, end))
-    return intervals
-
-
-def _bookings_count(service: Service, target_date: date) -> int:
-    return (
-        Booking.objects.filter(service=service, date=target_date)
-        .exclude(status=Booking.Status.CANCELLED)
-        .count()
+class ScheduleDay(NamedTuple):
+    ranges: list[tuple[time, time]]
+    closed: bool
+    max_bookings: int | None
+
+
+def _resolve_day(base_ranges: list[tuple[time, time]], exceptions: list[ServiceException]) -> ScheduleDay:
+    return ScheduleDay(
+        ranges=_resolve_ranges(base_ranges, exceptions),
+        closed=any(exception.exception_type == ServiceException.ExceptionType.CLOSED for exception in exceptions),
+        max_bookings=_resolve_max_bookings(exceptions),
     )
 
 
-def get_available_slots(
+class ExceptionIndex:
+    """Índice de intervalos sobre excepciones que pueden abarcar varios días.
+
+    Se ordenan por fecha inicial y se guarda el máximo acumulado de fecha final; para una fecha
+    solo se recorren hacia atrás las excepciones cuyo alcance todavía puede cubrirla.
+    """
+
+    def __init__(self, exceptions: list[ServiceException]):
+        self.items = sorted(exceptions, key=lambda exception: (exception.date, exception.id))
+        self.starts = [exception.date for exception in self.items]
+        self.reach = list(accumulate((exception.last_date for exception in self.items), max))
+
+    def covering(self, target_date: date) -> list[ServiceException]:
+        found = []
+        index = bisect_right(self.starts, target_date)
+        while index > 0 and self.reach[index - 1] >= target_date:
+            index -= 1
+            if self.items[index].applies_on(target_date):
+                found.append(self.items[index])
+        return sorted(found, key=lambda exception: exception.id)
+
+
+class ServiceSchedule:
+    """Reglas de horario de un servicio compiladas una vez por versión.
+
+    Los rangos semanales quedan indexados por día de la semana y las excepciones activas en un
+    índice de intervalos; cada fecha con excepciones se resuelve (cierre, reemplazo, horarios
+    adicionales y límite diario) la primera vez que se consulta.
+    """
+
+    def __init__(
+        self,
+        *,
+        service_id: int,
+        version: datetime | None,
+        weekly_ranges: dict[int, list[tuple[time, time]]],
+        exceptions: list[ServiceException],
+    ):
+        self.service_id = service_id
+        self.version = version
+        self.weekly_days = {
+            weekday: ScheduleDay(ranges=weekly_ranges.get(weekday, []), closed=False, max_bookings=None)
+            for weekday in range(7)
+        }
+        self.exceptions = ExceptionIndex(exceptions)
+        self._resolved: dict[date, ScheduleDay] = {}
+
+    @classmethod
+    def compile_many(cls, services: list[Service]) -> dict[int, "ServiceSchedule"]:
+        # Dos consultas para todos los servicios, sin importar cuántas fechas cubran sus excepciones.
+        service_ids = [service.id for service in services]
+        weekly_ranges: dict[int, dict[int, list[tuple[time, time]]]] = {}
+        for service_id, weekday, start_time, end_time in (
+            ServiceWeeklyRange.objects.filter(service_id__in=service_ids)
+            .order_by("service_id", "order_index", "start_time")
+            .values_list("service_id", "weekday", "start_time", "end_time")
+        ):
+            weekly_ranges.setdefault(service_id, {}).setdefault(weekday, []).append((start_time, end_time))
+
+        exceptions: dict[int, list[ServiceException]] = {}
+        for exception in ServiceException.objects.filter(service_id__in=service_ids, is_active=True).order_by("id"):
+            exceptions.setdefault(exception.service_id, []).append(exception)
+
+        return {
+            service.id: cls(
+                service_id=service.id,
+                version=service.updated_at,
+                weekly_ranges=weekly_ranges.get(service.id, {}),
+                exceptions=exceptions.get(service.id, []),
+            )
+            for service in services
+        }
+
+    def day(self, target_date: date) -> ScheduleDay:
+        resolved = self._resolved.get(target_date)
+        if resolved is not None:
+            return resolved
+        weekly = self.weekly_days[target_date.weekday()]
+        exceptions = self.exceptions.covering(target_date)
+        if not exceptions:
+            return weekly
+        resolved = _resolve_day(weekly.ranges, exceptions)
+        self._resolved[target_date] = resolved
+        return resolved
+
+
+_schedules: dict[int, ServiceSchedule] = {}
+
+
+def get_service_schedules(services: list[Service]) -> dict[int, ServiceSchedule]:
+    # Cache del proceso: una entrada sirve mientras coincida con el updated_at del servicio, que
+    # los cambios en rangos y excepciones también actualizan (ver app/signals.py).
+    schedules: dict[int, ServiceSchedule] = {}
+    stale: list[Service] = []
+    for service in services:
+        schedule = _schedules.get(service.id)
+        if schedule is not None and schedule.version == service.updated_at:
+            schedules[service.id] = schedule
+        else:
+            stale.append(service)
+    if stale:
+        compiled = ServiceSchedule.compile_many(stale)
+        _schedules.update(compiled)
+        schedules.update(compiled)
+    return schedules
+
+
+def get_service_schedule(service: Service) -> ServiceSchedule:
+    return get_service_schedules([service])[service.id]
+
+
+def invalidate_compiled_schedule(service_id: int) -> None:
+    _schedules.pop(service_id, None)
+
+
+def clear_compiled_schedules() -> None:
+    _schedules.clear()
+
+
+def _merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    # Une intervalos que se tocan o se enciman; un candidato choca con la union
+    # exactamente cuando chocaria con alguno de los intervalos originales.
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def iter_free_slots(
+    ranges: list[tuple[int, int]],
+    taken_intervals: list[tuple[int, int]],
+    duration: int,
+    interval: int,
+) -> Iterator[int]:
+    taken = _merge_intervals(taken_intervals)
+    taken_ends = [end for _, end in taken]
+    for block_start, block_end in ranges:
+        index = bisect_right(taken_ends, block_start)
+        current = block_start
+        while current + duration <= block_end:
+            while index < len(taken) and taken[index][1] <= current:
+                index += 1
+            if index < len(taken) and taken[index][0] < current + duration:
+                # Salta directo al primer punto de la rejilla que ya no choca con este intervalo.
+                steps = -(-(taken[index][1] - current) // interval)
+                current += steps * interval
+                continue
+            yield current
+            current += interval
+
+
+def compute_slots(
+    *,
+    ranges: list[tuple[time, time]],
+    taken_intervals: list[tuple[int, int]],
+    duration_minutes: int,
+    interval_minutes: int,
+) -> list[time]:
+    return [
+        from_minutes(minute)
+        for minute in iter_free_slots(
+            [(to_minutes(start_time), to_minutes(end_time)) for start_time, end_time in ranges],
+            taken_intervals,
+            max(duration_minutes, 1),
+            max(interval_minutes, 5),
+        )
+    ]
+
+
+def day_cache_key(
+    kind: str,
     *,
     service: Service,
     target_date: date,
     duration_minutes: int,
-    booking_interval_minutes: int | None = None,
-    package: ServicePackage | None = None,
-) -> list[time]:
-    if not _is_service_available_on_date(service, target_date):
-        return []
+    booking_interval_minutes: int | None,
+    package: ServicePackage | None,
+) -> AvailabilityKey:
+    return availability_key(
+        kind,
+        service_id=service.id,
+        target_date=target_date,
+        duration_minutes=duration_minutes,
+        interval_minutes=booking_interval_minutes or service.booking_interval_minutes,
+        package_id=package.id if package else None,
+    )
 
-    ranges = _exception_ranges(service, target_date)
-    if not ranges:
-        return []
 
-    day_limit = _max_bookings_for_date(service, target_date)
-    if day_limit is not None and _bookings_count(service, target_date) >= day_limit:
-        return []
+def active_holds(exclude_user_id: int | None = None, **filters):
+    holds = BookingSlotHold.objects.filter(expires_at__gt=timezone.now(), **filters)
+    if exclude_user_id is not None:
+        holds = holds.exclude(user_id=exclude_user_id)
+    return holds
+
+
+class DayAvailability:
+    """Estado de agenda de un servicio en una fecha, resuelto a partir de una sola carga.
+
+    Las reglas del día salen del ServiceSchedule compilado; las reservas no canceladas y los
+    apartados vigentes se consultan una vez y de ellos salen conteos por paquete e intervalos ocupados.
+    """
+
+    def __init__(
+        self,
+        *,
+        service: Service,
+        target_date: date,
+        bookings: list[tuple[time, int, int | None]],
+        holds: list[tuple[time, int, datetime]] | None = None,
+        rules: ScheduleDay | None = None,
+        base_ranges: list[tuple[time, time]] | None = None,
+        exceptions: list[ServiceException] | None = None,
+        counts: DayCounts | None = None,
+    ):
+        self.service = service
+        self.date = target_date
+        self.rules = rules or _resolve_day(base_ranges or [], exceptions or [])
+        self.bookings = bookings
+        self.holds = holds or []
+        self.counts = counts
+
+    @classmethod
+    def load(
+        cls,
+        service: Service,
+        target_date: date,
+        *,
+        include_holds: bool = True,
+        exclude_hold_user_id: int | None = None,
+        counts: DayCounts | None = None,
+    ) -> "DayAvailability":
+        rules = get_service_schedule(service).day(target_date)
+        bookings = list(
+            Booking.objects.filter(service=service, date=target_date)
+            .exclude(status=Booking.Status.CANCELLED)
+            .order_by("time")
+            .values_list("time", "duration_minutes", "package_id")
+        )
+        holds = []
+        if include_holds:
+            holds = list(
+                active_holds(exclude_hold_user_id, service=service, date=target_date).values_list(
+                    "time", "duration_minutes", "expires_at"
+                )
+            )
+        return cls(
+            service=service,
+            target_date=target_date,
+            bookings=bookings,
+            holds=holds,
+            rules=rules,
+            counts=counts or DayCounts(service.id, target_date),
+        )
 
-    if package and package.max_bookings is not None:
-        package_count = (
-            Booking.objects.filter(service=service, package=package, date=target_date)
+    @classmethod
+    def load_window(
+        cls,
+        service: Service,
+        start_date: date,
+        end_date: date,
+        *,
+        include_holds: bool = True,
+    ) -> dict[date, "DayAvailability"]:
+        return cls.load_windows([service], start_date, end_date, include_holds=include_holds)[service.id]
+
+    @classmethod
+    def load_windows(
+        cls,
+        services: list[Service],
+        start_date: date,
+        end_date: date,
+        *,
+        include_holds: bool = True,
+    ) -> dict[int, dict[date, "DayAvailability"]]:
+        # Reservas y apartados de toda la ventana en dos consultas (una sin apartados), sin importar cuántos
+        # días ni cuántos servicios abarque; las reglas salen de los horarios compilados.
+        service_ids = [service.id for service in services]
+        schedules = get_service_schedules(services)
+
+        bookings_by_day: dict[tuple[int, date], list[tuple[time, int, int | None]]] = {}
+        bookings = (
+            Booking.objects.filter(service_id__in=service_ids, date__range=(start_date, end_date))
             .exclude(status=Booking.Status.CANCELLED)
-            .count()
+            .order_by("date", "time")
+            .values_list("service_id", "date", "time", "duration_minutes", "package_id")
+        )
+        for service_id, booking_date, booking_time, booking_duration, package_id in bookings:
+            bookings_by_day.setdefault((service_id, booking_date), []).append(
+                (booking_time, booking_duration, package_id)
+            )
+
+        holds_by_day: dict[tuple[int, date], list[tuple[time, int, datetime]]] = {}
+        if include_holds:
+            holds = active_holds(service_id__in=service_ids, date__range=(start_date, end_date)).values_list(
+                "service_id", "date", "time", "duration_minutes", "expires_at"
+            )
+            for service_id, hold_date, hold_time, hold_duration, expires_at in holds:
+                holds_by_day.setdefault((service_id, hold_date), []).append((hold_time, hold_duration, expires_at))
+
+        windows: dict[int, dict[date, DayAvailability]] = {}
+        for service in services:
+            days = windows.setdefault(service.id, {})
+            current_date = start_date
+            while current_date <= end_date:
+                days[current_date] = cls(
+                    service=service,
+                    target_date=current_date,
+                    bookings=bookings_by_day.get((service.id, current_date), []),
+                    holds=holds_by_day.get((service.id, current_date), []),
+                    rules=schedules[service.id].day(current_date),
+                )
+                current_date += timedelta(days=1)
+        return windows
+
+    @property
+    def in_service_range(self) -> bool:
+        return is_service_available_on_date(self.service, self.date)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.rules.closed
+
+    @property
+    def ranges(self) -> list[tuple[time, time]]:
+        return self.rules.ranges
+
+    @property
+    def day_limit(self) -> int | None:
+        return self.rules.max_bookings
+
+    @cached_property
+    def package_counts(self) -> dict[int | None, int]:
+        counts: dict[int | None, int] = {}
+        for _, _, package_id in self.bookings:
+            counts[package_id] = counts.get(package_id, 0) + 1
+        return counts
+
+    @cached_property
+    def taken_intervals(self) -> list[tuple[int, int]]:
+        return _merge_intervals(
+            [
+                (to_minutes(start_time), to_minutes(start_time) + duration)
+                for start_time, duration, _ in [*self.bookings, *self.holds]
+            ]
         )
-        if package_count >= package.max_bookings:
+
+    @property
+    def holds_expire_at(self) -> datetime | None:
+        return min((expires_at for _, _, expires_at in self.holds), default=None)
+
+    def _interval(self, booking_interval_minutes: int | None) -> int:
+        return booking_interval_minutes or self.service.booking_interval_minutes
+
+    def limits_reached(self, package: ServicePackage | None = None) -> bool:
+        package_limit = package.max_bookings if package else None
+        if self.day_limit is None and package_limit is None:
+            return False
+        if self.counts is not None:
+            total, package_total = self.counts.get(package.id if package else None)
+        else:
+            # Las ventanas de varios días ya traen sus reservas; contarlas ahí no cuesta consultas.
+            total = len(self.bookings)
+            package_total = self.package_counts.get(package.id, 0) if package else 0
+        if self.day_limit is not None and total >= self.day_limit:
+            return True
+        return package_limit is not None and package_total >= package_limit
+
+    def slots(
+        self,
+        *,
+        duration_minutes: int,
+        booking_interval_minutes: int | None = None,
+        package: ServicePackage | None = None,
+    ) -> list[time]:
+        if not self.in_service_range or not self.ranges or self.limits_reached(package):
             return []
+        return compute_slots(
+            ranges=self.ranges,
+            taken_intervals=self.taken_intervals,
+            duration_minutes=duration_minutes,
+            interval_minutes=self._interval(booking_interval_minutes),
+        )
 
-    duration = timedelta(minutes=max(duration_minutes, 1))
-    interval = timedelta(minutes=max(booking_interval_minutes or service.booking_interval_minutes, 5))
-    taken_intervals = _booked_intervals(service, target_date)
-    available: list[time] = []
+    def status(
+        self,
+        *,
+        duration_minutes: int,
+        booking_interval_minutes: int | None = None,
+        package: ServicePackage | None = None,
+    ) -> dict:
+        if not self.in_service_range:
+            return {"status": "out_of_range", "available_slots": 0}
+        if not self.ranges:
+            return {"status": "no_schedule", "available_slots": 0}
+        slots = self.slots(
+            duration_minutes=duration_minutes,
+            booking_interval_minutes=booking_interval_minutes,
+            package=package,
+        )
+        if slots:
+            return {"status": "available", "available_slots": len(slots)}
+        return {"status": "full", "available_slots": 0}
+
+    def is_slot_available(
+        self,
+        *,
+        target_time: time,
+        duration_minutes: int,
+        booking_interval_minutes: int | None = None,
+        package: ServicePackage | None = None,
+    ) -> bool:
+        # Valida un solo candidato sin generar el resto de horarios del día.
+        if target_time.second or target_time.microsecond:
+            return False
+        if not self.in_service_range or self.is_closed:
+            return False
+
+        duration = max(duration_minutes, 1)
+        interval = max(self._interval(booking_interval_minutes), 5)
+        start = to_minutes(target_time)
+        end = start + duration
+        fits_grid = any(
+            to_minutes(start_time) <= start
+            and end <= to_minutes(end_time)
+            and (start - to_minutes(start_time)) % interval == 0
+            for start_time, end_time in self.ranges
+        )
+        if not fits_grid or self.limits_reached(package):
+            return False
+        return self.is_free(target_time=target_time, duration_minutes=duration)
 
-    for start_time, end_time in ranges:
-        block_start = _to_dt(target_date, start_time)
-        block_end = _to_dt(target_date, end_time)
-        current = block_start
-        while current + duration <= block_end:
-            candidate_start = current
-            candidate_end = current + duration
-            collision = any(
-                _overlaps(candidate_start, candidate_end, booked_start, booked_end)
-                for booked_start, booked_end in taken_intervals
-            )
-            if not collision:
-                available.append(candidate_start.time())
-            current += interval
+    def is_free(self, *, target_time: time, duration_minutes: int) -> bool:
+        # Primer intervalo que termina después del inicio del candidato; es el único vecino que puede chocar.
+        start = to_minutes(target_time)
+        end = start + max(duration_minutes, 1)
+        taken = self.taken_intervals
+        index = bisect_right([taken_end for _, taken_end in taken], start)
+        return index == len(taken) or taken[index][0] >= end
 
-    return available
+
+def get_available_slots(
+    *,
+    service: Service,
+    target_date: date,
+    duration_minutes: int,
+    booking_interval_minutes: int | None = None,
+    package: ServicePackage | None = None,
+) -> list[time]:
+    cache = get_availability_cache()
+    key = day_cache_key(
+        "slots",
+        service=service,
+        target_date=target_date,
+        duration_minutes=duration_minutes,
+        booking_interval_minutes=booking_interval_minutes,
+        package=package,
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    day = DayAvailability.load(service, target_date)
+    slots = day.slots(
+        duration_minutes=duration_minutes,
+        booking_interval_minutes=booking_interval_minutes,
+        package=package,
+    )
+    cache.set(key, slots, day.holds_expire_at)
+    return list(slots)
 
 
 def is_slot_available(
@@ -154,15 +573,21 @@ def is_slot_available(
     duration_minutes: int,
     booking_interval_minutes: int | None = None,
     package: ServicePackage | None = None,
+    exclude_hold_user_id: int | None = None,
 ) -> bool:
-    slots = get_available_slots(
-        service=service,
-        target_date=target_date,
+    rules = get_service_schedule(service).day(target_date)
+    counts = DayCounts(service.id, target_date)
+    # Un día o paquete lleno se descarta con los contadores, antes de cargar reservas y apartados.
+    unloaded = DayAvailability(service=service, target_date=target_date, bookings=[], rules=rules, counts=counts)
+    if unloaded.limits_reached(package):
+        return False
+    day = DayAvailability.load(service, target_date, exclude_hold_user_id=exclude_hold_user_id, counts=counts)
+    return day.is_slot_available(
+        target_time=target_time,
         duration_minutes=duration_minutes,
         booking_interval_minutes=booking_interval_minutes,
         package=package,
     )
-    return target_time in slots
 
 
 def get_day_availability_status(
@@ -173,20 +598,148 @@ def get_day_availability_status(
     booking_interval_minutes: int | None = None,
     package: ServicePackage | None = None,
 ) -> dict:
-    if not _is_service_available_on_date(service, target_date):
-        return {"status": "out_of_range", "available_slots": 0}
-
-    ranges = _exception_ranges(service, target_date)
-    if not ranges:
-        return {"status": "no_schedule", "available_slots": 0}
-
-    slots = get_available_slots(
+    cache = get_availability_cache()
+    key = day_cache_key(
+        "status",
         service=service,
         target_date=target_date,
         duration_minutes=duration_minutes,
         booking_interval_minutes=booking_interval_minutes,
         package=package,
     )
-    if slots:
-        return {"status": "available", "available_slots": len(slots)}
-    return {"status": "full", "available_slots": 0}
+    cached = cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    day = DayAvailability.load(service, target_date)
+    status_data = day.status(
+        duration_minutes=duration_minutes,
+        booking_interval_minutes=booking_interval_minutes,
+        package=package,
+    )
+    cache.set(key, status_data, day.holds_expire_at)
+    return dict(status_data)
+
+
+def get_days_availability_status(
+    *,
+    service: Service,
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    booking_interval_minutes: int | None = None,
+    package: ServicePackage | None = None,
+) -> dict[date, dict]:
+    # Solo los días que no estaban en cache se resuelven, con una sola carga de la ventana.
+    cache = get_availability_cache()
+    statuses: dict[date, dict] = {}
+    keys: dict[date, AvailabilityKey] = {}
+    current_date = start_date
+    while current_date <= end_date:
+        keys[current_date] = day_cache_key(
+            "status",
+            service=service,
+            target_date=current_date,
+            duration_minutes=duration_minutes,
+            booking_interval_minutes=booking_interval_minutes,
+            package=package,
+        )
+        cached = cache.get(keys[current_date])
+        if cached is not None:
+            statuses[current_date] = dict(cached)
+        current_date += timedelta(days=1)
+
+    missing = [target_date for target_date in keys if target_date not in statuses]
+    if not missing:
+        return statuses
+
+    days = DayAvailability.load_window(service, missing[0], missing[-1])
+    for current_date in missing:
+        status_data = days[current_date].status(
+            duration_minutes=duration_minutes,
+            booking_interval_minutes=booking_interval_minutes,
+            package=package,
+        )
+        cache.set(keys[current_date], status_data, days[current_date].holds_expire_at)
+        statuses[current_date] = dict(status_data)
+    return dict(sorted(statuses.items()))
+
+
+def get_packages_availability_status(
+    *,
+    service: Service,
+    start_date: date,
+    end_date: date,
+    packages: list[ServicePackage | None],
+) -> dict[int | None, dict[date, dict]]:
+    # Igual que get_days_availability_status pero para varios paquetes: lo que falte en cache
+    # se resuelve con una sola carga de la ventana compartida por todos los paquetes.
+    cache = get_availability_cache()
+    statuses: dict[int | None, dict[date, dict]] = {}
+    pending: list[tuple[ServicePackage | None, date, AvailabilityKey]] = []
+    for package in packages:
+        duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
+        package_statuses = statuses.setdefault(package.id if package else None, {})
+        current_date = start_date
+        while current_date <= end_date:
+            key = day_cache_key(
+                "status",
+                service=service,
+                target_date=current_date,
+                duration_minutes=duration,
+                booking_interval_minutes=None,
+                package=package,
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                package_statuses[current_date] = dict(cached)
+            else:
+                pending.append((package, current_date, key))
+            current_date += timedelta(days=1)
+
+    if pending:
+        days = DayAvailability.load_window(
+            service,
+            min(target_date for _, target_date, _ in pending),
+            max(target_date for _, target_date, _ in pending),
+        )
+        for package, target_date, key in pending:
+            status_data = days[target_date].status(duration_minutes=key.duration_minutes, package=package)
+            cache.set(key, status_data, days[target_date].holds_expire_at)
+            statuses[package.id if package else None][target_date] = dict(status_data)
+    return {package_id: dict(sorted(days.items())) for package_id, days in statuses.items()}
+
+
+def find_next_available_slots(
+    *,
+    targets: list[tuple[Service, ServicePackage | None]],
+    start_date: date,
+    end_date: date,
+    limit: int,
+    not_before: time | None = None,
+) -> list[tuple[date, time, Service, ServicePackage | None]]:
+    # Una sola carga para todos los servicios y todo el horizonte; el recorrido se detiene
+    # en cuanto se juntan `limit` horarios, así que los días restantes nunca se calculan.
+    if not targets or limit <= 0:
+        return []
+    windows = DayAvailability.load_windows([service for service, _ in targets], start_date, end_date)
+
+    found: list[tuple[date, time, Service, ServicePackage | None]] = []
+    current_date = start_date
+    while current_date <= end_date and len(found) < limit:
+        day_slots: list[tuple[time, int, Service, ServicePackage | None]] = []
+        for order, (service, package) in enumerate(targets):
+            if package and (
+                (package.available_from and current_date < package.available_from)
+                or (package.available_until and current_date > package.available_until)
+            ):
+                continue
+            duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
+            for slot in windows[service.id][current_date].slots(duration_minutes=duration, package=package):
+                if current_date == start_date and not_before and slot < not_before:
+                    continue
+                day_slots.append((slot, order, service, package))
+        day_slots.sort(key=lambda item: (item[0], item[1]))
+        found.extend((current_date, slot, service, package) for slot, _, service, package in day_slots)
+        current_date += timedelta(days=1)
+    return found[:limit]
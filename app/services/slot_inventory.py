@@ -0,0 +1,255 @@
+from datetime import date, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from app.models import Service, ServicePackage, ServiceSlotInventory
+from app.services.scheduling import (
+    DayAvailability,
+    active_holds,
+    from_minutes,
+    get_service_schedule,
+    is_service_available_on_date,
+    iter_free_slots,
+    to_minutes,
+)
+
+InventoryKey = tuple[int | None, int]
+
+
+def inventory_covers(service: Service, start_date: date, end_date: date | None = None) -> bool:
+    end_date = end_date or start_date
+    if not service.slot_inventory_from or not service.slot_inventory_until:
+        return False
+    return service.slot_inventory_from <= start_date and end_date <= service.slot_inventory_until
+
+
+def _inventory_packages(service: Service) -> list[ServicePackage | None]:
+    # La fila sin paquete cubre las consultas que no indican paquete.
+    return [None, *service.packages.filter(is_active=True).order_by("order_index", "id")]
+
+
+def _package_covers(package: ServicePackage | None, target_date: date) -> bool:
+    if package is None:
+        return True
+    if package.available_from and target_date < package.available_from:
+        return False
+    if package.available_until and target_date > package.available_until:
+        return False
+    return True
+
+
+def _desired_rows(day: DayAvailability, packages: list[ServicePackage | None]) -> dict[InventoryKey, int]:
+    service = day.service
+    interval = max(service.booking_interval_minutes, 5)
+    rows: dict[InventoryKey, int] = {}
+    if not day.in_service_range:
+        return rows
+    for package in packages:
+        if not _package_covers(package, day.date):
+            continue
+        duration = package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes
+        free_minutes = {to_minutes(slot) for slot in day.slots(duration_minutes=duration, package=package)}
+        candidates = iter_free_slots(
+            [(to_minutes(start_time), to_minutes(end_time)) for start_time, end_time in day.ranges],
+            [],
+            max(duration, 1),
+            interval,
+        )
+        package_id = package.id if package else None
+        for minute in candidates:
+            rows[(package_id, minute)] = 1 if minute in free_minutes else 0
+    return rows
+
+
+def rebuild_inventory(service: Service, start_date: date, end_date: date) -> int:
+    packages = _inventory_packages(service)
+    rows: list[ServiceSlotInventory] = []
+    for current_date, day in DayAvailability.load_window(service, start_date, end_date, include_holds=False).items():
+        rows.extend(
+            ServiceSlotInventory(
+                service=service,
+                package_id=package_id,
+                date=current_date,
+                start_minute=minute,
+                remaining_capacity=capacity,
+            )
+            for (package_id, minute), capacity in _desired_rows(day, packages).items()
+        )
+
+    with transaction.atomic():
+        ServiceSlotInventory.objects.filter(service=service).delete()
+        ServiceSlotInventory.objects.bulk_create(rows, batch_size=1000)
+        Service.objects.filter(id=service.id).update(slot_inventory_from=start_date, slot_inventory_until=end_date)
+    service.slot_inventory_from = start_date
+    service.slot_inventory_until = end_date
+    return len(rows)
+
+
+def refresh_inventory_day(service: Service, target_date: date) -> None:
+    if not inventory_covers(service, target_date):
+        return
+
+    desired = _desired_rows(
+        DayAvailability.load(service, target_date, include_holds=False),
+        _inventory_packages(service),
+    )
+    existing = {
+        (row.package_id, row.start_minute): row
+        for row in ServiceSlotInventory.objects.filter(service=service, date=target_date)
+    }
+
+    now = timezone.now()
+    stale_ids = [row.id for key, row in existing.items() if key not in desired]
+    changed: list[ServiceSlotInventory] = []
+    for key, row in existing.items():
+        if key in desired and row.remaining_capacity != desired[key]:
+            row.remaining_capacity = desired[key]
+            row.updated_at = now
+            changed.append(row)
+    missing = [
+        ServiceSlotInventory(
+            service=service,
+            package_id=package_id,
+            date=target_date,
+            start_minute=minute,
+            remaining_capacity=capacity,
+        )
+        for (package_id, minute), capacity in desired.items()
+        if (package_id, minute) not in existing
+    ]
+
+    with transaction.atomic():
+        if stale_ids:
+            ServiceSlotInventory.objects.filter(id__in=stale_ids).delete()
+        if changed:
+            ServiceSlotInventory.objects.bulk_update(changed, ["remaining_capacity", "updated_at"])
+        if missing:
+            ServiceSlotInventory.objects.bulk_create(missing)
+
+
+def refresh_inventory_days(service: Service, start_date: date, end_date: date | None = None) -> None:
+    # Solo se recorren los días del periodo que caen dentro del inventario materializado.
+    if not service.slot_inventory_from or not service.slot_inventory_until:
+        return
+    current_date = max(start_date, service.slot_inventory_from)
+    last_date = min(max(end_date or start_date, start_date), service.slot_inventory_until)
+    while current_date <= last_date:
+        refresh_inventory_day(service, current_date)
+        current_date += timedelta(days=1)
+
+
+def refresh_inventory_service(service: Service) -> None:
+    if service.slot_inventory_from and service.slot_inventory_until:
+        rebuild_inventory(service, service.slot_inventory_from, service.slot_inventory_until)
+
+
+def _held_intervals(service: Service, start_date: date, end_date: date) -> dict[date, list[tuple[int, int]]]:
+    # El inventario no guarda apartados (vencen sin avisar); se aplican encima al leer.
+    held: dict[date, list[tuple[int, int]]] = {}
+    holds = active_holds(service=service, date__range=(start_date, end_date)).values_list(
+        "date", "time", "duration_minutes"
+    )
+    for hold_date, hold_time, hold_duration in holds:
+        start = to_minutes(hold_time)
+        held.setdefault(hold_date, []).append((start, start + hold_duration))
+    return held
+
+
+def _is_held(minute: int, duration: int, intervals: list[tuple[int, int]]) -> bool:
+    return any(start < minute + duration and minute < end for start, end in intervals)
+
+
+def _package_duration(service: Service, package: ServicePackage | None) -> int:
+    return max(package.duration_minutes if package and package.duration_minutes else service.default_duration_minutes, 1)
+
+
+def get_inventory_slots(
+    *,
+    service: Service,
+    target_date: date,
+    package: ServicePackage | None,
+) -> list[time] | None:
+    if not inventory_covers(service, target_date):
+        return None
+    minutes = (
+        ServiceSlotInventory.objects.filter(
+            service=service,
+            package=package,
+            date=target_date,
+            remaining_capacity__gt=0,
+        )
+        .order_by("start_minute")
+        .values_list("start_minute", flat=True)
+    )
+    held = _held_intervals(service, target_date, target_date).get(target_date, [])
+    duration = _package_duration(service, package)
+    return [from_minutes(minute) for minute in minutes if not _is_held(minute, duration, held)]
+
+
+def _packages_filter(packages: list[ServicePackage | None]) -> Q:
+    package_ids = [package.id for package in packages if package]
+    condition = Q(package_id__in=package_ids)
+    if None in packages:
+        condition |= Q(package__isnull=True)
+    return condition
+
+
+def get_inventory_day_statuses(
+    *,
+    service: Service,
+    start_date: date,
+    end_date: date,
+    packages: list[ServicePackage | None],
+) -> dict[int | None, dict[date, dict]] | None:
+    # Estados por paquete (llave None para el servicio sin paquete) con una sola consulta agrupada.
+    if not inventory_covers(service, start_date, end_date):
+        return None
+    rows = ServiceSlotInventory.objects.filter(
+        _packages_filter(packages),
+        service=service,
+        date__range=(start_date, end_date),
+    )
+    counts = {
+        (row["package_id"], row["date"]): row
+        for row in rows.values("package_id", "date")
+        .annotate(candidates=Count("id"), available=Count("id", filter=Q(remaining_capacity__gt=0)))
+        .order_by()
+    }
+
+    held = _held_intervals(service, start_date, end_date)
+    if held:
+        durations = {package.id if package else None: _package_duration(service, package) for package in packages}
+        for key, row in counts.items():
+            if key[1] in held:
+                row["available"] = 0
+        free_minutes = rows.filter(date__in=list(held), remaining_capacity__gt=0).values_list(
+            "package_id", "date", "start_minute"
+        )
+        for package_id, row_date, minute in free_minutes:
+            if not _is_held(minute, durations[package_id], held[row_date]):
+                counts[(package_id, row_date)]["available"] += 1
+
+    # Un día sin filas puede no tener horario o tener bloques donde no cabe la duración; el horario
+    # compilado (en memoria) los distingue igual que DayAvailability.status.
+    schedule = get_service_schedule(service)
+    statuses: dict[int | None, dict[date, dict]] = {}
+    for package in packages:
+        package_id = package.id if package else None
+        package_statuses: dict[date, dict] = {}
+        current_date = start_date
+        while current_date <= end_date:
+            row = counts.get((package_id, current_date))
+            if not is_service_available_on_date(service, current_date):
+                package_statuses[current_date] = {"status": "out_of_range", "available_slots": 0}
+            elif row is None:
+                status = "full" if schedule.day(current_date).ranges else "no_schedule"
+                package_statuses[current_date] = {"status": status, "available_slots": 0}
+            elif row["available"]:
+                package_statuses[current_date] = {"status": "available", "available_slots": row["available"]}
+            else:
+                package_statuses[current_date] = {"status": "full", "available_slots": 0}
+            current_date += timedelta(days=1)
+        statuses[package_id] = package_statuses
+    return statuses
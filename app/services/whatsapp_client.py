@@ -5,6 +5,7 @@ import time
 import requests
 
 from app.models import Message, User
+from app.services.request_metrics import track_external_call
 from app.wa_logs import log_error, log_event, safe_json
 
 
@@ -75,7 +76,8 @@ def send_messages(
         _save_outgoing(user, payload, sender_role=sender_role)
         t0 = time.time()
         try:
-            response = requests.post(URL, headers=HEADERS, json=payload, timeout=15)
+            with track_external_call():
+                response = requests.post(URL, headers=HEADERS, json=payload, timeout=15)
             elapsed_ms = int((time.time() - t0) * 1000)
             if response.ok:
                 log_event("OUTGOING_OK", request_id, status=response.status_code, ms=elapsed_ms)
@@ -105,7 +107,8 @@ def send_text_message(
         "text": {"body": text},
     }
     try:
-        response = requests.post(URL, headers=HEADERS, json=payload, timeout=15)
+        with track_external_call():
+            response = requests.post(URL, headers=HEADERS, json=payload, timeout=15)
     except requests.RequestException as exc:
         return False, str(exc), None
 
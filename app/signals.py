@@ -0,0 +1,225 @@
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from app.models import Booking, BookingDeletion, BookingSlotHold, ChatConversation, Service, ServiceException, ServicePackage, ServiceWeeklyRange
+from app.services.availability_cache import get_availability_cache
+from app.services.booking_counters import adjust_day_counters, recount_day
+from app.services.booking_events import broadcast_booking_change
+from app.services.scheduling import invalidate_compiled_schedule
+from app.services.slot_inventory import refresh_inventory_days, refresh_inventory_service
+
+
+def _invalidate_now_and_on_commit(callback) -> None:
+    # Se invalida de inmediato y otra vez al confirmar la transacción, para descartar
+    # resultados calculados por otra petición mientras los cambios no eran visibles.
+    callback()
+    transaction.on_commit(callback)
+
+
+def invalidate_availability_days(days: set[tuple[int, object]]) -> None:
+    def callback():
+        cache = get_availability_cache()
+        for service_id, target_date in days:
+            cache.invalidate_day(service_id, target_date)
+
+    _invalidate_now_and_on_commit(callback)
+
+
+def _invalidate_service(service_id: int) -> None:
+    _invalidate_now_and_on_commit(lambda: get_availability_cache().invalidate_service(service_id))
+
+
+_inventory_pending = threading.local()
+
+
+def _refresh_inventory_on_commit(service_id: int | None, start_date=None, end_date=None) -> None:
+    # El inventario materializado se recalcula al confirmar, ya con todos los cambios visibles. Una
+    # transacción suele tocar el mismo día varias veces: el primer callback de cada llave la consume
+    # y los demás no hacen nada. Sin fechas se reconstruye el servicio completo.
+    if service_id is None:
+        return
+    pending = _inventory_pending.__dict__.setdefault("keys", set())
+    key = (service_id, start_date, end_date)
+    pending.add(key)
+
+    def callback():
+        if key not in pending:
+            return
+        pending.discard(key)
+        service = Service.objects.filter(id=service_id).first()
+        if service is None or not service.slot_inventory_from:
+            return
+        if start_date is None:
+            refresh_inventory_service(service)
+        else:
+            refresh_inventory_days(service, start_date, end_date)
+
+    transaction.on_commit(callback)
+
+
+def _span_days(service_id, start_date, end_date=None) -> set[tuple[int, object]]:
+    if service_id is None or start_date is None:
+        return set()
+    last_date = max(end_date or start_date, start_date)
+    return {(service_id, start_date + timedelta(days=offset)) for offset in range((last_date - start_date).days + 1)}
+
+
+def _availability_span(instance) -> tuple:
+    # Las reservas cubren un día; las excepciones pueden abarcar de `date` a `end_date`.
+    return instance.service_id, instance.date, getattr(instance, "end_date", None)
+
+
+def _affected_days(instance) -> set[tuple[int, object]]:
+    days = _span_days(*_availability_span(instance))
+    origin = getattr(instance, "_availability_origin", None)
+    if origin:
+        days |= _span_days(*origin)
+    return days
+
+
+@receiver(post_init, sender=Booking)
+@receiver(post_init, sender=ServiceException)
+def remember_availability_origin(sender, instance, **kwargs):
+    # __dict__ evita disparar consultas cuando el campo viene diferido (.only()).
+    instance._availability_origin = (
+        instance.__dict__.get("service_id"),
+        instance.__dict__.get("date"),
+        instance.__dict__.get("end_date"),
+    )
+
+
+@receiver(post_save, sender=ServiceWeeklyRange)
+@receiver(post_delete, sender=ServiceWeeklyRange)
+@receiver(post_save, sender=ServiceException)
+@receiver(post_delete, sender=ServiceException)
+def bump_service_schedule_version(sender, instance, **kwargs):
+    # El horario compilado se guarda por (servicio, updated_at): tocar updated_at obliga a los demás
+    # procesos a recompilarlo. Va antes que invalidate_day_availability, que sobreescribe el origen.
+    service_ids = {instance.service_id}
+    origin = getattr(instance, "_availability_origin", None)
+    if origin and origin[0] is not None:
+        service_ids.add(origin[0])
+    Service.objects.filter(id__in=service_ids).update(updated_at=timezone.now())
+    for service_id in service_ids:
+        _invalidate_now_and_on_commit(lambda service_id=service_id: invalidate_compiled_schedule(service_id))
+        if sender is ServiceWeeklyRange:
+            _refresh_inventory_on_commit(service_id)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=ServiceException)
+@receiver(post_delete, sender=ServiceException)
+@receiver(post_save, sender=BookingSlotHold)
+def invalidate_day_availability(sender, instance, **kwargs):
+    # Los apartados no tienen receptor de post_delete a propósito: así el barrido de vencidos
+    # se resuelve con un solo DELETE; quien los libera antes de tiempo invalida explícitamente.
+    invalidate_availability_days(_affected_days(instance))
+    if sender is not BookingSlotHold:
+        # El inventario no guarda apartados; solo reservas y excepciones lo cambian.
+        spans = {_availability_span(instance), getattr(instance, "_availability_origin", None) or (None, None, None)}
+        for service_id, start_date, end_date in spans:
+            if start_date is not None:
+                _refresh_inventory_on_commit(service_id, start_date, end_date or start_date)
+    instance._availability_origin = _availability_span(instance)
+
+
+_COUNTER_FIELDS = ("service_id", "package_id", "date", "status")
+_UNKNOWN = object()
+
+
+def _counter_key(values: dict):
+    if any(field not in values for field in _COUNTER_FIELDS):
+        return _UNKNOWN
+    if values["status"] == Booking.Status.CANCELLED:
+        return None
+    return values["service_id"], values["package_id"], values["date"]
+
+
+@receiver(post_init, sender=Booking)
+def remember_counter_origin(sender, instance, **kwargs):
+    # Las instancias nuevas aún no cuentan; las cargadas con campos diferidos quedan como desconocidas.
+    instance._counter_origin = _counter_key(instance.__dict__) if instance.pk else None
+
+
+@receiver(post_save, sender=Booking)
+def sync_day_counters(sender, instance, created, **kwargs):
+    # Corre dentro de la transacción de quien guarda la reserva (confirmación, panel, admin).
+    origin = None if created else getattr(instance, "_counter_origin", _UNKNOWN)
+    current = _counter_key(instance.__dict__)
+    if origin is _UNKNOWN or current is _UNKNOWN:
+        # Con campos diferidos no se sabe qué cambió; se recuenta el día contra las reservas reales.
+        recount_day(instance.service_id, instance.date)
+    elif origin != current:
+        if origin is not None:
+            adjust_day_counters(*origin, delta=-1)
+        if current is not None:
+            adjust_day_counters(*current, delta=1)
+    instance._counter_origin = current
+
+
+@receiver(pre_delete, sender=Booking)
+def load_counter_origin(sender, instance, **kwargs):
+    # Después del DELETE ya no se pueden leer campos diferidos (.only()); se cargan mientras la fila existe,
+    # lo que también le dice a invalidate_day_availability qué día liberar.
+    if getattr(instance, "_counter_origin", _UNKNOWN) is _UNKNOWN:
+        instance._counter_origin = _counter_key({field: getattr(instance, field) for field in _COUNTER_FIELDS})
+
+
+@receiver(post_delete, sender=Booking)
+def release_day_counters(sender, instance, **kwargs):
+    origin = getattr(instance, "_counter_origin", None)
+    if origin is not None:
+        adjust_day_counters(*origin, delta=-1)
+
+
+@receiver(post_delete, sender=Booking)
+def log_booking_deletion(sender, instance, **kwargs):
+    # El panel sincroniza por deltas; sin este registro no sabría que la cita desapareció.
+    # Las marcas viejas las borra el comando prune_booking_deletions (cron), no cada borrado.
+    BookingDeletion.objects.create(booking_id=instance.pk)
+
+
+@receiver(post_save, sender=Booking)
+def push_booking_update(sender, instance, **kwargs):
+    broadcast_booking_change(instance.pk)
+
+
+@receiver(post_delete, sender=Booking)
+def push_booking_deletion(sender, instance, **kwargs):
+    broadcast_booking_change(instance.pk, deleted=True)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=ChatConversation)
+def invalidate_dashboard_totals(sender, instance, **kwargs):
+    # Import diferido por el mismo ciclo que booking_events (dashboard_service -> booking_service -> signals).
+    from app.services.dashboard_service import invalidate_dashboard_aggregates
+
+    _invalidate_now_and_on_commit(invalidate_dashboard_aggregates)
+
+
+@receiver(post_save, sender=ServiceWeeklyRange)
+@receiver(post_delete, sender=ServiceWeeklyRange)
+@receiver(post_save, sender=ServicePackage)
+@receiver(post_delete, sender=ServicePackage)
+def invalidate_service_schedule(sender, instance, **kwargs):
+    _invalidate_service(instance.service_id)
+    if sender is ServicePackage:
+        # Los rangos semanales reconstruyen el inventario desde bump_service_schedule_version.
+        _refresh_inventory_on_commit(instance.service_id)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_availability(sender, instance, **kwargs):
+    invalidate_compiled_schedule(instance.id)
+    _invalidate_service(instance.id)
+    if kwargs["signal"] is post_save:
+        _refresh_inventory_on_commit(instance.id)
@@ -2,6 +2,21 @@ const tbody = document.getElementById("bookingsTbody");
 const feedback = document.getElementById("dashboardFeedback");
 const refreshBtn = document.getElementById("refreshBtn");
 const doubtsList = document.getElementById("doubtsList");
+const filtersForm = document.getElementById("bookingFilters");
+const loadMoreBtn = document.getElementById("loadMoreBtn");
+
+// Citas ya cargadas y cursor de la siguiente página (paginación por fecha, hora e id).
+let loadedBookings = [];
+let nextCursor = null;
+let pendingDoubts = [];
+// Marca del servidor para pedir solo los cambios posteriores (/api/dashboard/bookings/changes/).
+let syncCursor = null;
+const SYNC_INTERVAL_MS = 20000;
+// Con el websocket conectado los cambios llegan solos; el sondeo queda como respaldo.
+let bookingsSocket = null;
+let pollingTimer = null;
+let reconnectTimer = null;
+let statsTimer = null;
 
 const statTotal = document.getElementById("statTotal");
 const statPending = document.getElementById("statPending");
@@ -55,16 +70,12 @@ function statusBadge(statusCode, statusLabel) {
     return `<span class="px-2 py-1 rounded-full text-xs bg-amber-100 text-amber-700">${safeLabel}</span>`;
 }
 
-function renderStats(bookings, pendingDoubts) {
-    const total = bookings.length;
-    const pending = bookings.filter((item) => item.status_code === "pending").length;
-    const confirmed = bookings.filter((item) => item.status_code === "confirmed").length;
-    const cancelled = bookings.filter((item) => item.status_code === "cancelled").length;
-
-    statTotal.textContent = String(total);
-    statPending.textContent = String(pending);
-    statConfirmed.textContent = String(confirmed);
-    statCancelled.textContent = String(cancelled);
+function renderStats(aggregates, pendingDoubts) {
+    const byStatus = aggregates?.totals?.by_status || {};
+    statTotal.textContent = String(numberValue(aggregates?.totals?.total));
+    statPending.textContent = String(numberValue(byStatus.pending));
+    statConfirmed.textContent = String(numberValue(byStatus.confirmed));
+    statCancelled.textContent = String(numberValue(byStatus.cancelled));
     statDoubts.textContent = String(pendingDoubts.length);
 }
 
@@ -186,7 +197,7 @@ function bindStatusButtons() {
             const label = select.options[select.selectedIndex].text;
             try {
                 await updateStatus(bookingId, status, label);
-                await loadDashboard();
+                await syncBookingChanges();
             } catch (error) {
                 feedback.textContent = error.message;
             }
@@ -194,10 +205,197 @@ function bindStatusButtons() {
     });
 }
 
+function filterParams() {
+    const params = new URLSearchParams();
+    if (filtersForm) {
+        new FormData(filtersForm).forEach((value, key) => {
+            if (String(value).trim()) params.append(key, String(value).trim());
+        });
+    }
+    return params;
+}
+
+function bookingsUrl(cursor = null) {
+    const params = filterParams();
+    if (cursor) params.set("cursor", cursor);
+    return `/api/dashboard/bookings/?${params.toString()}`;
+}
+
+function bookingSortKey(booking) {
+    return `${booking.date} ${booking.time} ${String(booking.id).padStart(12, "0")}`;
+}
+
+function applyBookingChanges(changed, removed) {
+    const removedIds = new Set(removed);
+    const byId = new Map(loadedBookings.filter((item) => !removedIds.has(item.id)).map((item) => [item.id, item]));
+    // Con más páginas pendientes, una cita nueva posterior a la última cargada llegará al paginar.
+    const lastKey = nextCursor && loadedBookings.length ? bookingSortKey(loadedBookings[loadedBookings.length - 1]) : null;
+    changed.forEach((booking) => {
+        if (byId.has(booking.id) || !lastKey || bookingSortKey(booking) <= lastKey) {
+            byId.set(booking.id, booking);
+        }
+    });
+    loadedBookings = Array.from(byId.values()).sort((a, b) => bookingSortKey(a).localeCompare(bookingSortKey(b)));
+}
+
+async function syncBookingChanges() {
+    if (!syncCursor || document.hidden) return;
+    const params = filterParams();
+    params.set("since", syncCursor);
+    const response = await fetch(`/api/dashboard/bookings/changes/?${params.toString()}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || "No se pudieron sincronizar las citas.");
+    }
+    if (data.reset) {
+        await loadDashboard();
+        return;
+    }
+    syncCursor = data.sync_cursor;
+    if (data.changed.length || data.removed.length) {
+        applyBookingChanges(data.changed, data.removed);
+        renderBookings();
+        scheduleStatsRefresh();
+        feedback.textContent = `Actualizado: ${new Date().toLocaleTimeString("es-MX")}`;
+    }
+}
+
+async function readBookingsPage(response) {
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || "No se pudieron cargar las citas.");
+    }
+    return data;
+}
+
+// Los contadores salen de /api/dashboard/bookings/aggregates/ (GROUP BY en SQL) para la ventana de fechas filtrada.
+async function loadStats() {
+    const params = new URLSearchParams();
+    const filters = filtersForm ? Object.fromEntries(new FormData(filtersForm).entries()) : {};
+    if (filters.date_from) params.set("date_from", filters.date_from);
+    if (filters.date_to) params.set("date_to", filters.date_to);
+    const response = await fetch(`/api/dashboard/bookings/aggregates/?${params.toString()}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || "No se pudieron cargar los totales.");
+    }
+    renderStats(data, pendingDoubts);
+}
+
+function scheduleStatsRefresh() {
+    if (statsTimer) clearTimeout(statsTimer);
+    statsTimer = setTimeout(() => {
+        loadStats().catch((error) => {
+            feedback.textContent = error.message;
+        });
+    }, 1000);
+}
+
+function renderBookings() {
+    renderRows(loadedBookings);
+    bindStatusButtons();
+    loadMoreBtn?.classList.toggle("hidden", !nextCursor);
+}
+
+function matchesFilters(booking) {
+    if (!filtersForm) return true;
+    const filters = Object.fromEntries(new FormData(filtersForm).entries());
+    const search = String(filters.q || "").trim().toLowerCase();
+    if (filters.status && booking.status_code !== filters.status) return false;
+    if (filters.date_from && booking.date < filters.date_from) return false;
+    if (filters.date_to && booking.date > filters.date_to) return false;
+    if (search) {
+        const haystack = `${booking.user_name || ""} ${booking.phone_number || ""}`.toLowerCase();
+        if (!haystack.includes(search)) return false;
+    }
+    return true;
+}
+
+function applyBookingEvent(payload) {
+    if (payload.event === "chat.updated") {
+        // Un chat pendiente cambia el estado "Dudas" de sus citas: se piden solo esos cambios.
+        syncBookingChanges().catch((error) => {
+            feedback.textContent = error.message;
+        });
+        return;
+    }
+    const booking = payload.booking;
+    if (payload.event === "booking.updated" && booking && matchesFilters(booking)) {
+        applyBookingChanges([booking], []);
+    } else {
+        applyBookingChanges([], [Number(payload.booking_id)]);
+    }
+    renderBookings();
+    scheduleStatsRefresh();
+    feedback.textContent = `Actualizado: ${new Date().toLocaleTimeString("es-MX")}`;
+}
+
+function stopPollingFallback() {
+    if (pollingTimer) {
+        clearInterval(pollingTimer);
+        pollingTimer = null;
+    }
+}
+
+function startPollingFallback() {
+    if (pollingTimer) return;
+    pollingTimer = setInterval(() => {
+        syncBookingChanges().catch((error) => {
+            feedback.textContent = error.message;
+        });
+    }, SYNC_INTERVAL_MS);
+}
+
+function connectBookingsSocket() {
+    if (bookingsSocket && (bookingsSocket.readyState === WebSocket.OPEN || bookingsSocket.readyState === WebSocket.CONNECTING)) {
+        return;
+    }
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    bookingsSocket = new WebSocket(`${protocol}://${window.location.host}/ws/bookings/`);
+
+    bookingsSocket.onopen = () => {
+        stopPollingFallback();
+        // Lo que cambió mientras no había conexión.
+        syncBookingChanges().catch((error) => {
+            feedback.textContent = error.message;
+        });
+    };
+
+    bookingsSocket.onmessage = (event) => {
+        try {
+            applyBookingEvent(JSON.parse(event.data || "{}"));
+        } catch (_error) {
+            syncBookingChanges().catch((error) => {
+                feedback.textContent = error.message;
+            });
+        }
+    };
+
+    bookingsSocket.onclose = () => {
+        startPollingFallback();
+        if (reconnectTimer) {
+            clearTimeout(reconnectTimer);
+        }
+        reconnectTimer = setTimeout(() => connectBookingsSocket(), 2000);
+    };
+
+    bookingsSocket.onerror = () => {
+        bookingsSocket?.close();
+    };
+}
+
+async function loadMoreBookings() {
+    if (!nextCursor) return;
+    const data = await readBookingsPage(await fetch(bookingsUrl(nextCursor)));
+    loadedBookings = loadedBookings.concat(data.bookings);
+    nextCursor = data.next_cursor;
+    renderBookings();
+}
+
 async function loadDashboard() {
     feedback.textContent = "Actualizando datos...";
     const [bookingsResult, threadsResult] = await Promise.allSettled([
-        fetch("/api/dashboard/bookings/"),
+        fetch(bookingsUrl()),
         fetch("/api/dashboard/chats/threads/"),
     ]);
 
@@ -205,13 +403,12 @@ async function loadDashboard() {
         throw new Error("No se pudieron cargar las citas.");
     }
 
-    const bookingsResponse = bookingsResult.value;
-    const bookingsData = await bookingsResponse.json();
-    if (!bookingsResponse.ok) {
-        throw new Error(bookingsData.error || "No se pudieron cargar las citas.");
-    }
+    const bookingsData = await readBookingsPage(bookingsResult.value);
+    loadedBookings = bookingsData.bookings;
+    nextCursor = bookingsData.next_cursor;
+    syncCursor = bookingsData.sync_cursor;
 
-    let pendingDoubts = [];
+    pendingDoubts = [];
     if (threadsResult.status === "fulfilled") {
         const threadsResponse = threadsResult.value;
         const threadsData = await threadsResponse.json();
@@ -219,10 +416,9 @@ async function loadDashboard() {
             pendingDoubts = Array.isArray(threadsData.pending) ? threadsData.pending : [];
         }
     }
-    renderStats(bookingsData.bookings, pendingDoubts);
     renderDoubts(pendingDoubts);
-    renderRows(bookingsData.bookings);
-    bindStatusButtons();
+    renderBookings();
+    await loadStats();
     feedback.textContent = `Actualizado: ${new Date().toLocaleTimeString("es-MX")}`;
 }
 
@@ -234,10 +430,39 @@ refreshBtn?.addEventListener("click", async () => {
     }
 });
 
+filtersForm?.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    try {
+        await loadDashboard();
+    } catch (error) {
+        feedback.textContent = error.message;
+    }
+});
+
+loadMoreBtn?.addEventListener("click", async () => {
+    try {
+        await loadMoreBookings();
+    } catch (error) {
+        feedback.textContent = error.message;
+    }
+});
+
 document.addEventListener("DOMContentLoaded", async () => {
+    // Por defecto se listan las citas desde hace 30 días, no todo el historial.
+    const dateFrom = filtersForm?.elements.namedItem("date_from");
+    if (dateFrom && !dateFrom.value) {
+        const since = new Date();
+        since.setDate(since.getDate() - 30);
+        dateFrom.value = since.toLocaleDateString("en-CA");
+    }
     try {
         await loadDashboard();
     } catch (error) {
         feedback.textContent = error.message;
     }
+    if ("WebSocket" in window) {
+        connectBookingsSocket();
+    } else {
+        startPollingFallback();
+    }
 });
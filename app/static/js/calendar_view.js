@@ -4,8 +4,10 @@ const reloadButton = document.getElementById("reloadCalendarBtn");
 
 let calendarInstance = null;
 
-async function fetchEvents() {
-    const response = await fetch("/api/dashboard/bookings/events/");
+async function fetchEvents(info) {
+    // Solo la ventana visible; FullCalendar vuelve a pedir al cambiar de semana o mes.
+    const params = new URLSearchParams({ start: info.startStr, end: info.endStr });
+    const response = await fetch(`/api/dashboard/bookings/events/?${params.toString()}`);
     const data = await response.json();
     if (!response.ok) {
         throw new Error(data.error || "No se pudieron cargar los eventos.");
@@ -19,11 +21,7 @@ function buildEventInfo(event) {
     return `${event.title} | ${extra.status || ""} | ${extra.package || ""} | ${extra.phone_number || ""}${notes}`;
 }
 
-function renderCalendar(events) {
-    if (calendarInstance) {
-        calendarInstance.destroy();
-    }
-
+function renderCalendar() {
     const isMobile = window.innerWidth < 768;
     calendarInstance = new FullCalendar.Calendar(container, {
         locale: "es",
@@ -41,7 +39,18 @@ function renderCalendar(events) {
         slotMinTime: "06:00:00",
         slotMaxTime: "23:00:00",
         eventTimeFormat: { hour: "2-digit", minute: "2-digit", meridiem: false },
-        events,
+        events(info, successCallback, failureCallback) {
+            feedback.textContent = "Cargando calendario...";
+            fetchEvents(info)
+                .then((events) => {
+                    successCallback(events);
+                    feedback.textContent = `Eventos cargados: ${events.length}`;
+                })
+                .catch((error) => {
+                    feedback.textContent = error.message;
+                    failureCallback(error);
+                });
+        },
         eventClick(info) {
             feedback.textContent = buildEventInfo(info.event);
         },
@@ -50,10 +59,11 @@ function renderCalendar(events) {
 }
 
 async function loadCalendar() {
-    feedback.textContent = "Cargando calendario...";
-    const events = await fetchEvents();
-    renderCalendar(events);
-    feedback.textContent = `Eventos cargados: ${events.length}`;
+    if (calendarInstance) {
+        calendarInstance.refetchEvents();
+        return;
+    }
+    renderCalendar();
 }
 
 reloadButton?.addEventListener("click", async () => {
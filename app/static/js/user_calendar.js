@@ -7,6 +7,7 @@ const daysGrid = document.getElementById("daysGrid");
 const calendarMonthLabel = document.getElementById("calendarMonthLabel");
 const prevMonthBtn = document.getElementById("prevMonthBtn");
 const nextMonthBtn = document.getElementById("nextMonthBtn");
+const nextAvailableBtn = document.getElementById("nextAvailableBtn");
 const timeSlotsContainer = document.getElementById("timeSlots");
 const confirmBtn = document.getElementById("confirmBtn");
 const feedback = document.getElementById("feedback");
@@ -30,6 +31,8 @@ let context = null;
 let currentMonth = null;
 let currentDaysData = {};
 let pendingDaySelection = null;
+let rangeCache = {};
+let fetchedMonths = new Set();
 
 async function requestJson(url, options = {}) {
     const response = await fetch(url, options);
@@ -126,17 +129,52 @@ function hideDayConfirmModal() {
     dayConfirmModal.classList.remove("flex");
 }
 
+function isoDay(date) {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, "0")}-${String(date.getDate()).padStart(2, "0")}`;
+}
+
+function monthKey(date) {
+    return isoDay(date).slice(0, 7);
+}
+
+function packageKey() {
+    return selectedPackageId ? String(selectedPackageId) : "default";
+}
+
+async function prefetchMonths(monthStart) {
+    // Un solo request trae el mes visible y el siguiente para todos los paquetes.
+    const rangeEnd = new Date(monthStart.getFullYear(), monthStart.getMonth() + 2, 0);
+    const query = new URLSearchParams({ from: isoDay(monthStart), to: isoDay(rangeEnd) });
+    const packageIds = context.packages.map((item) => item.id);
+    if (packageIds.length) {
+        query.set("package_ids", packageIds.join(","));
+    }
+    const data = await requestJson(`/api/calendar/${token}/available-range/?${query.toString()}`);
+    Object.entries(data.packages || {}).forEach(([key, days]) => {
+        rangeCache[key] = { ...(rangeCache[key] || {}), ...days };
+    });
+    fetchedMonths.add(monthKey(monthStart));
+    fetchedMonths.add(monthKey(new Date(monthStart.getFullYear(), monthStart.getMonth() + 1, 1)));
+}
+
 async function loadAvailableDays() {
     if (!currentMonth) return;
-    const query = new URLSearchParams({
-        year: String(currentMonth.getFullYear()),
-        month: String(currentMonth.getMonth() + 1),
-    });
-    if (selectedPackageId) {
-        query.set("package_id", String(selectedPackageId));
+    if (!fetchedMonths.has(monthKey(currentMonth))) {
+        await prefetchMonths(currentMonth);
     }
-    const data = await requestJson(`/api/calendar/${token}/available-days/?${query.toString()}`);
-    currentDaysData = data.days || {};
+    const packageDays = rangeCache[packageKey()] || {};
+    const prefix = `${monthKey(currentMonth)}-`;
+    currentDaysData = {};
+    Object.entries(packageDays).forEach(([isoDate, status]) => {
+        if (isoDate.startsWith(prefix)) {
+            currentDaysData[String(Number(isoDate.slice(8)))] = status;
+        }
+    });
+}
+
+function resetRangeCache() {
+    rangeCache = {};
+    fetchedMonths = new Set();
 }
 
 function renderCalendar() {
@@ -202,19 +240,41 @@ function renderTimeSlots(times) {
         button.type = "button";
         button.textContent = time;
         button.className = "border rounded-lg py-2 hover:bg-slate-100";
-        button.addEventListener("click", () => {
+        button.addEventListener("click", async () => {
+            try {
+                await holdSlot(time);
+            } catch (error) {
+                feedback.textContent = error.message;
+                await loadAvailableTimes();
+                return;
+            }
             document
                 .querySelectorAll("#timeSlots button")
                 .forEach((item) => item.classList.remove("bg-slate-800", "text-white"));
             button.classList.add("bg-slate-800", "text-white");
             selectedTime = time;
             confirmBtn.disabled = false;
-            feedback.textContent = `Horario seleccionado: ${time}`;
         });
         timeSlotsContainer.appendChild(button);
     });
 }
 
+async function holdSlot(time) {
+    // Aparta el horario mientras se llena el formulario para que nadie más lo tome.
+    const data = await requestJson(`/api/calendar/${token}/hold/`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+            date: datePicker.value,
+            time,
+            package_id: selectedPackageId ? Number(selectedPackageId) : null,
+        }),
+    });
+    const expiresAt = new Date(data.hold.expires_at);
+    const until = expiresAt.toLocaleTimeString("es-MX", { hour: "2-digit", minute: "2-digit" });
+    feedback.textContent = `Horario seleccionado: ${time}. Lo apartamos para ti hasta las ${until}.`;
+}
+
 async function loadAvailableTimes() {
     if (!datePicker.value) {
         return;
@@ -230,6 +290,25 @@ async function loadAvailableTimes() {
     feedback.textContent = "";
 }
 
+async function jumpToNextAvailable() {
+    const query = new URLSearchParams({ days: "180", limit: "1" });
+    if (selectedPackageId) {
+        query.set("package_id", String(selectedPackageId));
+    }
+    const data = await requestJson(`/api/calendar/${token}/next-available/?${query.toString()}`);
+    const slot = (data.slots || [])[0];
+    if (!slot) {
+        feedback.textContent = "No encontramos horarios disponibles en los próximos meses.";
+        return;
+    }
+    datePicker.value = slot.date;
+    currentMonth = new Date(`${slot.date}T00:00:00`);
+    currentMonth.setDate(1);
+    await refreshCalendar();
+    await loadAvailableTimes();
+    feedback.textContent = `Primer horario disponible: ${formatDateLabel(slot.date)} a las ${slot.time}.`;
+}
+
 async function loadContext() {
     context = await requestJson(`/api/calendar/${token}/context/`);
     serviceNameEl.textContent = context.service.name;
@@ -265,6 +344,7 @@ async function confirmBooking() {
     feedback.textContent = successMessage;
     toast(successMessage);
     confirmBtn.textContent = "Cita confirmada";
+    resetRangeCache();
 }
 
 async function refreshCalendar() {
@@ -307,6 +387,14 @@ nextMonthBtn?.addEventListener("click", async () => {
     await refreshCalendar();
 });
 
+nextAvailableBtn?.addEventListener("click", async () => {
+    try {
+        await jumpToNextAvailable();
+    } catch (error) {
+        feedback.textContent = error.message;
+    }
+});
+
 acceptDayConfirmBtn?.addEventListener("click", async () => {
     if (!pendingDaySelection) return;
     const selected = pendingDaySelection;
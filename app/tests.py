@@ -1,16 +1,86 @@
-from datetime import time, timedelta
+import json
+import random
+import re
+import threading
+from calendar import monthrange
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from app.models import Booking, Service, ServicePackage, ServiceWeeklyRange, User
+from app.management.commands.bench_slots import legacy_slots
+from app.middleware import RequestMetricsMiddleware
+from app.models import (
+    Booking,
+    BookingDeletion,
+    BookingIntent,
+    BookingSlotHold,
+    ChatConversation,
+    Message,
+    Service,
+    ServiceException,
+    ServicePackage,
+    ServiceWeeklyRange,
+    User,
+)
 from app.services.bot_flow_service import ensure_default_bot_flow_seeded
-from app.services.booking_service import confirm_booking, create_booking_intent, get_available_times
+from app.services.booking_service import (
+    confirm_booking,
+    create_booking_intent,
+    create_manual_booking,
+    get_available_days,
+    get_available_range,
+    get_available_times,
+    hold_slot,
+    sweep_expired_slot_holds,
+)
+from app.services.availability_cache import (
+    DjangoCacheBackend,
+    LocalLRUBackend,
+    availability_key,
+    get_availability_cache,
+    reset_availability_cache,
+)
+from app.services.availability_prewarm import prewarm_availability, prewarm_invalidated_days
+from app.services.booking_counters import get_day_counts, reconcile_day_counters
+from app.services.booking_events import BOOKINGS_GROUP
+from app.services import interval_engine, scheduling
+from app.services.scheduling import (
+    DayAvailability,
+    compute_slots,
+    find_next_available_slots,
+    from_minutes,
+    get_available_slots,
+    get_day_availability_status,
+    get_days_availability_status,
+    get_service_schedule,
+    is_slot_available,
+    to_minutes,
+)
+from app.services.schedule_impact import find_schedule_conflicts, proposed_exceptions, proposed_weekly_ranges
+from app.services.request_metrics import track_external_call
+from app.services.schedule_validation import validate_service_schedule
+from app.services.slot_inventory import get_inventory_day_statuses, get_inventory_slots, rebuild_inventory
 from app.services.chat_service import mark_chat_needs_attention, mark_chat_resolved
+from app.services.dashboard_service import update_booking_status
 from app.whatsapp.flow import route_incoming_whatsapp_event
 
 
+# Sin muestreo: las peticiones de prueba no escriben en wa_bot.metrics.
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
 class AvailabilityTests(TestCase):
     def setUp(self):
         today = timezone.localdate()
@@ -70,6 +140,652 @@ class AvailabilityTests(TestCase):
         self.assertNotIn("10:00", data["times"])
         self.assertIn("11:00", data["times"])
 
+    def test_available_days_matches_per_day_status(self):
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday + timedelta(days=7),
+            exception_type=ServiceException.ExceptionType.CLOSED,
+        )
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday + timedelta(days=14),
+            exception_type=ServiceException.ExceptionType.MAX_BOOKINGS,
+            max_bookings=1,
+        )
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday + timedelta(days=15),
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+            range_mode=ServiceException.RangeMode.ADD,
+            start_time=time(16, 0),
+            end_time=time(18, 0),
+        )
+        Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            package=self.package,
+            date=self.next_monday + timedelta(days=14),
+            time=time(11, 0),
+            duration_minutes=60,
+        )
+
+        for offset in (0, 14, 31):
+            target = self.next_monday + timedelta(days=offset)
+            reset_availability_cache()
+            scheduling.invalidate_compiled_schedule(self.service.id)
+            # En frío el mes completo cuesta lo mismo que un día: usuario, solicitud, horario semanal,
+            # excepciones, reservas y apartados.
+            with self.assertNumQueries(6):
+                data = get_available_days(self.user.booking_token, year=target.year, month=target.month)
+            for day, status_data in data["days"].items():
+                expected = get_day_availability_status(
+                    service=self.service,
+                    target_date=target.replace(day=int(day)),
+                    duration_minutes=60,
+                    booking_interval_minutes=30,
+                    package=self.package,
+                )
+                self.assertEqual(status_data, expected)
+
+    def _legacy_day_status(self, target_date, *, duration_minutes, interval_minutes, package):
+        # Camino anterior a DayAvailability: una consulta por regla y el barrido any() de bench_slots.
+        exceptions = ServiceException.objects.filter(service=self.service, date=target_date, is_active=True).order_by("id")
+        ranges = [
+            (row.start_time, row.end_time)
+            for row in self.service.weekly_ranges.filter(weekday=target_date.weekday()).order_by("order_index", "start_time")
+        ]
+        special = exceptions.filter(exception_type=ServiceException.ExceptionType.SPECIAL_RANGE)
+        if exceptions.filter(exception_type=ServiceException.ExceptionType.CLOSED).exists():
+            ranges = []
+        else:
+            replacements = special.filter(range_mode=ServiceException.RangeMode.REPLACE)
+            if replacements.exists():
+                ranges = [(exception.start_time, exception.end_time) for exception in replacements]
+            ranges += [
+                (exception.start_time, exception.end_time)
+                for exception in special.filter(range_mode=ServiceException.RangeMode.ADD)
+            ]
+        if not ranges:
+            return {"status": "no_schedule", "available_slots": 0}
+
+        active = Booking.objects.filter(service=self.service, date=target_date).exclude(status=Booking.Status.CANCELLED)
+        limit = exceptions.filter(exception_type=ServiceException.ExceptionType.MAX_BOOKINGS).order_by("-id").first()
+        if (limit and active.count() >= limit.max_bookings) or (
+            package.max_bookings is not None and active.filter(package=package).count() >= package.max_bookings
+        ):
+            return {"status": "full", "available_slots": 0}
+        slots = legacy_slots(
+            target_date=target_date,
+            ranges=ranges,
+            taken_intervals=[
+                (to_minutes(start), to_minutes(start) + duration)
+                for start, duration in active.values_list("time", "duration_minutes")
+            ],
+            duration_minutes=duration_minutes,
+            interval_minutes=interval_minutes,
+        )
+        if slots:
+            return {"status": "available", "available_slots": len(slots)}
+        return {"status": "full", "available_slots": 0}
+
+    def test_day_resolver_matches_legacy_per_rule_queries(self):
+        monday = self.next_monday
+
+        def add_exception(offset, exception_type, **fields):
+            ServiceException.objects.create(
+                service=self.service, date=monday + timedelta(days=offset), exception_type=exception_type, **fields
+            )
+
+        def add_booking(offset, hour, **fields):
+            Booking.objects.create(
+                user=self.user,
+                service=self.service,
+                package=self.package,
+                date=monday + timedelta(days=offset),
+                time=time(hour, 0),
+                duration_minutes=60,
+                **fields,
+            )
+
+        special = ServiceException.ExceptionType.SPECIAL_RANGE
+        replace, add = ServiceException.RangeMode.REPLACE, ServiceException.RangeMode.ADD
+        add_exception(7, ServiceException.ExceptionType.CLOSED)
+        add_exception(14, special, range_mode=replace, start_time=time(14, 0), end_time=time(15, 0))
+        add_booking(14, 14)
+        add_exception(21, special, range_mode=replace, start_time=time(9, 0), end_time=time(13, 0))
+        add_exception(21, special, range_mode=add, start_time=time(15, 0), end_time=time(16, 0))
+        add_booking(21, 9, status=Booking.Status.CANCELLED)
+        add_booking(21, 12)
+        add_exception(28, ServiceException.ExceptionType.MAX_BOOKINGS, max_bookings=1)
+        add_booking(28, 11)
+
+        expected = {
+            0: {"status": "available", "available_slots": 1},  # 10:00 ocupado; solo cabe 11:00.
+            1: {"status": "no_schedule", "available_slots": 0},  # Martes sin horario semanal.
+            7: {"status": "no_schedule", "available_slots": 0},  # Cerrado.
+            14: {"status": "full", "available_slots": 0},  # Horario reemplazado y ya reservado completo.
+            21: {"status": "available", "available_slots": 6},  # Reemplazo 9-13 más 15-16; la cancelada no cuenta.
+            28: {"status": "full", "available_slots": 0},  # Límite de un evento alcanzado con espacio libre.
+        }
+        for offset in range(29):
+            target_date = monday + timedelta(days=offset)
+            with self.subTest(date=target_date):
+                resolved = DayAvailability.load(self.service, target_date).status(
+                    duration_minutes=60, booking_interval_minutes=30, package=self.package
+                )
+                legacy = self._legacy_day_status(target_date, duration_minutes=60, interval_minutes=30, package=self.package)
+                self.assertEqual(resolved, legacy)
+                if offset in expected:
+                    self.assertEqual(resolved, expected[offset])
+
+    def test_available_range_covers_packages_with_one_load(self):
+        express = ServicePackage.objects.create(
+            service=self.service,
+            name="Express",
+            price=500,
+            duration_minutes=30,
+            available_until=self.next_monday + timedelta(days=20),
+            is_active=True,
+            order_index=20,
+        )
+        start = self.next_monday.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        end = next_month.replace(day=monthrange(next_month.year, next_month.month)[1])
+
+        reset_availability_cache()
+        # Token, intención, paquetes y las cuatro consultas de la ventana.
+        with self.assertNumQueries(7):
+            data = get_available_range(
+                self.user.booking_token,
+                start_date=start.isoformat(),
+                end_date=end.isoformat(),
+                package_ids=[self.package.id, express.id],
+            )
+
+        for package in (self.package, express):
+            days = data["packages"][str(package.id)]
+            for month_start in (start, next_month):
+                month = get_available_days(
+                    self.user.booking_token,
+                    year=month_start.year,
+                    month=month_start.month,
+                    package_id=package.id,
+                )
+                for day, status_data in month["days"].items():
+                    self.assertEqual(days[month_start.replace(day=int(day)).isoformat()], status_data)
+        reset_availability_cache()
+
+    def test_availability_cache_is_invalidated_by_signals(self):
+        for backend in ("local", "django"):
+            with self.subTest(backend=backend), override_settings(AVAILABILITY_CACHE={"BACKEND": backend}):
+                reset_availability_cache()
+                cache = get_availability_cache()
+                target = self.next_monday.isoformat()
+
+                first = get_available_times(token=self.user.booking_token, target_date=target)
+                second = get_available_times(token=self.user.booking_token, target_date=target)
+                self.assertEqual(first, second)
+                self.assertEqual(cache.stats()["hits"], 1)
+                self.assertIn("11:00", second["times"])
+
+                booking = Booking.objects.create(
+                    user=self.user,
+                    service=self.service,
+                    package=self.package,
+                    date=self.next_monday,
+                    time=time(11, 0),
+                    duration_minutes=60,
+                )
+                self.assertNotIn("11:00", get_available_times(token=self.user.booking_token, target_date=target)["times"])
+
+                booking.delete()
+                ServiceException.objects.create(
+                    service=self.service,
+                    date=self.next_monday,
+                    exception_type=ServiceException.ExceptionType.CLOSED,
+                )
+                self.assertEqual(get_available_times(token=self.user.booking_token, target_date=target)["times"], [])
+                ServiceException.objects.filter(service=self.service).delete()
+        reset_availability_cache()
+
+    def test_local_cache_entries_expire_after_timeout(self):
+        backend = LocalLRUBackend(timeout=300)
+        key = availability_key(
+            "slots",
+            service_id=self.service.id,
+            target_date=self.next_monday,
+            duration_minutes=60,
+            interval_minutes=30,
+            package_id=None,
+        )
+        with mock.patch("app.services.availability_cache.time.monotonic", return_value=1000.0):
+            backend.set(key, ["10:00"])
+        with mock.patch("app.services.availability_cache.time.monotonic", return_value=1299.0):
+            self.assertEqual(backend.get(key), ["10:00"])
+        with mock.patch("app.services.availability_cache.time.monotonic", return_value=1300.0):
+            self.assertIsNone(backend.get(key))
+        # La entrada vencida también sale de los índices por servicio y día.
+        self.assertEqual(backend._days_by_service, {})
+
+    def test_invalidation_journal_reports_changed_days_since_cursor(self):
+        for backend in [LocalLRUBackend(), DjangoCacheBackend(key_prefix="journal-test")]:
+            backend.clear()
+            cursor, changes = backend.invalidations_since(None)
+            self.assertIsNone(changes)
+            backend.record_invalidation(self.service.id, self.next_monday)
+            backend.record_invalidation(self.service.id, None)
+            self.assertEqual(
+                backend.invalidations_since(cursor),
+                (cursor + 2, [(self.service.id, self.next_monday), (self.service.id, None)]),
+            )
+            self.assertEqual(backend.invalidations_since(cursor + 2), (cursor + 2, []))
+            # Tras vaciar la cache la cola ya no cubre el cursor: toca la pasada completa.
+            backend.clear()
+            backend.record_invalidation(self.service.id, self.next_monday)
+            self.assertIsNone(backend.invalidations_since(cursor + 2)[1])
+
+    def test_prewarm_fills_cache_and_only_recomputes_invalidated_days(self):
+        reset_availability_cache()
+        cache = get_availability_cache()
+        window_end = self.next_monday + timedelta(days=13)
+
+        first = prewarm_availability([self.service], self.next_monday, window_end)
+        # 14 días x (sin paquete + paquete) x (horarios + estado).
+        self.assertEqual(first, {"checked": 56, "computed": 56, "service_days": 14})
+        self.assertEqual(prewarm_availability([self.service], self.next_monday, window_end)["computed"], 0)
+
+        # Usuario, solicitud, paquete y el apartado propio; los horarios salen de la cache.
+        with self.assertNumQueries(4):
+            data = get_available_times(
+                token=self.user.booking_token,
+                target_date=self.next_monday.isoformat(),
+                package_id=self.package.id,
+            )
+        self.assertEqual(data["times"], ["11:00"])
+        self.assertEqual(cache.stats()["misses"], 0)
+
+        Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            package=self.package,
+            date=self.next_monday + timedelta(days=7),
+            time=time(10, 0),
+            duration_minutes=60,
+        )
+        again = prewarm_availability([self.service], self.next_monday, window_end)
+        self.assertEqual((again["computed"], again["service_days"]), (4, 1))
+
+        # Modo worker: tras la pasada completa solo se recalculan los días que registraron las señales.
+        cursor = prewarm_invalidated_days(None, self.next_monday, window_end)["cursor"]
+        with self.assertNumQueries(0):
+            idle = prewarm_invalidated_days(cursor, self.next_monday, window_end)
+        self.assertEqual((idle["computed"], idle["cursor"]), (0, cursor))
+        Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            package=self.package,
+            date=self.next_monday + timedelta(days=8),
+            time=time(10, 0),
+            duration_minutes=60,
+        )
+        with mock.patch.object(cache, "contains", side_effect=AssertionError("sin sondeo de llaves")):
+            changed = prewarm_invalidated_days(cursor, self.next_monday, window_end)
+        self.assertEqual((changed["computed"], changed["service_days"], changed["full"]), (4, 1, False))
+        self.assertGreater(changed["cursor"], cursor)
+        self.assertEqual(prewarm_availability([self.service], self.next_monday, window_end)["computed"], 0)
+
+        out = StringIO()
+        call_command("prewarm_availability", "--days", "3", stdout=out, stderr=StringIO())
+        self.assertIn("calculadas=", out.getvalue())
+        reset_availability_cache()
+
+    def test_date_span_exception_blocks_period_in_one_row(self):
+        staff = get_user_model().objects.create_user(username="agenda", password="x")
+        self.client.force_login(staff)
+        response = self.client.post(
+            f"/servicios-manager/{self.service.id}/excepciones/bloquear/",
+            {
+                "start_date": self.next_monday.isoformat(),
+                "end_date": (self.next_monday + timedelta(days=20)).isoformat(),
+                "weekdays": ["0", "2"],
+                "confirm_impact": "1",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ServiceException.objects.filter(service=self.service).count(), 1)
+
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday + timedelta(days=14),
+            end_date=self.next_monday + timedelta(days=30),
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+            range_mode=ServiceException.RangeMode.ADD,
+            start_time=time(16, 0),
+            end_time=time(17, 0),
+        )
+        service = Service.objects.get(id=self.service.id)
+        statuses = get_days_availability_status(
+            service=service,
+            start_date=self.next_monday,
+            end_date=self.next_monday + timedelta(days=28),
+            duration_minutes=60,
+        )
+        # Lunes bloqueados dentro del periodo; fuera de él el horario extra se suma, también en martes sin horario semanal.
+        self.assertEqual(statuses[self.next_monday]["status"], "no_schedule")
+        self.assertEqual(statuses[self.next_monday + timedelta(days=14)]["status"], "no_schedule")
+        self.assertEqual(statuses[self.next_monday + timedelta(days=28)]["available_slots"], 4)
+        self.assertEqual(statuses[self.next_monday + timedelta(days=15)]["available_slots"], 1)
+        self.assertEqual(
+            get_available_slots(
+                service=service, target_date=self.next_monday + timedelta(days=15), duration_minutes=60
+            ),
+            [time(16, 0)],
+        )
+
+    def test_schedule_change_reports_affected_bookings_before_saving(self):
+        booking = Booking.objects.get(service=self.service)
+        weekly_range = ServiceWeeklyRange.objects.get(service=self.service)
+        closed = ServiceException(
+            service=self.service,
+            date=self.next_monday,
+            end_date=self.next_monday + timedelta(days=7),
+            exception_type=ServiceException.ExceptionType.CLOSED,
+        )
+        with self.assertNumQueries(3):
+            conflicts = find_schedule_conflicts(
+                self.service, exceptions=proposed_exceptions(self.service, upsert=closed)
+            )
+        self.assertEqual([item["booking_id"] for item in conflicts], [booking.id])
+        self.assertEqual(conflicts[0]["reason"], "La fecha queda cerrada o sin horario.")
+
+        shorter = proposed_weekly_ranges(self.service, upsert=(weekly_range.id, 0, time(10, 30), time(12, 0)))
+        self.assertEqual(len(find_schedule_conflicts(self.service, weekly_ranges=shorter)), 1)
+        later = proposed_weekly_ranges(self.service, upsert=(None, 0, time(14, 0), time(16, 0)))
+        self.assertEqual(find_schedule_conflicts(self.service, weekly_ranges=later), [])
+        # Dos bloques que se tocan no forman uno solo: la cita de 10:00 a 11:00 ya no cabe en ninguno.
+        split = [(weekly_range.id, 0, time(10, 0), time(10, 30)), (None, 0, time(10, 30), time(12, 0))]
+        self.assertEqual(len(find_schedule_conflicts(self.service, weekly_ranges=split)), 1)
+
+        staff = get_user_model().objects.create_user(username="agenda", password="x")
+        self.client.force_login(staff)
+        url = f"/servicios-manager/{self.service.id}/excepciones/bloquear/"
+        payload = {"start_date": self.next_monday.isoformat(), "notes": "Vacaciones"}
+        response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, "Guardar de todos modos", status_code=409)
+        self.assertFalse(ServiceException.objects.filter(service=self.service).exists())
+
+        response = self.client.post(url, {**payload, "confirm_impact": "1"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(ServiceException.objects.filter(service=self.service, notes="Vacaciones").exists())
+
+        # Horas mal escritas regresan al panel con un mensaje en lugar de un error 500.
+        response = self.client.post(f"/servicios-manager/horarios/{weekly_range.id}/update/", {"start_time": "25:00"})
+        self.assertEqual(response.status_code, 302)
+        weekly_range.refresh_from_db()
+        self.assertEqual(weekly_range.start_time, time(10, 0))
+        response = self.client.post(
+            f"/servicios-manager/{self.service.id}/excepciones/create/",
+            {"date": self.next_monday.isoformat(), "exception_type": "special_range", "start_time": "10h", "end_time": "12:00"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ServiceException.objects.filter(service=self.service).count(), 1)
+
+    def test_schedule_validator_reports_overlaps_and_collisions(self):
+        ServiceWeeklyRange.objects.create(service=self.service, weekday=0, start_time=time(11, 0), end_time=time(13, 0))
+        ServiceWeeklyRange.objects.create(service=self.service, weekday=0, start_time=time(11, 30), end_time=time(11, 30))
+        ServiceWeeklyRange.objects.create(service=self.service, weekday=2, start_time=time(9, 0), end_time=time(9, 30))
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday,
+            end_date=self.next_monday + timedelta(days=13),
+            weekday_mask=1,
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+            range_mode=ServiceException.RangeMode.ADD,
+            start_time=time(12, 30),
+            end_time=time(14, 0),
+        )
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday - timedelta(days=14),
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+            range_mode=ServiceException.RangeMode.ADD,
+            start_time=time(10, 0),
+            end_time=time(11, 0),
+        )
+
+        service = Service.objects.get(id=self.service.id)
+        with self.assertNumQueries(3):
+            issues = validate_service_schedule(service)
+        self.assertEqual(
+            sorted(issue.kind for issue in issues),
+            ["add_collision", "empty", "overlap", "short"],
+        )
+        self.assertIn("Solapamiento en Lunes: 10:00 - 12:00 con 11:00 - 13:00.", [issue.message for issue in issues])
+
+        staff = get_user_model().objects.create_user(username="agenda", password="x")
+        self.client.force_login(staff)
+        response = self.client.get(f"/servicios-manager/?service={self.service.id}")
+        self.assertEqual([issue.kind for issue in response.context["schedule_warnings"]], [issue.kind for issue in issues])
+
+    def test_is_slot_available_matches_generated_slots(self):
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday,
+            exception_type=ServiceException.ExceptionType.SPECIAL_RANGE,
+            range_mode=ServiceException.RangeMode.ADD,
+            start_time=time(15, 10),
+            end_time=time(17, 0),
+        )
+        Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            date=self.next_monday,
+            time=time(15, 55),
+            duration_minutes=20,
+        )
+        for duration, interval in ((60, 30), (45, 15), (20, 5)):
+            slots = get_available_slots(
+                service=self.service,
+                target_date=self.next_monday,
+                duration_minutes=duration,
+                booking_interval_minutes=interval,
+            )
+            for minute in range(9 * 60, 18 * 60, 5):
+                candidate = time(minute // 60, minute % 60)
+                self.assertEqual(
+                    is_slot_available(
+                        service=self.service,
+                        target_date=self.next_monday,
+                        target_time=candidate,
+                        duration_minutes=duration,
+                        booking_interval_minutes=interval,
+                    ),
+                    candidate in slots,
+                    msg=f"{candidate} duration={duration} interval={interval}",
+                )
+
+        # Reservas y apartados; rangos y excepciones salen del horario compilado.
+        with self.assertNumQueries(2):
+            is_slot_available(
+                service=self.service,
+                target_date=self.next_monday,
+                target_time=time(11, 0),
+                duration_minutes=60,
+            )
+
+    def test_compiled_schedule_follows_service_version(self):
+        schedule = get_service_schedule(self.service)
+        self.assertEqual(schedule.day(self.next_monday).ranges, [(time(10, 0), time(12, 0))])
+        self.assertEqual(schedule.day(self.next_monday + timedelta(days=1)).ranges, [])
+        with self.assertNumQueries(2):
+            DayAvailability.load(self.service, self.next_monday)
+
+        previous_version = self.service.updated_at
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday,
+            exception_type=ServiceException.ExceptionType.CLOSED,
+        )
+        self.service.refresh_from_db()
+        self.assertGreater(self.service.updated_at, previous_version)
+        # Otro proceso conserva la versión anterior; el updated_at nuevo obliga a recompilar.
+        scheduling._schedules[self.service.id] = schedule
+        self.assertTrue(DayAvailability.load(self.service, self.next_monday).is_closed)
+        self.assertIsNot(get_service_schedule(self.service), schedule)
+
+    def test_slot_inventory_tracks_confirmed_bookings(self):
+        rebuild_inventory(self.service, self.next_monday, self.next_monday + timedelta(days=13))
+        computed = get_available_slots(
+            service=self.service,
+            target_date=self.next_monday,
+            duration_minutes=60,
+            package=self.package,
+        )
+        self.assertEqual(
+            get_inventory_slots(service=self.service, target_date=self.next_monday, package=self.package),
+            computed,
+        )
+
+        # El inventario se recalcula al confirmar la transacción, desde las señales.
+        with self.captureOnCommitCallbacks(execute=True):
+            confirmed = confirm_booking(
+                token=self.user.booking_token,
+                target_date=self.next_monday.isoformat(),
+                target_time="11:00",
+                package_id=self.package.id,
+                customer_name="Cliente",
+                customer_phone="5215500000000",
+            )
+        self.assertEqual(
+            get_inventory_slots(service=self.service, target_date=self.next_monday, package=self.package),
+            [],
+        )
+        self.assertIsNone(
+            get_inventory_slots(service=self.service, target_date=self.next_monday + timedelta(days=14), package=None)
+        )
+
+        # Cambios fuera del flujo de reservas y del administrador de servicios (admin, shell, chat).
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.filter(id=confirmed.id).only("id").get().delete()
+            ServiceException.objects.create(
+                service=self.service,
+                date=self.next_monday + timedelta(days=7),
+                exception_type=ServiceException.ExceptionType.CLOSED,
+            )
+        self.assertEqual(
+            get_inventory_slots(service=self.service, target_date=self.next_monday, package=self.package),
+            [time(11, 0)],
+        )
+        end = self.next_monday + timedelta(days=13)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.user, service=self.service, package=self.package, date=self.next_monday, time=time(11, 0)
+            )
+        days = DayAvailability.load_window(self.service, self.next_monday, end)
+        statuses = get_inventory_day_statuses(
+            service=self.service, start_date=self.next_monday, end_date=end, packages=[self.package]
+        )[self.package.id]
+        self.assertEqual(statuses[self.next_monday]["status"], "full")
+        self.assertEqual(statuses[self.next_monday + timedelta(days=7)]["status"], "no_schedule")
+        for target_date, day in days.items():
+            self.assertEqual(statuses[target_date], day.status(duration_minutes=60, package=self.package))
+
+    def test_available_range_reads_inventory_when_it_covers_the_window(self):
+        for index, duration in enumerate([30, 90], start=2):
+            ServicePackage.objects.create(
+                service=self.service,
+                name=f"Paquete {index}",
+                price=500 * index,
+                duration_minutes=duration,
+                is_active=True,
+                order_index=10 * index,
+            )
+        end = self.next_monday + timedelta(days=13)
+        BookingSlotHold.objects.create(
+            user=self.user,
+            service=self.service,
+            date=self.next_monday,
+            time=time(10, 0),
+            duration_minutes=30,
+            expires_at=timezone.now() + timedelta(minutes=10),
+        )
+        computed = get_available_range(
+            self.user.booking_token, start_date=self.next_monday.isoformat(), end_date=end.isoformat()
+        )
+        rebuild_inventory(self.service, self.next_monday, end)
+        self.service.refresh_from_db()
+        get_service_schedule(self.service)
+        # Token, solicitud, paquetes, inventario agrupado de los tres paquetes, apartados y sus horarios libres.
+        with mock.patch("app.services.booking_service.get_packages_availability_status") as compiled:
+            with self.assertNumQueries(6):
+                data = get_available_range(
+                    self.user.booking_token, start_date=self.next_monday.isoformat(), end_date=end.isoformat()
+                )
+        compiled.assert_not_called()
+        self.assertEqual(len(data["packages"]), 3)
+        self.assertEqual(data, computed)
+
+        with self.assertRaises(ValidationError):
+            get_available_range(
+                self.user.booking_token,
+                start_date=self.next_monday.isoformat(),
+                end_date=end.isoformat(),
+                package_ids=[self.package.id + 1000],
+            )
+
+    def test_next_available_slots_span_services_with_fixed_queries(self):
+        self.service.category = "Fotografía"
+        self.service.save()
+        other = Service.objects.create(
+            name="Retratos",
+            slug="",
+            category="Fotografía",
+            default_duration_minutes=60,
+            booking_interval_minutes=60,
+        )
+        ServiceWeeklyRange.objects.create(service=other, weekday=0, start_time=time(9, 0), end_time=time(10, 0))
+
+        targets = [(self.service, self.package), (other, None)]
+        with self.assertNumQueries(4):
+            slots = find_next_available_slots(
+                targets=targets,
+                start_date=self.next_monday,
+                end_date=self.next_monday + timedelta(days=120),
+                limit=3,
+            )
+        following_monday = self.next_monday + timedelta(days=7)
+        self.assertEqual(
+            [(slot_date, slot_time, service.id) for slot_date, slot_time, service, _ in slots],
+            [
+                (self.next_monday, time(9, 0), other.id),
+                (self.next_monday, time(11, 0), self.service.id),
+                (following_monday, time(9, 0), other.id),
+            ],
+        )
+
+    def test_slot_hold_blocks_others_until_confirmed_or_expired(self):
+        rival = User.objects.create(phone_number="5215511111111", name="Rival")
+        create_booking_intent(user=rival, service=self.service)
+        target = self.next_monday.isoformat()
+
+        hold_slot(self.user.booking_token, target_date=target, target_time="11:00")
+        self.assertIn("11:00", get_available_times(token=self.user.booking_token, target_date=target)["times"])
+        self.assertNotIn("11:00", get_available_times(token=rival.booking_token, target_date=target)["times"])
+        with self.assertRaises(ValidationError):
+            hold_slot(rival.booking_token, target_date=target, target_time="11:00")
+
+        later = timezone.now() + timedelta(minutes=settings.SLOT_HOLD_MINUTES + 1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertIn("11:00", get_available_times(token=rival.booking_token, target_date=target)["times"])
+            self.assertEqual(sweep_expired_slot_holds(), 1)
+
+        hold_slot(rival.booking_token, target_date=target, target_time="11:00")
+        with self.assertRaises(ValidationError):
+            confirm_booking(token=self.user.booking_token, target_date=target, target_time="11:00")
+        confirm_booking(token=rival.booking_token, target_date=target, target_time="11:00")
+        self.assertFalse(BookingSlotHold.objects.exists())
+
     def test_booking_fails_outside_service_date_range(self):
         self.service.availability_type = Service.AvailabilityType.TEMPORARY
         self.service.available_from = self.next_monday + timedelta(days=5)
@@ -85,6 +801,562 @@ class AvailabilityTests(TestCase):
                 customer_phone="5215500000000",
             )
 
+    def test_reactivating_cancelled_booking_rejects_taken_slot(self):
+        cancelled = Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            date=self.next_monday,
+            time=time(10, 30),
+            duration_minutes=60,
+            status=Booking.Status.CANCELLED,
+        )
+        with self.assertRaises(ValidationError):
+            update_booking_status(booking_id=cancelled.id, status_code=Booking.Status.CONFIRMED)
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, Booking.Status.CANCELLED)
+
+    def test_day_counters_follow_bookings_and_enforce_limits(self):
+        def counts():
+            return get_day_counts(self.service.id, self.next_monday, self.package.id)
+
+        self.assertEqual(counts(), (1, 1))
+        extra = Booking.objects.create(
+            user=self.user,
+            service=self.service,
+            date=self.next_monday,
+            time=time(11, 0),
+            duration_minutes=60,
+        )
+        self.assertEqual(counts(), (2, 1))
+        update_booking_status(booking_id=extra.id, status_code=Booking.Status.CANCELLED)
+        self.assertEqual(counts(), (1, 1))
+
+        ServiceException.objects.create(
+            service=self.service,
+            date=self.next_monday,
+            exception_type=ServiceException.ExceptionType.MAX_BOOKINGS,
+            max_bookings=1,
+        )
+        with self.assertRaises(ValidationError):
+            update_booking_status(booking_id=extra.id, status_code=Booking.Status.CONFIRMED)
+        service = Service.objects.get(id=self.service.id)
+        get_service_schedule(service)
+        slot = {"service": service, "target_date": self.next_monday, "target_time": time(11, 0), "duration_minutes": 60}
+        # Con el horario compilado en memoria, el día lleno se rechaza con una sola lectura de contadores.
+        with self.assertNumQueries(1):
+            self.assertFalse(is_slot_available(**slot, package=self.package))
+
+        # Borrar con campos diferidos descuenta la reserva y libera el día en la caché de disponibilidad.
+        Booking.objects.filter(status=Booking.Status.CONFIRMED, date=self.next_monday).only("id").delete()
+        self.assertEqual(counts(), (0, 0))
+        self.assertTrue(is_slot_available(**slot))
+
+        # Altas masivas no disparan señales; el comando encuentra y corrige la diferencia.
+        Booking.objects.bulk_create(
+            [Booking(user=self.user, service=self.service, package=self.package, date=self.next_monday, time=time(10, 0))]
+        )
+        out = StringIO()
+        call_command("reconcile_day_counters", "--dry-run", stdout=out)
+        self.assertIn("contador=0 real=1", out.getvalue())
+        self.assertEqual(counts(), (0, 0))
+        call_command("reconcile_day_counters", stdout=StringIO())
+        self.assertEqual(counts(), (1, 1))
+        self.assertEqual(reconcile_day_counters(fix=False), [])
+        self.assertFalse(is_slot_available(**slot))
+
+
+@skipUnless(connection.vendor == "postgresql", "Los bloqueos y la restricción de traslape requieren PostgreSQL.")
+class BookingConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.service = Service.objects.create(
+            name="Sesiones",
+            slug="",
+            default_duration_minutes=60,
+            booking_interval_minutes=60,
+        )
+        for weekday in range(7):
+            ServiceWeeklyRange.objects.create(
+                service=self.service,
+                weekday=weekday,
+                start_time=time(8, 0),
+                end_time=time(20, 0),
+            )
+        self.target_date = timezone.localdate() + timedelta(days=3)
+
+    def _book(self, index: int, target_date: date, target_time: str) -> bool:
+        try:
+            user = User.objects.create(phone_number=f"52155{index:08d}", name=f"Cliente {index}")
+            create_manual_booking(
+                user=user,
+                service=self.service,
+                package=None,
+                target_date=target_date.isoformat(),
+                target_time=target_time,
+                customer_name=user.name,
+                customer_phone=user.phone_number,
+                customer_notes="",
+                deposit_amount=0,
+                status=Booking.Status.CONFIRMED,
+            )
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def test_concurrent_confirmations_never_double_book(self):
+        workers = 12
+        barrier = threading.Barrier(workers)
+
+        def contend(index):
+            barrier.wait()
+            return self._book(index, self.target_date, "10:00")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(contend, range(workers)))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(
+            Booking.objects.filter(service=self.service, date=self.target_date).exclude(
+                status=Booking.Status.CANCELLED
+            ).count(),
+            1,
+        )
+
+    def test_parallel_confirmations_across_days_all_succeed(self):
+        # Cada hilo reserva su propio día; el bloqueo por servicio y día no debe rechazar ni duplicar nada.
+        days, hours = 8, 12
+
+        def fill_day(day_index):
+            target_date = self.target_date + timedelta(days=day_index + 1)
+            return [self._book(day_index * 100 + hour, target_date, f"{8 + hour:02d}:00") for hour in range(hours)]
+
+        with ThreadPoolExecutor(max_workers=days) as pool:
+            results = [booked for day_results in pool.map(fill_day, range(days)) for booked in day_results]
+
+        self.assertTrue(all(results))
+        bookings = Booking.objects.filter(service=self.service).exclude(status=Booking.Status.CANCELLED)
+        self.assertEqual(bookings.count(), days * hours)
+        self.assertEqual(bookings.values("date", "time").distinct().count(), days * hours)
+        self.assertEqual(
+            {row["date"]: row["total"] for row in bookings.values("date").annotate(total=Count("id")).order_by()},
+            {self.target_date + timedelta(days=day_index + 1): hours for day_index in range(days)},
+        )
+
+    def test_overlap_constraint_rejects_direct_inserts(self):
+        user = User.objects.create(phone_number="5215599999999")
+        Booking.objects.create(user=user, service=self.service, date=self.target_date, time=time(9, 0))
+        Booking.objects.create(
+            user=user,
+            service=self.service,
+            date=self.target_date,
+            time=time(9, 30),
+            status=Booking.Status.CANCELLED,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.create(user=user, service=self.service, date=self.target_date, time=time(9, 30))
+
+
+class BenchmarkSchedulingCommandTests(TestCase):
+    def test_benchmark_reports_json_and_rolls_back(self):
+        output = StringIO()
+        call_command(
+            "benchmark_scheduling",
+            services=1,
+            days=14,
+            bookings=200,
+            exceptions=3,
+            repeat=3,
+            profile_repeat=1,
+            stdout=output,
+            stderr=StringIO(),
+        )
+        report = json.loads(output.getvalue())
+        self.assertEqual(
+            set(report["results"]),
+            {"get_available_slots", "get_day_availability_status", "get_available_days", "is_slot_available", "confirm_booking"},
+        )
+        self.assertEqual(report["results"]["is_slot_available"]["queries_max"], 2)
+        self.assertFalse(Service.objects.filter(category="Benchmark").exists())
+
+
+# Sin muestreo: las peticiones de prueba no escriben en wa_bot.metrics.
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+class DashboardBookingsApiTests(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(
+            name="Sesiones",
+            slug="",
+            internal_code="Service_Sesion",
+            availability_type=Service.AvailabilityType.PERMANENT,
+            default_duration_minutes=60,
+            is_active=True,
+        )
+        self.user = User.objects.create(phone_number="5215511111111", name="Ana")
+        self.other = User.objects.create(phone_number="5215522222222", name="Luis")
+        ChatConversation.objects.create(user=self.other, status=ChatConversation.Status.PENDING)
+        start = date(2026, 3, 2)
+        for index in range(5):
+            Booking.objects.create(
+                user=self.other if index == 3 else self.user,
+                service=self.service,
+                customer_name="Luis" if index == 3 else "Ana",
+                date=start + timedelta(days=index // 2),
+                time=time(10 + index % 2, 0),
+                duration_minutes=60,
+                status=Booking.Status.CANCELLED if index == 4 else Booking.Status.CONFIRMED,
+            )
+        staff = get_user_model().objects.create_user(username="panel", password="x")
+        self.client.force_login(staff)
+
+    def test_cursor_pages_follow_date_time_id_order(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            with self.assertNumQueries(3):  # sesión, usuario y la página
+                data = self.client.get("/api/dashboard/bookings/", params).json()
+            seen.extend((row["date"], row["time"]) for row in data["bookings"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_filters_by_status_window_and_search(self):
+        def names(**params):
+            return [row["user_name"] for row in self.client.get("/api/dashboard/bookings/", params).json()["bookings"]]
+
+        self.assertEqual(names(status="doubts"), ["Luis"])
+        self.assertEqual(len(names(status="confirmed")), 3)
+        self.assertEqual(len(names(status=["cancelled", "doubts"])), 2)
+        self.assertEqual(len(names(date_from="2026-03-03", date_to="2026-03-03")), 2)
+        self.assertEqual(names(q="luis"), ["Luis"])
+        response = self.client.get("/api/dashboard/bookings/", {"cursor": "roto"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_events_feed_only_returns_visible_window(self):
+        url = "/api/dashboard/bookings/events/"
+        with self.assertNumQueries(3):
+            events = self.client.get(url, {"start": "2026-03-03T00:00:00-06:00", "end": "2026-03-04T00:00:00-06:00"}).json()["events"]
+        self.assertEqual([event["start"] for event in events], ["2026-03-03T10:00:00", "2026-03-03T11:00:00"])
+        self.assertEqual(events[0]["extendedProps"]["status"], "Confirmado")
+        cancelled = self.client.get(url, {"start": "2026-03-04", "end": "2026-03-05"}).json()["events"]
+        self.assertEqual(cancelled[0]["backgroundColor"], "#b91c1c")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"start": "2026-03-05", "end": "2026-03-01"}).status_code, 400)
+
+    def test_changes_feed_returns_updates_and_tombstones(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Booking.objects.update(updated_at=an_hour_ago)
+        ChatConversation.objects.update(updated_at=an_hour_ago)
+        since = (an_hour_ago + timedelta(minutes=30)).isoformat()
+        url = "/api/dashboard/bookings/changes/"
+
+        data = self.client.get(url, {"since": since}).json()
+        self.assertEqual((data["changed"], data["removed"], data["reset"]), ([], [], False))
+
+        first, second = Booking.objects.order_by("date", "time", "id")[:2]
+        update_booking_status(booking_id=first.id, status_code=Booking.Status.CANCELLED)
+        deleted_id = second.id
+        second.delete()
+        mark_chat_resolved(self.other)
+        with self.assertNumQueries(5):  # sesión, usuario, ids cambiados, filas y borrados
+            data = self.client.get(url, {"since": since, "status": "cancelled"}).json()
+        luis = Booking.objects.get(customer_name="Luis")
+        self.assertEqual([row["id"] for row in data["changed"]], [first.id])
+        self.assertEqual(data["removed"], sorted([deleted_id, luis.id]))
+        self.assertGreater(data["sync_cursor"], since)
+
+        stale = (timezone.now() - timedelta(days=30)).isoformat()
+        self.assertTrue(self.client.get(url, {"since": stale}).json()["reset"])
+        self.assertEqual(self.client.get(url, {"since": "ayer"}).status_code, 400)
+
+        BookingDeletion.objects.filter(booking_id=deleted_id).update(deleted_at=timezone.now() - timedelta(days=8))
+        call_command("prune_booking_deletions", stdout=StringIO())
+        self.assertFalse(BookingDeletion.objects.exists())
+
+    def test_aggregates_group_in_sql_and_cache_until_a_write(self):
+        Booking.objects.update(total_price=Decimal("100"), deposit_amount=Decimal("30"))
+        url = "/api/dashboard/bookings/aggregates/"
+        with self.assertNumQueries(4):  # sesión, usuario, por servicio y por día
+            data = self.client.get(url, {"date_from": "2026-03-02"}).json()
+        self.assertEqual(data["totals"]["total"], 5)
+        self.assertEqual(
+            data["totals"]["by_status"],
+            {"pending": 0, "confirmed": 3, "cancelled": 1, "doubts": 1},
+        )
+        self.assertEqual((data["totals"]["total_price"], data["totals"]["deposit_amount"]), (400.0, 120.0))
+        self.assertEqual([row["service"] for row in data["by_service"]], ["Sesiones"])
+        self.assertEqual([(row["date"], row["total"]) for row in data["by_day"]], [("2026-03-02", 2), ("2026-03-03", 2), ("2026-03-04", 1)])
+
+        with self.assertNumQueries(2):
+            self.client.get(url, {"date_from": "2026-03-02"})
+
+        booking = Booking.objects.filter(status=Booking.Status.CONFIRMED, customer_name="Ana").first()
+        update_booking_status(booking_id=booking.id, status_code=Booking.Status.CANCELLED)
+        data = self.client.get(url, {"date_from": "2026-03-02"}).json()
+        self.assertEqual(data["totals"]["by_status"]["cancelled"], 2)
+        self.assertEqual(self.client.get(url, {"date_to": "marzo"}).status_code, 400)
+
+    @skipUnless(settings.CHANNELS_ENABLED, "Requiere django-channels.")
+    def test_booking_changes_are_pushed_after_commit(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(BOOKINGS_GROUP, channel)
+        booking = Booking.objects.filter(customer_name="Ana").order_by("date", "time").first()
+        booking_id = booking.id
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            update_booking_status(booking_id=booking_id, status_code=Booking.Status.CANCELLED)
+        # Nada sale antes del commit: el envío vive en los callbacks de on_commit.
+        for callback in callbacks:
+            callback()
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message["event"], "booking.updated")
+        self.assertEqual(message["booking"]["status_code"], Booking.Status.CANCELLED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual((message["event"], message["booking_id"], message["booking"]), ("booking.deleted", booking_id, None))
+
+    @skipUnless(settings.CHANNELS_ENABLED, "Requiere django-channels.")
+    def test_booking_consumer_joins_bookings_and_chat_groups(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        from channels.testing import WebsocketCommunicator
+
+        from app.consumers import DashboardBookingConsumer
+
+        async def listen():
+            communicator = WebsocketCommunicator(DashboardBookingConsumer.as_asgi(), "/ws/bookings/")
+            communicator.scope["user"] = get_user_model()(username="panel")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            layer = get_channel_layer()
+            await layer.group_send(BOOKINGS_GROUP, {"type": "booking.event", "event": "booking.updated", "booking_id": 7})
+            await layer.group_send("dashboard_chats", {"type": "chat.event", "event": "chat.attention", "user_id": 3})
+            received = [await communicator.receive_json_from(), await communicator.receive_json_from()]
+            await communicator.disconnect()
+            return received
+
+        self.assertEqual(
+            async_to_sync(listen)(),
+            [
+                {"event": "booking.updated", "booking_id": 7, "booking": None},
+                {"event": "chat.attention", "user_id": 3},
+            ],
+        )
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_staff_requests_get_server_timing(self):
+        staff = get_user_model().objects.create_user(username="admin", password="x", is_staff=True)
+        self.client.force_login(staff)
+        # Sin muestreo el personal recibe el encabezado, pero la petición no va al log.
+        with self.assertNoLogs("wa_bot.metrics", level="INFO"):
+            response = self.client.get("/servicios-manager/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ consultas", db-slowest;dur=')
+
+        self.client.logout()
+        response = self.client.post("/webhook/", data="{}", content_type="application/json")
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_logs_db_and_graph_time(self):
+        def view(request):
+            list(Service.objects.all())
+            with track_external_call():
+                pass
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/webhook/")
+        request.user = AnonymousUser()
+        with self.assertLogs("wa_bot.metrics", level="INFO") as logs:
+            response = RequestMetricsMiddleware(view)(request)
+        self.assertNotIn("Server-Timing", response)
+        line = next(line for line in logs.output if "REQUEST_METRICS" in line)
+        self.assertIn(f"request_id={request.request_id}", line)
+        self.assertIn("db_queries=1", line)
+        self.assertIn("http_calls=1", line)
+
+
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Lo justo para que el planificador prefiera los índices: cada consulta caliente filtra unas
+        # pocas filas de tablas con varias páginas. Más volumen solo alarga la suite.
+        rng = random.Random(5)
+        cls.services = [Service.objects.create(name=f"Plan {index}", slug="") for index in range(20)]
+        cls.users = User.objects.bulk_create([User(phone_number=f"plan{index:06d}") for index in range(400)])
+        ServiceWeeklyRange.objects.bulk_create(
+            ServiceWeeklyRange(service=service, weekday=weekday, start_time=time(hour, 0), end_time=time(hour + 1, 0))
+            for service in cls.services
+            for weekday in range(7)
+            for hour in range(8, 20, 2)
+        )
+        start = date(2026, 1, 1)
+        Booking.objects.bulk_create(
+            (
+                Booking(
+                    user=rng.choice(cls.users),
+                    service=rng.choice(cls.services),
+                    date=start + timedelta(days=rng.randrange(730)),
+                    time=time(rng.randrange(8, 20), 0),
+                    status=rng.choice([Booking.Status.CONFIRMED, Booking.Status.PENDING, Booking.Status.CANCELLED]),
+                )
+                for _ in range(2000)
+            ),
+        )
+        ServiceException.objects.bulk_create(
+            ServiceException(
+                service=rng.choice(cls.services),
+                date=start + timedelta(days=rng.randrange(730)),
+                exception_type=ServiceException.ExceptionType.CLOSED,
+                is_active=rng.random() > 0.2,
+            )
+            for _ in range(1000)
+        )
+        Message.objects.bulk_create(
+            Message(user=rng.choice(cls.users), content="hola", direction=Message.Direction.INCOMING) for _ in range(2000)
+        )
+        BookingIntent.objects.bulk_create(
+            BookingIntent(user=rng.choice(cls.users), service=rng.choice(cls.services)) for _ in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertNoSequentialScan(self, query, table):
+        # Acepta un queryset o el SQL capturado de una llamada real.
+        if isinstance(query, str):
+            with connection.cursor() as cursor:
+                prefix = "EXPLAIN " if connection.vendor == "postgresql" else "EXPLAIN QUERY PLAN "
+                cursor.execute(prefix + query)
+                plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+        else:
+            plan = query.explain()
+        if connection.vendor == "postgresql":
+            self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+        else:
+            # En SQLite un barrido completo aparece como "SCAN tabla"; con índice es "SEARCH tabla USING ...".
+            self.assertIsNone(re.search(rf"\bSCAN {table}\b", plan), plan)
+
+    def test_schedule_loads_use_indexes(self):
+        # Se revisan las consultas que de verdad lanzan compile_many, load_windows y load, no copias de ellas.
+        service = self.services[3]
+        target = date(2026, 6, 1)
+        scheduling.invalidate_compiled_schedule(service.id)
+        with CaptureQueriesContext(connection) as queries:
+            DayAvailability.load_windows([service], target, target + timedelta(days=30))
+            DayAvailability.load(service, target)
+        for table in ["app_serviceexception", "app_serviceweeklyrange", "app_booking"]:
+            statements = [query["sql"] for query in queries if f'FROM "{table}"' in query["sql"]]
+            self.assertTrue(statements, table)
+            for sql in statements:
+                with self.subTest(table=table, sql=sql):
+                    self.assertNoSequentialScan(sql, table)
+
+    def test_hot_queries_use_indexes(self):
+        user = self.users[7]
+        hot_queries = [
+            (Message.objects.filter(user=user).order_by("created_at"), "app_message"),
+            (
+                BookingIntent.objects.filter(user=user, status=BookingIntent.Status.OPEN).order_by("-created_at")[:1],
+                "app_bookingintent",
+            ),
+        ]
+        for queryset, table in hot_queries:
+            with self.subTest(table=table, sql=str(queryset.query)):
+                self.assertNoSequentialScan(queryset, table)
+
+
+class SlotGeneratorTests(SimpleTestCase):
+    def test_sweep_matches_legacy_collision_scan(self):
+        rng = random.Random(42)
+        for _ in range(300):
+            ranges = []
+            for _ in range(rng.randint(0, 3)):
+                start = rng.randrange(6 * 60, 20 * 60, 5)
+                end = start + rng.randrange(-30, 6 * 60, 5)
+                ranges.append((time(start // 60, start % 60), time(min(end, 1439) // 60, min(end, 1439) % 60)))
+            taken = []
+            for _ in range(rng.randint(0, 25)):
+                start = rng.randrange(5 * 60, 23 * 60)
+                taken.append((start, start + rng.choice([0, 1, 15, 30, 45, 60, 90, 240])))
+            duration = rng.choice([0, 15, 30, 45, 60, 120])
+            interval = rng.choice([0, 5, 15, 20, 30, 45, 60])
+
+            self.assertEqual(
+                compute_slots(
+                    ranges=ranges,
+                    taken_intervals=taken,
+                    duration_minutes=duration,
+                    interval_minutes=interval,
+                ),
+                legacy_slots(
+                    target_date=date(2026, 1, 5),
+                    ranges=ranges,
+                    taken_intervals=taken,
+                    duration_minutes=duration,
+                    interval_minutes=interval,
+                ),
+            )
+
+    def test_interval_engine_falls_back_without_numpy(self):
+        with mock.patch.object(interval_engine, "np", None):
+            self.assertEqual(interval_engine.resolve_engine("auto"), "python")
+            with self.assertRaises(ImproperlyConfigured):
+                interval_engine.resolve_engine("numpy")
+
+    @skipUnless(interval_engine.np is not None, "NumPy no está instalado.")
+    def test_numpy_engine_matches_python_engine(self):
+        rng = random.Random(9)
+        service = Service(id=1, name="Grid", default_duration_minutes=60, booking_interval_minutes=15)
+        days = []
+        for offset in range(200):
+            ranges = []
+            for _ in range(rng.randint(0, 3)):
+                start = rng.randrange(6 * 60, 20 * 60, 5)
+                ranges.append((from_minutes(start), from_minutes(min(start + rng.randrange(-30, 5 * 60, 5), 23 * 60 + 59))))
+            bookings = []
+            for _ in range(rng.randint(0, 12)):
+                start = rng.randrange(5 * 60, 23 * 60)
+                bookings.append((from_minutes(start), rng.choice([0, 1, 15, 30, 45, 90, 120]), None))
+            days.append(
+                DayAvailability(
+                    service=service,
+                    target_date=date(2026, 1, 1) + timedelta(days=offset),
+                    base_ranges=ranges,
+                    exceptions=[],
+                    bookings=bookings,
+                )
+            )
+        for duration in (1, 30, 45, 60):
+            for interval in (None, 5, 20):
+                with self.subTest(duration=duration, interval=interval):
+                    self.assertEqual(
+                        interval_engine.window_slots(
+                            days, duration_minutes=duration, booking_interval_minutes=interval, engine="numpy"
+                        ),
+                        interval_engine.window_slots(
+                            days, duration_minutes=duration, booking_interval_minutes=interval, engine="python"
+                        ),
+                    )
+                    self.assertEqual(
+                        interval_engine.window_slot_counts(
+                            days, duration_minutes=duration, booking_interval_minutes=interval, engine="numpy"
+                        ),
+                        interval_engine.window_slot_counts(
+                            days, duration_minutes=duration, booking_interval_minutes=interval, engine="python"
+                        ),
+                    )
+
 
 class BotFlowNodeTests(TestCase):
     def test_main_flow_seed_and_routing(self):
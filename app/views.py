@@ -19,7 +19,8 @@ from app.whatsapp.flow import route_incoming_whatsapp_event
 @csrf_exempt
 def webhook(request):
     started_at = time.perf_counter()
-    request_id = uuid.uuid4().hex[:10]
+    # El mismo id que usa RequestMetricsMiddleware, para unir sus métricas con estos logs.
+    request_id = getattr(request, "request_id", None) or uuid.uuid4().hex[:10]
 
     if request.method != "POST":
         log_event("WEBHOOK_METHOD_NOT_ALLOWED", request_id, method=request.method)
@@ -3,6 +3,7 @@ import logging
 
 logger = logging.getLogger("wa_bot")
 err_logger = logging.getLogger("wa_bot.errors")
+metrics_logger = logging.getLogger("wa_bot.metrics")
 SEP = "-" * 70
 
 def safe_json(obj, max_len=2500) -> str:
@@ -62,6 +63,12 @@ def log_event(event: str, request_id: str, **fields):
         parts.append(f"{k}={v}")
     logger.info(" | ".join(parts))
 
+def log_metrics(request_id: str, **fields):
+    parts = ["REQUEST_METRICS", f"request_id={request_id}"]
+    for k, v in fields.items():
+        parts.append(f"{k}={v}")
+    metrics_logger.info(" | ".join(parts))
+
 def log_error(event: str, request_id: str, **fields):
     parts = [event, f"request_id={request_id}"]
     for k, v in fields.items():
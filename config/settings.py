@@ -75,6 +75,11 @@ LOGGING = {
             "level": LOG_LEVEL,
             "propagate": False,
         },
+        "wa_bot.metrics": {
+            "handlers": ["console", "wa_file"],
+            "level": LOG_LEVEL,
+            "propagate": False,
+        },
         "wa_bot.errors": {
             "handlers": ["console", "wa_errors"],
             "level": "ERROR",
@@ -155,6 +160,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.RequestMetricsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -186,6 +192,25 @@ if CHANNELS_ENABLED:
         }
     }
 
+# Cache de disponibilidad (app/services/availability_cache.py).
+# BACKEND: "local" (LRU en memoria del proceso), "django" (framework de cache) o ruta a una clase.
+# TIMEOUT (segundos) aplica a ambos: es el tope de vida de una entrada aunque ninguna señal la invalide.
+AVAILABILITY_CACHE = {
+    "BACKEND": os.getenv("AVAILABILITY_CACHE_BACKEND", "local"),
+    "MAX_ENTRIES": int(os.getenv("AVAILABILITY_CACHE_MAX_ENTRIES", "4096")),
+    "TIMEOUT": int(os.getenv("AVAILABILITY_CACHE_TIMEOUT", "300")),
+}
+
+# Fracción de peticiones (0 a 1) con métricas de SQL y HTTP externo en el log (app/middleware.py),
+# incluidas las del personal. Estas además reciben siempre el encabezado Server-Timing.
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", "0.05"))
+
+# Segundos que se guardan los agregados del panel; las escrituras de citas los invalidan antes.
+DASHBOARD_AGGREGATES_TTL = int(os.getenv("DASHBOARD_AGGREGATES_TTL", "30"))
+
+# Minutos que un horario queda apartado mientras el cliente llena el formulario.
+SLOT_HOLD_MINUTES = int(os.getenv("SLOT_HOLD_MINUTES", "10"))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path
 
 from app.api_views import (
+    available_range_api,
     available_times_api,
     calendar_context_api,
     confirm_booking_api,
@@ -27,12 +28,17 @@ from app.api_views import (
     chat_send_api,
     chat_threads_api,
     dashboard_booking_status_api,
+    dashboard_bookings_aggregates_api,
     dashboard_bookings_api,
+    dashboard_bookings_changes_api,
     dashboard_bookings_events_api,
     dashboard_calendar_days_api,
     dashboard_manual_available_times_api,
     dashboard_manual_booking_create_api,
+    dashboard_next_available_times_api,
     dashboard_services_api,
+    hold_slot_api,
+    next_available_times_api,
 )
 from app.bot_manager_views import (
     bot_manager,
@@ -46,6 +52,7 @@ from app.bot_manager_views import (
     update_option,
 )
 from app.service_manager_views import (
+    block_dates,
     create_exception,
     create_package,
     create_service,
@@ -71,6 +78,8 @@ urlpatterns = [
     path('login/', auth_login, name='login'),
     path('api/dashboard/bookings/', dashboard_bookings_api, name='dashboard_bookings_api'),
     path('api/dashboard/bookings/events/', dashboard_bookings_events_api, name='dashboard_bookings_events_api'),
+    path('api/dashboard/bookings/changes/', dashboard_bookings_changes_api, name='dashboard_bookings_changes_api'),
+    path('api/dashboard/bookings/aggregates/', dashboard_bookings_aggregates_api, name='dashboard_bookings_aggregates_api'),
     path('api/dashboard/bookings/<int:booking_id>/status/', dashboard_booking_status_api, name='dashboard_booking_status_api'),
     path('api/dashboard/chats/threads/', chat_threads_api, name='chat_threads_api'),
     path('api/dashboard/chats/<int:user_id>/messages/', chat_messages_api, name='chat_messages_api'),
@@ -80,9 +89,13 @@ urlpatterns = [
     path('api/dashboard/services/', dashboard_services_api, name='dashboard_services_api'),
     path('api/dashboard/manual/available-times/', dashboard_manual_available_times_api, name='dashboard_manual_available_times_api'),
     path('api/dashboard/manual/bookings/create/', dashboard_manual_booking_create_api, name='dashboard_manual_booking_create_api'),
+    path('api/dashboard/availability/next/', dashboard_next_available_times_api, name='dashboard_next_available_times_api'),
     path('api/calendar/<uuid:token>/available-days/', dashboard_calendar_days_api, name='dashboard_calendar_days_api'),
     path('api/calendar/<uuid:token>/context/', calendar_context_api, name='calendar_context_api'),
+    path('api/calendar/<uuid:token>/available-range/', available_range_api, name='available_range_api'),
     path('api/calendar/<uuid:token>/available-times/', available_times_api, name='available_times_api'),
+    path('api/calendar/<uuid:token>/next-available/', next_available_times_api, name='next_available_times_api'),
+    path('api/calendar/<uuid:token>/hold/', hold_slot_api, name='hold_slot_api'),
     path('api/calendar/<uuid:token>/confirm/', confirm_booking_api, name='confirm_booking_api'),
     path('calendario-panel/', calendar_view, name='calendar_view'),
     path('citas/nueva/', manual_booking, name='manual_booking'),
@@ -104,6 +117,7 @@ urlpatterns = [
     path('servicios-manager/horarios/<int:range_id>/update/', update_weekly_range, name='service_manager_update_weekly_range'),
     path('servicios-manager/horarios/<int:range_id>/delete/', delete_weekly_range, name='service_manager_delete_weekly_range'),
     path('servicios-manager/<int:service_id>/excepciones/create/', create_exception, name='service_manager_create_exception'),
+    path('servicios-manager/<int:service_id>/excepciones/bloquear/', block_dates, name='service_manager_block_dates'),
     path('servicios-manager/excepciones/<int:exception_id>/update/', update_exception, name='service_manager_update_exception'),
     path('servicios-manager/excepciones/<int:exception_id>/delete/', delete_exception, name='service_manager_delete_exception'),
     path('servicios-manager/<int:service_id>/paquetes/create/', create_package, name='service_manager_create_package'),